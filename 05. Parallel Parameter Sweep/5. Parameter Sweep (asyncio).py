@@ -0,0 +1,92 @@
+"""
+This simple scripts shows how SIMBA simulations can be run from an asyncio event loop: all the simulations
+of the sweep are awaited concurrently while the event loop stays free for other tasks.
+
+Make sure to run 'pip install -r requirements.txt' to ensure you have the required packages.
+"""
+# %% Load required modules
+from aesim.simba import DesignExamples
+from datetime import datetime
+import asyncio
+import matplotlib.pyplot as plt
+import numpy as np
+import os
+from tqdm import tqdm
+import simba_async
+import thread_pool
+
+#############################
+#         PARAMETERS        #
+#############################
+duty_cycle_min = 0
+duty_cycle_max = 0.9
+numberOfPoints = 200    # Run 200 simulations
+timeout = 300           # Maximum run time of one simulation [s], counted from its start (waiting for a license is not counted)
+
+# Reduce simulation points for testing
+if os.environ.get("SIMBA_SCRIPT_TEST"): # Accelerate simulation in test environment.
+    numberOfPoints = 10
+
+
+#############################
+#           METHODS         #
+#############################
+def get_design():
+    """
+    Return the buck-boost design example of the current simulation thread (created once per thread)
+    """
+    return thread_pool.thread_local('buck-boost', DesignExamples.BuckBoostConverter)
+
+
+async def average_output_voltage(duty_cycle):
+    """
+    Simulate the buck-boost converter with duty_cycle and return the average output voltage (None if the simulation failed)
+    """
+    try:
+        result = await simba_async.run_job(get_design, {'C1.DutyCycle': duty_cycle}, timeout=timeout)
+    except asyncio.TimeoutError:
+        print("Simulation with duty cycle {0:.3f} timed out".format(duty_cycle))
+        return None
+
+    with result:
+        if not result.ok:
+            print(result.summary)
+            return None
+        t, Vout = result.signal('Rload - Voltage')
+
+    # Average output voltage for t > 5ms
+    return np.average(Vout[t >= 0.005])
+
+
+async def sweep(duty_cycles):
+    """
+    Run all the simulations concurrently and return the output voltages in the duty cycle order
+    """
+    tasks = [asyncio.create_task(average_output_voltage(duty_cycle)) for duty_cycle in duty_cycles]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks)):  # progress bar updated as results arrive
+        await task
+    return [task.result() for task in tasks]
+
+
+#############################
+#         MAIN SCRIPT       #
+#############################
+if __name__ == "__main__":
+    print("1. Initialization")
+    duty_cycles = np.arange(duty_cycle_min, duty_cycle_max, duty_cycle_max / numberOfPoints).tolist()
+
+    print("2. Running...")
+    calculated_voltages = asyncio.run(sweep(duty_cycles))
+    simba_async.shutdown()
+
+    # Plot curve and save image.
+    print("3. Plot output voltage vs duty cycle...")
+    valid_points = [(d, v) for d, v in zip(duty_cycles, calculated_voltages) if v is not None]
+    fig, ax = plt.subplots()
+    ax.set_title("Buck-Boost Converter Parametric Sweep")
+    ax.set_ylabel('Vout (V)')
+    ax.set_xlabel('Duty Cycle')
+    ax.plot([d for d, _ in valid_points], [v for _, v in valid_points])
+    path = "buck_boost_parametric_sweep_" + datetime.now().strftime("%Y%m%d") + ".png"
+    fig.savefig(path)
+    plt.show()
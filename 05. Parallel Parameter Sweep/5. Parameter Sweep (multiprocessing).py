@@ -6,10 +6,12 @@ Make sure to run 'pip install -r requirements.txt' to ensure you have the requir
 # %% Load required modules
 from aesim.simba import DesignExamples, License
 from datetime import datetime
-import multiprocessing, tqdm #tqdm is for the progress bar
+import tqdm #tqdm is for the progress bar
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+import shared_results
+import supervised_pool
 
 #############################
 #         PARAMETERS        #
@@ -21,6 +23,8 @@ number_of_parallel_simulations =  License.NumberOfAvailableParallelSimulationLic
 duty_cycle_min = 0
 duty_cycle_max = 0.9
 numberOfPoints = 200    # Run 200 simulations
+job_timeout = 600       # Wall-clock budget of one simulation [s]. A stuck simulation is killed and retried.
+max_retries = 2         # Number of retries of a simulation which timed out, crashed or raised an exception
 
 # Reduce simulation points for testing
 if os.environ.get("SIMBA_SCRIPT_TEST"): # Accelerate simulation in test environment.
@@ -32,60 +36,49 @@ if os.environ.get("SIMBA_SCRIPT_TEST"): # Accelerate simulation in test environm
 #############################
 
 # %% Define the functions to be run in parallel
-def run_job(simulation_number, duty_cycle, calculated_voltages):
+def run_job(args):
     """
-    This thread-safe function:
+    This function, run in a supervised worker process:
     - Loads the buck-boost design example
     - Changes the duty cycle value
     - Runs the simulation
-    - Calculates the output voltage and store it in calculated_voltages
+    - Calculates the output voltage and store it in the shared result table (row simulation_number)
 
     Args:
-        simulation_number (int): number of the current run
-        duty_cycle (float): duty-cycle to
-        calculated_voltages ([float]): thread-safe list used to store results
-    """
-    try:
-        BuckBoostConverter = DesignExamples.BuckBoostConverter()
-
-        # Set duty cycle value
-        PWM = BuckBoostConverter.Circuit.GetDeviceByName('C1')
-        PWM.DutyCycle = duty_cycle
-
-        # create job
-        job = BuckBoostConverter.TransientAnalysis.NewJob()
-
-        # Start job and log if error.
-        status = job.Run()
-        if str(status) != "OK":
-            error_msg = f"Simulation {simulation_number} failed with status: {status}\n{job.Summary()[:-1]}"
-            print(error_msg)
-            calculated_voltages[simulation_number] = float('nan')  # Mark as failed
-            return
-
-        # Retrieve results
-        signal = job.GetSignalByName('Rload - Voltage')
-        t = np.array(signal.TimePoints)
-        Vout = np.array(signal.DataPoints)
-
-        # Average output voltage for t > 2ms
-        indices = np.where(t >= 0.005)
-        Vout = np.take(Vout, indices)
-
-        # Save Voltage in the results
-        calculated_voltages[simulation_number] = np.average(Vout)
-
-    except Exception as e:
-        error_msg = f"Exception in simulation {simulation_number} (duty_cycle={duty_cycle}): {type(e).__name__}: {str(e)}"
-        print(error_msg)
-        calculated_voltages[simulation_number] = float('nan')  # Mark as failed
-        return
-
-def run_job_star(args):
-    """
-    Helper function used to call run_job with a single argument
+        args ((int, float)): number of the current run and duty-cycle
+
+    Raises:
+        supervised_pool.SimulationFailed: the simulation status is not OK (the failure is recorded with the job summary)
     """
-    return run_job(*args)
+    simulation_number, duty_cycle = args
+    BuckBoostConverter = DesignExamples.BuckBoostConverter()
+
+    # Set duty cycle value
+    PWM = BuckBoostConverter.Circuit.GetDeviceByName('C1')
+    PWM.DutyCycle = duty_cycle
+
+    # create job
+    job = BuckBoostConverter.TransientAnalysis.NewJob()
+
+    # Start job and record the summary if error.
+    status = job.Run()
+    if str(status) != "OK":
+        summary = job.Summary()[:-1]
+        job.Dispose()
+        raise supervised_pool.SimulationFailed(status, summary)
+
+    # Retrieve results
+    signal = job.GetSignalByName('Rload - Voltage')
+    t = np.array(signal.TimePoints)
+    Vout = np.array(signal.DataPoints)
+    job.Dispose()  # free memory, the process is reused for the next simulation
+
+    # Average output voltage for t > 2ms
+    indices = np.where(t >= 0.005)
+    Vout = np.take(Vout, indices)
+
+    # Save Voltage in the results
+    shared_results.write(simulation_number, {'vout': np.average(Vout)})
 
 #############################
 #         MAIN SCRIPT       #
@@ -96,40 +89,35 @@ if __name__ == "__main__": # Called only in main thread
     print("1. Initialization")
     duty_cycles = np.arange(duty_cycle_min, duty_cycle_max, duty_cycle_max / numberOfPoints).tolist()
 
-    manager = multiprocessing.Manager()
-    calculated_voltages = manager.list(range(len(duty_cycles)))
-    pool_args = [[i, duty_cycles[i], calculated_voltages] for i in range(numberOfPoints)]
+    # Results table shared by all processes (one row per simulation, NaN until written)
+    results = shared_results.SharedResults([('vout', 'f8')], len(duty_cycles))
+    pool_args = [[i, duty_cycles[i]] for i in range(numberOfPoints)]
 
-    # Create and start the processing pool
+    # Create and start the supervised worker processes
     print("2. Running...")
-    pool = multiprocessing.Pool(number_of_parallel_simulations)
-
-    # Use imap_unordered for better error handling and progress tracking
-    results = []
-    try:
-        for result in tqdm.tqdm(pool.imap(run_job_star, pool_args), total=len(pool_args)):
-            results.append(result)
-    except Exception as e:
-        print(f"Pool execution error: {type(e).__name__}: {str(e)}")
-        pool.terminate()
-        pool.join()
-        raise
-    finally:
-        pool.close()
-        pool.join()
+    records = []
+    for record in tqdm.tqdm(supervised_pool.run_supervised(run_job, pool_args, number_of_parallel_simulations,
+                                                           timeout=job_timeout, max_retries=max_retries,
+                                                           initializer=shared_results.init_worker,
+                                                           initargs=(results.handle(),)),
+                            total=len(pool_args)):
+        records.append(record)
 
     # Plot curve and save image.
     print("3. Plot output voltage vs duty cycle...")
-    calculated_voltages = list(calculated_voltages)
-
-    # Check for failed simulations and report them
-    failed_count = sum(1 for v in calculated_voltages if isinstance(v, float) and str(v) == 'nan')
-    if failed_count > 0:
-        print(f"Warning: {failed_count} out of {len(calculated_voltages)} simulations failed.")
+    calculated_voltages = results.array['vout'].tolist()
+    results.close()
+
+    # Report failed simulations with their status and job summary
+    failures = sorted((record for record in records if not record.ok), key=lambda record: record.index)
+    for record in failures:
+        print(f"Simulation {record.index} (duty_cycle={record.item[1]:.3f}) {record.status} after {record.attempts} attempt(s):\n{record.summary}")
+    if len(failures) > 0:
+        print(f"Warning: {len(failures)} out of {len(records)} simulations failed.")
         print("Failed simulations will be excluded from the plot.")
 
-    # Filter out NaN values for plotting
-    valid_indices = [i for i, v in enumerate(calculated_voltages) if not (isinstance(v, float) and str(v) == 'nan')]
+    # Keep only the successful simulations for plotting
+    valid_indices = sorted(record.index for record in records if record.ok)
     valid_duty_cycles = [duty_cycles[i] for i in valid_indices]
     valid_voltages = [calculated_voltages[i] for i in valid_indices]
 
@@ -4,58 +4,56 @@ This simple scripts shows how the SIMBA Python Library can be used to run calcul
 Make sure to run 'pip install -r requirements.txt' to ensure you have the required packages.
 """
 # %% Load required modules
-from aesim.simba import DesignExamples, License
+from aesim.simba import DesignExamples
 from datetime import datetime
-import threading, tqdm  # tqdm is for the progress bar
 import matplotlib.pyplot as plt
 import numpy as np
 import os
-
-number_of_parallel_simulations = License.NumberOfAvailableParallelSimulationLicense() # Number of available parallel simulation license
-semaphore = threading.Semaphore(number_of_parallel_simulations)
+import thread_pool  # pool of threads sized to the number of available parallel simulation licenses
 
 # %% Define the functions to be run in parallel
-def run_job(simulation_number, duty_cycle, calculated_voltages):
+def run_job(duty_cycle):
     """
     This thread-safe function:
-    - Loads the buck-boost design example
+    - Gets the buck-boost design example (created once per thread)
     - Changes the duty cycle value
     - Runs the simulation
-    - Calculates the output voltage and store it in calculated_voltages
+    - Calculates and returns the output voltage
 
     Args:
-        simulation_number (int): number of the current run
         duty_cycle (float): duty-cycle to 
-        calculated_voltages ([float]): thread-safe list used to store results
+
+    Returns:
+        float: average output voltage (None if the simulation failed)
     """
-    with semaphore:
-        BuckBoostConverter = DesignExamples.BuckBoostConverter()
+    BuckBoostConverter = thread_pool.thread_local('buck-boost', DesignExamples.BuckBoostConverter)
 
-        # Set duty cycle value
-        PWM = BuckBoostConverter.Circuit.GetDeviceByName('C1')
-        PWM.DutyCycle = duty_cycle
+    # Set duty cycle value
+    PWM = BuckBoostConverter.Circuit.GetDeviceByName('C1')
+    PWM.DutyCycle = duty_cycle
 
-        # create job
-        job = BuckBoostConverter.TransientAnalysis.NewJob()
+    # create job
+    job = BuckBoostConverter.TransientAnalysis.NewJob()
 
-        # Start job and log if error.
-        job.Run()
-        status = job.Run()
-        if str(status) != "OK":
-            print(job.Summary()[:-1])
-            return  # ERROR
+    # Start job and log if error.
+    status = job.Run()
+    if str(status) != "OK":
+        print(job.Summary()[:-1])
+        job.Dispose()
+        return None  # ERROR
 
-        # Retrieve results
-        vout_signal = job.GetSignalByName('Rload - Voltage')
-        t = np.array(vout_signal.TimePoints)
-        Vout = np.array(vout_signal.DataPoints)
+    # Retrieve results
+    vout_signal = job.GetSignalByName('Rload - Voltage')
+    t = np.array(vout_signal.TimePoints)
+    Vout = np.array(vout_signal.DataPoints)
+    job.Dispose()  # free memory, the thread is reused for the next simulation
 
-        # Average output voltage for t > 2ms
-        indices = np.where(t >= 0.005)
-        Vout = np.take(Vout, indices)
+    # Average output voltage for t > 2ms
+    indices = np.where(t >= 0.005)
+    Vout = np.take(Vout, indices)
 
-        # Save Voltage in the results
-        calculated_voltages[simulation_number] = np.average(Vout)
+    # Return Voltage
+    return np.average(Vout)
 
 
 #############################
@@ -72,17 +70,9 @@ if __name__ == "__main__":  # Called only in main thread.
         numberOfPoints = 10
 
     duty_cycles = np.arange(0.00, 0.9, 0.9 / numberOfPoints).tolist()
-    calculated_voltages = [None] * len(duty_cycles)
-    threads = []
-
-    for i in range(len(duty_cycles)):
-        t = threading.Thread(target=run_job, args=(i, duty_cycles[i], calculated_voltages))
-        threads.append(t)
-        t.start()
 
     print("2. Running...")
-    for t in tqdm.tqdm(threads):
-        t.join()
+    calculated_voltages = list(thread_pool.run_threaded(run_job, duty_cycles))  # results in duty cycle order
 
     # Plot curve and save image.
     print("3. Plot output voltage vs duty cycle...")
@@ -0,0 +1,134 @@
+"""
+Result table shared between the processes of a multiprocessing sweep.
+
+The results are stored in a NumPy structured array placed in a shared memory block
+(multiprocessing.shared_memory). Each column has a name and a dtype declared once by the
+parent process. Workers write their row by index and the parent reads the table directly:
+no Manager process is needed and writing a result is a simple memory copy.
+
+Usage:
+    results = SharedResults([('torque', 'f8'), ('speed', 'f8')], number_of_points)
+    pool = multiprocessing.Pool(initializer=shared_results.init_worker, initargs=(results.handle(),))
+
+    # in the worker
+    shared_results.write(sim_number, (torque, speed))
+
+    # in the parent, once the pool is done
+    data = results.to_dataframe()
+    results.close()
+"""
+
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class SharedResults:
+    """
+    Fixed size table of results stored in shared memory.
+
+    Args:
+        schema ([(str, str)]): column names and dtypes, ex: [('efficiency', 'f8'), ('status', 'i4')]
+        length (int): number of rows
+        name (str): name of an existing shared memory block. Leave to None to create a new table.
+    """
+
+    def __init__(self, schema, length, name=None):
+        self.dtype = np.dtype([(str(column), dtype) for column, dtype in schema])
+        self.length = length
+        self._owner = name is None
+        if self._owner:
+            size = max(1, self.dtype.itemsize * length)
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray((length,), dtype=self.dtype, buffer=self._shm.buf)
+
+        if self._owner:  # missing results are NaN (floats) or 0 (other dtypes)
+            for column in self.dtype.names:
+                self.array[column] = np.nan if self.dtype[column].kind in 'fc' else 0
+
+    def handle(self):
+        """
+        Return the picklable description of the table used by the workers to attach to it.
+        """
+        schema = [(column, self.dtype[column].str) for column in self.dtype.names]
+        return (self._shm.name, schema, self.length)
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Open the table created by another process from its handle().
+        """
+        name, schema, length = handle
+        return cls(schema, length, name=name)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __setitem__(self, index, values):
+        if isinstance(values, dict):
+            for column, value in values.items():
+                self.array[column][index] = value
+        else:
+            self.array[index] = tuple(values)
+
+    def to_dataframe(self, dropna=False):
+        """
+        Return the results as a pandas DataFrame (copy of the shared table).
+
+        Args:
+            dropna (bool): if True, rows containing NaN values (failed or missing simulations) are removed
+        """
+        import pandas as pd
+        data = pd.DataFrame(self.array.copy())
+        if dropna:
+            data = data.dropna()
+        return data
+
+    def close(self):
+        """
+        Release the shared memory. The block is destroyed when closed by the process which created it.
+        """
+        if self._shm is None:
+            return
+        self.array = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+#############################
+#   WORKER SIDE FUNCTIONS   #
+#############################
+_worker_table = None    # table attached by the current worker process
+
+
+def init_worker(handle):
+    """
+    Pool initializer: attach the current process to the shared table.
+    """
+    global _worker_table
+    _worker_table = SharedResults.attach(handle)
+
+
+def write(index, values):
+    """
+    Write the results of a simulation in the shared table.
+
+    Args:
+        index (int): row index (simulation number)
+        values (tuple or dict): values in the schema order, or {column: value}
+    """
+    if _worker_table is None:
+        raise RuntimeError("shared_results.init_worker() must be called before write()")
+    _worker_table[index] = values
@@ -0,0 +1,202 @@
+"""
+asyncio interface to run SIMBA transient simulations without blocking the event loop.
+
+job.Run() is a blocking call. run_job() runs it in a pool of threads sized to the number of
+available parallel simulation licenses and returns an awaitable, so that one event loop can drive
+many simulations (optimization drivers, dashboards...) together with other tasks.
+
+Usage:
+    async def main():
+        result = await simba_async.run_job(design, {'C1.DutyCycle': 0.5, 'Vin': 48}, timeout=60)
+        if result.ok:
+            time, vout = result.signal('Rload - Voltage')
+        result.dispose()
+
+    asyncio.run(main())
+
+Parameters are applied to the design just before the job is created:
+ - 'Device.Property' names set a property of a device (ex: 'C1.DutyCycle'),
+ - other names set a circuit variable (Circuit.SetVariableValue).
+
+A design can only run one job at a time: jobs submitted for the same design object are run one
+after the other. To run simulations concurrently, pass a function returning a design instead, for
+example lambda: thread_pool.thread_local('buck-boost', DesignExamples.BuckBoostConverter). It is
+called in the simulation thread.
+
+Cancellation and timeouts: the timeout of a job is counted from the start of its simulation (the
+time waiting for a free thread or for its design is not counted). A job which has not started yet
+is never run. SIMBA does not allow a running job to be interrupted: it keeps its thread until the
+end of the simulation, then it is disposed.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+import weakref
+import numpy as np
+import thread_pool
+
+_executor = None                            # pool of threads shared by all the jobs
+_executor_lock = threading.Lock()
+_design_locks = weakref.WeakKeyDictionary() # one lock per design object: a design runs one job at a time
+_design_locks_lock = threading.Lock()
+
+
+class JobResult:
+    """
+    Result of a simulation run by run_job(). Signals are read from the job only when requested.
+    Call dispose() (or use it as a context manager) to free the memory of the job.
+    """
+
+    def __init__(self, job, status, run_time):
+        self._job = job
+        self.status = str(status)
+        self.summary = job.Summary()[:-1]
+        self.run_time = run_time            # wall-clock duration of job.Run() [s]
+        self._signals = {}
+
+    @property
+    def ok(self):
+        return self.status == "OK"
+
+    def signal(self, name):
+        """
+        Return (time_points, data_points) of the signal name as NumPy arrays. The arrays are copied once and cached.
+        """
+        if name not in self._signals:
+            if self._job is None:
+                raise RuntimeError("the job of this result has been disposed")
+            signal = self._job.GetSignalByName(name)
+            self._signals[name] = (np.array(signal.TimePoints), np.array(signal.DataPoints))
+        return self._signals[name]
+
+    def dispose(self):
+        """
+        Free the memory of the job. Signals already read remain available.
+        """
+        if self._job is not None:
+            self._job.Dispose()
+            self._job = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.dispose()
+
+
+def get_executor():
+    """
+    Return the pool of threads used to run the jobs (created the first time, sized to the number of available parallel simulation licenses).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=thread_pool.number_of_threads(),
+                                                              thread_name_prefix="simba")
+        return _executor
+
+
+def shutdown():
+    """
+    Wait for the running jobs and stop the pool of threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def apply_parameters(design, params):
+    """
+    Apply {name: value} to the design: 'Device.Property' names set a device property, other names a circuit variable.
+    """
+    for name, value in (params or {}).items():
+        if '.' in name:
+            device_name, property_name = name.rsplit('.', 1)
+            setattr(design.Circuit.GetDeviceByName(device_name), property_name, value)
+        else:
+            design.Circuit.SetVariableValue(name, str(value))
+
+
+def _design_lock(design):
+    with _design_locks_lock:
+        lock = _design_locks.get(design)
+        if lock is None:
+            lock = _design_locks[design] = threading.Lock()
+        return lock
+
+
+def _run(design, params, cancelled, on_start=None):
+    """
+    Run the job in a thread of the pool. Returns None if the job was cancelled before it started.
+    on_start(start_time) is called just before job.Run().
+    """
+    if cancelled.is_set():
+        return None
+    if callable(design):
+        design = design()
+    with _design_lock(design):
+        if cancelled.is_set():
+            return None
+        apply_parameters(design, params)
+        job = design.TransientAnalysis.NewJob()
+        start = time.perf_counter()
+        if on_start is not None:
+            on_start(start)
+        status = job.Run()
+        return JobResult(job, status, time.perf_counter() - start)
+
+
+def _dispose_abandoned(future):
+    if not future.cancelled() and future.exception() is None and future.result() is not None:
+        future.result().dispose()
+
+
+async def run_job(design, params=None, timeout=None, executor=None):
+    """
+    Run a transient simulation of design without blocking the event loop.
+
+    Args:
+        design (Design or function): SIMBA design, or function called in the simulation thread which returns the design
+        params (dict): parameters applied before the simulation {name: value}
+        timeout (float): maximum run time [s] of the simulation, counted from its start (the time waiting for a free
+            thread or for the design is not counted). asyncio.TimeoutError is raised when exceeded.
+        executor (concurrent.futures.Executor): pool of threads. Default: get_executor()
+
+    Returns:
+        JobResult: status, summary and signals of the simulation. The status is not checked: test result.ok.
+    """
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+    start_time = []
+
+    def on_start(start):  # called in the simulation thread
+        start_time.append(start)
+        try:
+            loop.call_soon_threadsafe(started.set)
+        except RuntimeError:  # event loop already closed
+            pass
+
+    cancelled = threading.Event()
+    future = (executor or get_executor()).submit(_run, design, params, cancelled, on_start)
+    result = asyncio.wrap_future(future)
+    try:
+        if timeout is not None:
+            # Wait for the start of the simulation, then for its result during the rest of the timeout
+            start_waiter = asyncio.ensure_future(started.wait())
+            try:
+                await asyncio.wait({result, start_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                start_waiter.cancel()
+            if not result.done():
+                return await asyncio.wait_for(result, max(timeout - (time.perf_counter() - start_time[0]), 0.0))
+        return await result
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        # The result is not awaited anymore: do not start the job, or dispose it when it is done
+        cancelled.set()
+        future.cancel()
+        future.add_done_callback(_dispose_abandoned)
+        raise
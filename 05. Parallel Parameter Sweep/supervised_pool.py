@@ -0,0 +1,222 @@
+"""
+Pool of worker processes supervised by the main process, used to run long sweeps safely.
+
+Contrary to multiprocessing.Pool, a simulation which hangs or crashes its process does not stall
+the sweep:
+ - each task has a wall-clock budget (timeout). The process of a task which exceeds it is killed
+   and replaced by a new one, so that the license slot is released,
+ - a process which dies (crash of the solver...) is replaced as well,
+ - tasks which time out, crash or raise an exception are retried up to max_retries times,
+ - simulations which end with an error status (raise SimulationFailed) are not retried.
+
+Every task produces a TaskRecord with its status: 'ok', 'failed' (simulation error status),
+'error' (exception), 'timeout' or 'crashed', the job summary or the error message, the number of
+attempts and the run time.
+
+Usage:
+    def run_job(duty_cycle):
+        ...
+        if str(status) != "OK":
+            raise supervised_pool.SimulationFailed(status, job.Summary()[:-1])
+        return result
+
+    for record in supervised_pool.run_supervised(run_job, duty_cycles, number_of_workers, timeout=600):
+        if record.ok: ...
+"""
+
+import multiprocessing
+import time
+import traceback
+from multiprocessing.connection import wait
+
+
+class SimulationFailed(Exception):
+    """
+    Raised by a task when the simulation ends with an error status. The task is not retried.
+
+    Args:
+        status (str): status returned by job.Run()
+        summary (str): job.Summary() text
+    """
+
+    def __init__(self, status, summary=""):
+        super().__init__("{0}\n{1}".format(status, summary))
+        self.status = str(status)
+        self.summary = summary
+
+
+class TaskRecord:
+    """
+    Outcome of one task of the sweep.
+
+    Attributes:
+        index (int): position of the task in the work items
+        item: work item passed to the function
+        status (str): 'ok', 'failed', 'error', 'timeout' or 'crashed'
+        result: return value of the function (None if the task did not succeed)
+        summary (str): job summary of a failed simulation, or error message
+        attempts (int): number of times the task was started
+        run_time (float): duration of the last attempt [s]
+    """
+
+    def __init__(self, index, item, status, result=None, summary="", attempts=1, run_time=0.0):
+        self.index = index
+        self.item = item
+        self.status = status
+        self.result = result
+        self.summary = summary
+        self.attempts = attempts
+        self.run_time = run_time
+
+    @property
+    def ok(self):
+        return self.status == 'ok'
+
+    def __repr__(self):
+        return "TaskRecord(index={0}, status={1!r}, attempts={2}, run_time={3:.1f}s)".format(
+            self.index, self.status, self.attempts, self.run_time)
+
+
+def _worker_loop(connection, function, initializer, initargs):
+    """
+    Main function of a worker process: run the tasks received from the main process one by one.
+    """
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        index, item = message
+        try:
+            connection.send((index, 'ok', function(item), ""))
+        except SimulationFailed as e:
+            connection.send((index, 'failed', None, "{0}\n{1}".format(e.status, e.summary)))
+        except Exception:
+            connection.send((index, 'error', None, traceback.format_exc()))
+
+
+class _Worker:
+    """
+    Worker process and the task it is running
+    """
+
+    def __init__(self, function, initializer, initargs):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_loop, daemon=True,
+                                               args=(child_connection, function, initializer, initargs))
+        self.process.start()
+        child_connection.close()
+        self.task = None        # index of the running task
+        self.start_time = None
+
+    def submit(self, index, item):
+        self.task = index
+        self.start_time = time.monotonic()
+        self.connection.send((index, item))
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+def run_supervised(function, work_items, number_of_workers, timeout=None, max_retries=2, initializer=None, initargs=()):
+    """
+    Call function(item) for each item of work_items in supervised worker processes and yield a TaskRecord
+    for each task as soon as it is finished (not in the order of work_items).
+
+    Args:
+        function (function): module-level function called with one work item. Its return value must be picklable.
+        work_items ([]): work items
+        number_of_workers (int): number of worker processes (number of available parallel simulation licenses)
+        timeout (float): wall-clock budget of one task [s]. None for no limit.
+        max_retries (int): number of times a task which timed out, crashed or raised an exception is started again
+        initializer (function): optional function called when a worker process starts (also for the replacing processes)
+        initargs (tuple): arguments of initializer
+    """
+    if number_of_workers < 1:
+        raise ValueError("number_of_workers must be at least 1 (got {0}): no parallel simulation license available?".format(number_of_workers))
+    work_items = list(work_items)
+    pending = list(range(len(work_items)))[::-1]   # task indices to start (stack: first item on top)
+    attempts = [0] * len(work_items)
+    workers = [_Worker(function, initializer, initargs) for _ in range(min(number_of_workers, len(work_items)))]
+    remaining = len(work_items)
+
+    def start_tasks():
+        for worker in workers:
+            if worker.task is None and pending:
+                index = pending.pop()
+                attempts[index] += 1
+                worker.submit(index, work_items[index])
+
+    def end_task(worker, status, result=None, summary=""):
+        """
+        Release the worker and return the record of its task, or None if the task is started again
+        """
+        index = worker.task
+        run_time = time.monotonic() - worker.start_time
+        worker.task = None
+        if status in ('error', 'timeout', 'crashed') and attempts[index] <= max_retries:
+            pending.append(index)
+            return None
+        return TaskRecord(index, work_items[index], status, result, summary, attempts[index], run_time)
+
+    try:
+        start_tasks()
+        while remaining > 0:
+            busy = [worker for worker in workers if worker.task is not None]
+            wait_time = None
+            if timeout is not None:
+                wait_time = max(0.0, min(worker.start_time + timeout for worker in busy) - time.monotonic())
+            ready = wait([worker.connection for worker in busy] + [worker.process.sentinel for worker in busy], wait_time)
+
+            records = []
+            for i, worker in enumerate(workers):
+                if worker.task is None:
+                    continue
+                replace = False
+                if worker.connection in ready:
+                    try:
+                        _, status, result, summary = worker.connection.recv()
+                    except (EOFError, OSError):
+                        records.append(end_task(worker, 'crashed', summary="worker process exited with code {0}".format(worker.process.exitcode)))
+                        replace = True
+                    else:
+                        records.append(end_task(worker, status, result, summary))
+                elif worker.process.sentinel in ready:
+                    worker.process.join()
+                    records.append(end_task(worker, 'crashed', summary="worker process exited with code {0}".format(worker.process.exitcode)))
+                    replace = True
+                elif timeout is not None and time.monotonic() - worker.start_time > timeout:
+                    records.append(end_task(worker, 'timeout', summary="no result after {0} s".format(timeout)))
+                    replace = True
+                if replace:  # kill the stuck or dead process and start a new one
+                    worker.kill()
+                    workers[i] = _Worker(function, initializer, initargs)
+
+            start_tasks()
+            for record in records:
+                if record is not None:
+                    remaining -= 1
+                    yield record
+    finally:
+        for worker in workers:
+            if worker.task is None:
+                worker.stop()
+            else:
+                worker.kill()
@@ -0,0 +1,125 @@
+"""
+Helpers used to run SIMBA simulations in parallel threads.
+
+run_threaded() uses a single pool of threads sized to the number of available parallel
+simulation licenses. The work items are read lazily from an iterable: only a few items per
+thread are submitted at a time, so threads, stacks and SIMBA designs are only created for the
+concurrency that the license allows, even for thousands of simulations.
+
+get_thread_design() loads the project once per thread and returns the same design to all the
+simulations run by this thread.
+
+Usage:
+    def run_simulation(sim_number):
+        design = thread_pool.get_thread_design(project_path, 'Design 1')
+        ...
+        return result
+
+    results = list(thread_pool.run_threaded(run_simulation, range(1000)))
+"""
+
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from tqdm import tqdm
+from aesim.simba import ProjectRepository, License
+
+_thread_data = threading.local()    # objects created by each thread (designs...)
+_project_open_lock = threading.Lock()  # be conservative opening the project file from multiple threads
+
+
+def number_of_threads():
+    """
+    Return the number of threads to use: the number of available parallel simulation licenses.
+    """
+    return max(1, License.NumberOfAvailableParallelSimulationLicense())
+
+
+def run_threaded(function, work_items, ordered=True, max_workers=None, total=None, desc=None):
+    """
+    Call function(item) for each item of work_items in a bounded pool of threads and yield the results.
+
+    Args:
+        function (function): function called with one work item. Its return value is yielded.
+        work_items (iterable): work items, read lazily (a generator can be used)
+        ordered (bool): if True, results are yielded in the order of work_items. Otherwise as soon as they are available.
+        max_workers (int): number of threads. Default: number of available parallel simulation licenses.
+        total (int): number of work items for the progress bar. Default: len(work_items) if available.
+        desc (str): description of the progress bar
+
+    Yields:
+        results of function(item), or (item, result) tuples if ordered is False
+    """
+    if max_workers is None:
+        max_workers = number_of_threads()
+    if total is None and hasattr(work_items, '__len__'):
+        total = len(work_items)
+    max_pending = 2 * max_workers  # keep threads busy without queuing all the work items
+    work_iterator = iter(work_items)
+
+    def submit_next(executor):
+        for item in work_iterator:
+            future = executor.submit(function, item)
+            future.item = item
+            return future
+        return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, tqdm(total=total, desc=desc) as progress_bar:
+        if ordered:
+            pending = collections.deque()
+            while len(pending) < max_pending:
+                future = submit_next(executor)
+                if future is None:
+                    break
+                pending.append(future)
+
+            while pending:
+                future = pending.popleft()
+                result = future.result()
+                progress_bar.update(1)
+                next_future = submit_next(executor)
+                if next_future is not None:
+                    pending.append(next_future)
+                yield result
+        else:
+            pending = set()
+            while len(pending) < max_pending:
+                future = submit_next(executor)
+                if future is None:
+                    break
+                pending.add(future)
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    next_future = submit_next(executor)
+                    if next_future is not None:
+                        pending.add(next_future)
+                for future in done:
+                    result = future.result()
+                    progress_bar.update(1)
+                    yield future.item, result
+
+
+def thread_local(key, factory):
+    """
+    Return the object identified by key for the current thread. It is created by factory() the first time.
+    """
+    objects = getattr(_thread_data, 'objects', None)
+    if objects is None:
+        objects = _thread_data.objects = {}
+    if key not in objects:
+        objects[key] = factory()
+    return objects[key]
+
+
+def get_thread_design(project_path, design_name):
+    """
+    Return the design design_name of the project project_path, loaded once per thread.
+    Parameters modified by a previous simulation of the same thread are kept: set all swept parameters for each simulation.
+    """
+    def load_design():
+        with _project_open_lock:
+            project = ProjectRepository(project_path)
+        return project.GetDesignByName(design_name)
+    return thread_local((project_path, design_name), load_design)
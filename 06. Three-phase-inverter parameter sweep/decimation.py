@@ -0,0 +1,140 @@
+"""
+Decimation of large waveforms for plotting.
+
+A plot cannot show more points than its width in pixels: with a 2 ns time step, a waveform has millions
+of points per line, which makes Bokeh figures very slow (or crash the browser). This module reduces a
+waveform to a few points per pixel while keeping its visual aspect:
+ - minmax: the x range is divided into one bucket per pixel and the minimum and maximum of each bucket
+   are kept (in time order), so that peaks and switching edges are never lost. Vectorized with NumPy.
+ - lttb: Largest-Triangle-Three-Buckets, which keeps in each bucket the point forming the largest triangle
+   with the point kept in the previous bucket and the average of the next bucket. Smoother for slow signals.
+
+Only the visible x range is decimated, so that zooming in shows the full-resolution data again. With a
+Bokeh server, zoomable_line() re-queries the full-resolution arrays each time the x range of the figure changes.
+
+Usage:
+    t_plot, v_plot = decimate(t, v, width=800)                               # whole waveform, 800 pixels
+    t_plot, v_plot = decimate(t, v, width=800, x_start=1e-3, x_end=2e-3)     # zoomed part only
+    zoomable_line(p, t, v, legend_label="Mosfet Vds voltage")                # Bokeh figure p
+"""
+
+import numpy as np
+
+METHODS = ('minmax', 'lttb')
+
+
+def _is_sorted(x):
+    return x.size < 2 or bool(np.all(x[1:] >= x[:-1]))
+
+
+def _bucket_bounds(x, number_of_buckets, sorted_x):
+    """
+    Return the index bounds of the buckets: equal x ranges if x is sorted (one bucket per pixel), equal counts otherwise.
+    """
+    if sorted_x and x[-1] > x[0]:
+        bounds = np.searchsorted(x, np.linspace(x[0], x[-1], number_of_buckets + 1), side='left')
+        bounds[-1] = x.size
+        return bounds
+    return np.linspace(0, x.size, number_of_buckets + 1).astype(np.intp)
+
+
+def minmax(x, y, number_of_buckets):
+    """
+    Return the indices of the points kept by the min-max decimation: first and last points, and the minimum
+    and maximum of each bucket (at most 2 * number_of_buckets + 2 points, sorted).
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    bounds = np.unique(_bucket_bounds(x, number_of_buckets, _is_sorted(x)))
+    starts = bounds[:-1]  # non-empty buckets
+    bucket_of_point = np.repeat(np.arange(starts.size), np.diff(bounds))
+
+    # Index of the first minimum / maximum of each bucket
+    kept = [np.array([0, x.size - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extremum = reduce.reduceat(y, starts)
+        hits = np.flatnonzero(y == extremum[bucket_of_point])
+        _, first = np.unique(bucket_of_point[hits], return_index=True)
+        kept.append(hits[first])
+    return np.unique(np.concatenate(kept))
+
+
+def lttb(x, y, number_of_points):
+    """
+    Return the indices of the points kept by the Largest-Triangle-Three-Buckets decimation (number_of_points points).
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if number_of_points >= x.size or number_of_points < 3:
+        return np.arange(x.size)
+    bounds = np.linspace(1, x.size - 1, number_of_points - 1).astype(np.intp)  # inner buckets, first and last points apart
+    kept = np.empty(number_of_points, dtype=np.intp)
+    kept[0], kept[-1] = 0, x.size - 1
+    for k in range(number_of_points - 2):
+        start, end = bounds[k], max(bounds[k + 1], bounds[k] + 1)
+        next_start, next_end = end, max(bounds[k + 2] if k + 2 < bounds.size else x.size, end + 1)
+        next_x, next_y = np.mean(x[next_start:next_end]), np.mean(y[next_start:next_end])
+        previous = kept[k]
+        # Twice the area of the triangles (previous point, candidate, average of the next bucket)
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        kept[k + 1] = start + int(np.argmax(areas))
+    return kept
+
+
+def decimate(x, y, width=1000, method='minmax', x_start=None, x_end=None):
+    """
+    Return the decimated (x, y) arrays of a waveform for a plot of width pixels.
+
+    Args:
+        x ([float]): x values, ex: TimePoints (sorted for the x_start/x_end selection)
+        y ([float]): y values, ex: DataPoints
+        width (int): width of the plot in pixels (number of buckets)
+        method (str): 'minmax' (keeps peaks) or 'lttb'
+        x_start (float): start of the visible x range (default: first point)
+        x_end (float): end of the visible x range (default: last point)
+    """
+    if method not in METHODS:
+        raise ValueError("unknown decimation method {0!r}, expected one of {1}".format(method, METHODS))
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if (x_start is not None or x_end is not None) and _is_sorted(x):
+        # Visible part, with one more point on each side so that the line reaches the plot borders
+        first = 0 if x_start is None else max(0, int(np.searchsorted(x, x_start, side='left')) - 1)
+        last = x.size if x_end is None else min(x.size, int(np.searchsorted(x, x_end, side='right')) + 1)
+        x, y = x[first:last], y[first:last]
+    if x.size <= 2 * width + 2:
+        return x, y
+    kept = minmax(x, y, width) if method == 'minmax' else lttb(x, y, 2 * width)
+    return x[kept], y[kept]
+
+
+def zoomable_line(figure, x, y, width=None, method='minmax', **line_kwargs):
+    """
+    Add a decimated line to a Bokeh figure and return its renderer.
+
+    When the document is served by a Bokeh server (bokeh serve script.py), the line is decimated again from
+    the full-resolution arrays each time the x range changes (zoom, pan, reset). In a standalone HTML page
+    or a notebook, the decimated line of the whole waveform is shown.
+
+    Args:
+        figure: Bokeh figure
+        x, y ([float]): full-resolution waveform
+        width (int): number of buckets (default: width of the figure in pixels)
+        method (str): 'minmax' or 'lttb'
+        line_kwargs: arguments of figure.line(), ex: legend_label, color, line_width
+    """
+    from bokeh.io import curdoc
+    from bokeh.models import ColumnDataSource
+
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    width = width or figure.width or 1000
+    x_plot, y_plot = decimate(x, y, width, method)
+    source = ColumnDataSource(data={'x': x_plot, 'y': y_plot})
+    renderer = figure.line('x', 'y', source=source, **line_kwargs)
+
+    if curdoc().session_context is not None:  # Python callbacks only run in a Bokeh server
+        def update(attribute, old, new):
+            x_start, x_end = figure.x_range.start, figure.x_range.end
+            x_plot, y_plot = decimate(x, y, width, method, x_start, x_end)
+            source.data = {'x': x_plot, 'y': y_plot}
+        figure.x_range.on_change('start', update)
+        figure.x_range.on_change('end', update)
+    return renderer
@@ -17,6 +17,7 @@ from tkinter import *
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 import matplotlib.animation as animation
+from signal_view import JobSignals
 
 # variables
 is_on_1 = False
@@ -85,23 +86,27 @@ def initialisation_graphe():
     return ax1,ax2,fig,ln_I, ln_I_PV,ln_I_AFE,ln_I_charge,ln_I_bat,ln_V,ln_V_PV,ln_V_AFE,ln_V_charge,ln_V_bat
 def calcul():
     status = job.Run()
+    # Chaque signal est converti une seule fois en tableau float64, le temps est partagé
+    signals = JobSignals(job)
     # Current data
-    I_AFE = np.array(job.GetSignalByName('Sc3:I_AFE - Instantaneous Current').DataPoints)
-    I_PV = np.array(job.GetSignalByName('Sc3:I_PV - Instantaneous Current').DataPoints)
-    I_BATT = np.array(job.GetSignalByName('Sc3:I_BATT - Instantaneous Current').DataPoints)
-    I_LOAD = np.array(job.GetSignalByName('Sc3:I_LOAD - Instantaneous Current').DataPoints)
+    I_AFE = signals.data('Sc3:I_AFE - Instantaneous Current')
+    I_PV = signals.data('Sc3:I_PV - Instantaneous Current')
+    I_BATT = signals.data('Sc3:I_BATT - Instantaneous Current')
+    I_LOAD = signals.data('Sc3:I_LOAD - Instantaneous Current')
     # Voltage data
-    V_AFE = np.array(job.GetSignalByName('Sc3:V_AFE - Instantaneous Voltage').DataPoints)
-    V_PV = np.array(job.GetSignalByName('Sc3:V_PV - Instantaneous Voltage').DataPoints)
-    V_BATT = np.array(job.GetSignalByName('Sc3:V_BAT - Instantaneous Voltage').DataPoints)
-    V_LOAD = np.array(job.GetSignalByName('Sc3:V_LOAD - Instantaneous Voltage').DataPoints)
+    V_AFE = signals.data('Sc3:V_AFE - Instantaneous Voltage')
+    V_PV = signals.data('Sc3:V_PV - Instantaneous Voltage')
+    V_BATT = signals.data('Sc3:V_BAT - Instantaneous Voltage')
+    V_LOAD = signals.data('Sc3:V_LOAD - Instantaneous Voltage')
     #Time
-    t = np.array(job.TimePoints)
+    t = signals.time()
     # soc
-    soc = np.array(job.GetSignalByName('Sc5:mesure_soc - Instantaneous Current').DataPoints)
+    soc = signals.data('Sc5:mesure_soc - Instantaneous Current')
     soc_filtre = round(soc[-1]*100,0)
     variable_soc = str(soc_filtre)+'%'
     label_soc['text']=variable_soc
+    # Le job est réutilisé au pas suivant : on libère le cache avant d'effacer les scopes
+    signals.clear()
     job.ClearScopesData()
     return [t,I_AFE,I_PV,I_BATT,I_LOAD,V_AFE,V_PV,V_BATT,V_LOAD]
 def Charge_1():
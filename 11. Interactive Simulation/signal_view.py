@@ -0,0 +1,129 @@
+"""
+NumPy views of the signals of a SIMBA job.
+
+job.GetSignalByName(name).DataPoints returns a new sequence each time it is read, and converting
+it with np.array(...) in several places of a script copies the same data several times. JobSignals
+converts each signal of a job only once, when it is first used, into a contiguous float64 array:
+
+ - the data of each signal is cached by name,
+ - the time points are only converted when they are used, and signals recorded on the same time
+   base share a single time array,
+ - dispose() releases the arrays and the job together.
+
+Usage:
+    job = design.TransientAnalysis.NewJob()
+    job.Run()
+    with JobSignals(job) as signals:
+        peak_voltage = signals.data('R1 - Voltage').max()
+        time, current = signals['L1 - Current']    # SignalView, unpacks to (time, data)
+    # job disposed and arrays released here
+"""
+
+import numpy as np
+
+
+def _to_array(points):
+    return np.ascontiguousarray(np.asarray(points, dtype=np.float64))
+
+
+class SignalView:
+    """
+    Time and data arrays of a signal, converted once on first access.
+    """
+
+    def __init__(self, job_signals, name):
+        self._job_signals = job_signals
+        self.name = name
+
+    @property
+    def data(self):
+        return self._job_signals.data(self.name)
+
+    @property
+    def time(self):
+        return self._job_signals.time(self.name)
+
+    def __iter__(self):  # time, data = view
+        yield self.time
+        yield self.data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class JobSignals:
+    """
+    Cache of the signals of a job as NumPy arrays.
+
+    Args:
+        job: SIMBA job which has been run
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self._signals = {}      # name -> SIMBA signal
+        self._data = {}         # name -> data array
+        self._time = {}         # name -> time array (shared between signals with the same time base)
+        self._time_bases = []   # distinct time arrays already converted
+
+    def signal(self, name):
+        """
+        Return the SIMBA signal name (fetched once).
+        """
+        if self.job is None:
+            raise RuntimeError("the job has been disposed")
+        if name not in self._signals:
+            self._signals[name] = self.job.GetSignalByName(name)
+        return self._signals[name]
+
+    def data(self, name):
+        """
+        Return the data points of the signal name as a float64 array (converted once).
+        """
+        if name not in self._data:
+            self._data[name] = _to_array(self.signal(name).DataPoints)
+        return self._data[name]
+
+    def time(self, name=None):
+        """
+        Return the time points of the signal name (or of the job if name is None) as a float64 array.
+        Signals recorded on the same time base share the same array.
+        """
+        if name not in self._time:
+            points = self.job.TimePoints if name is None else self.signal(name).TimePoints
+            self._time[name] = self._shared_time_base(_to_array(points))
+        return self._time[name]
+
+    def __getitem__(self, name):
+        return SignalView(self, name)
+
+    def clear(self):
+        """
+        Forget the converted arrays, ex: before job.ClearScopesData() or before the job is run again.
+        """
+        self._signals.clear()
+        self._data.clear()
+        self._time.clear()
+        self._time_bases.clear()
+
+    def dispose(self):
+        """
+        Release the arrays and dispose the job.
+        """
+        self.clear()
+        if self.job is not None:
+            self.job.Dispose()
+            self.job = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.dispose()
+
+    def _shared_time_base(self, time_points):
+        for time_base in self._time_bases:
+            if time_base.shape == time_points.shape and np.array_equal(time_base, time_points):
+                return time_base  # the new copy is released
+        self._time_bases.append(time_points)
+        return time_points
@@ -0,0 +1,137 @@
+"""
+Adaptive refinement of a 2D map of operating points (ex: efficiency map vs speed and current).
+
+A uniform grid simulates as many points where the map is flat as where it varies quickly. AdaptiveGrid
+starts from a coarse grid (one point every coarse_step points of the final grid) and divides a cell in
+four only when:
+ - the values at its corners differ by more than tolerance (large gradient), or
+ - a value at one of its corners differs by more than interpolation_tolerance from the value which was
+   interpolated there from the parent cell (the linear interpolation is not accurate enough), or
+ - some of its corners are valid and others are not (failed or unachievable points): the limit of the
+   operating area is refined.
+Refinement stops at the resolution of the final grid. The points of each refinement step are returned
+together, so that they can be simulated as one batch by the existing pool.
+
+Usage:
+    grid = AdaptiveGrid(speed_refs, current_refs, coarse_step=4)
+    points = grid.initial_points()
+    while points:
+        for number in points:
+            speed_ref, current_ref = grid.point(number)
+            grid.set_value(number, simulate(speed_ref, current_ref))   # NaN if failed
+        points = grid.refine(tolerance=0.005)
+"""
+
+import numpy as np
+
+
+class AdaptiveGrid:
+    """
+    Cells of a rectangular grid refined where the values vary.
+
+    Args:
+        x_values ([float]): x values of the final grid (ex: speed references)
+        y_values ([float]): y values of the final grid (ex: current references)
+        coarse_step (int): the initial grid has one point every coarse_step points of the final grid,
+            ex: 2 ** number_of_refinement_levels. With 1, all the points of the final grid are initial points.
+    """
+
+    def __init__(self, x_values, y_values, coarse_step=4):
+        self.x_values = np.asarray(x_values, dtype=np.float64)
+        self.y_values = np.asarray(y_values, dtype=np.float64)
+        self.values = {}        # point number -> value (NaN for failed or unachievable points)
+        self._predictions = {}  # point number -> value interpolated from the parent cell
+        x_nodes = self._coarse_nodes(self.x_values.size, coarse_step)
+        y_nodes = self._coarse_nodes(self.y_values.size, coarse_step)
+        # cells: (i0, i1, j0, j1), indices of the corners in the final grid
+        self._cells = [(i0, i1, j0, j1) for i0, i1 in zip(x_nodes[:-1], x_nodes[1:])
+                       for j0, j1 in zip(y_nodes[:-1], y_nodes[1:])]
+        self._initial_points = [self.number(i, j) for j in y_nodes for i in x_nodes]
+
+    @staticmethod
+    def _coarse_nodes(size, coarse_step):
+        nodes = list(range(0, size, max(1, int(coarse_step))))
+        if nodes[-1] != size - 1:
+            nodes.append(size - 1)  # last point of the final grid is always a node
+        return nodes
+
+    @property
+    def size(self):
+        """
+        Number of points of the final grid (maximum number of simulations).
+        """
+        return self.x_values.size * self.y_values.size
+
+    def number(self, i, j):
+        """
+        Return the number of the point (i, j) of the final grid, in [0, size).
+        """
+        return j * self.x_values.size + i
+
+    def point(self, number):
+        """
+        Return the (x, y) values of a point.
+        """
+        j, i = divmod(number, self.x_values.size)
+        return float(self.x_values[i]), float(self.y_values[j])
+
+    def initial_points(self):
+        """
+        Return the numbers of the points of the coarse grid.
+        """
+        return [number for number in self._initial_points if number not in self.values]
+
+    def set_value(self, number, value):
+        """
+        Set the value of a point (NaN or None for a failed or unachievable point).
+        """
+        self.values[number] = float('nan') if value is None else float(value)
+
+    def _needs_refinement(self, cell, tolerance, interpolation_tolerance, refine_boundary):
+        i0, i1, j0, j1 = cell
+        corners = [self.number(i, j) for i in (i0, i1) for j in (j0, j1)]
+        values = np.array([self.values.get(number, np.nan) for number in corners])
+        valid = ~np.isnan(values)
+        if not valid.all():
+            return refine_boundary and valid.any()
+        if values.max() - values.min() > tolerance:
+            return True
+        return any(abs(self.values[number] - self._predictions[number]) > interpolation_tolerance
+                   for number in corners if number in self._predictions)
+
+    def refine(self, tolerance, interpolation_tolerance=None, refine_boundary=True):
+        """
+        Divide the cells which need it and return the numbers of the new points to evaluate (empty list when done).
+
+        Args:
+            tolerance (float): maximum difference between the values at the corners of a cell
+            interpolation_tolerance (float): maximum error of the interpolation from the parent cell. Default: tolerance.
+            refine_boundary (bool): if True, cells with both valid and invalid corners are refined
+        """
+        if interpolation_tolerance is None:
+            interpolation_tolerance = tolerance
+        cells, new_points = [], {}
+        for cell in self._cells:
+            i0, i1, j0, j1 = cell
+            if (i1 - i0 <= 1 and j1 - j0 <= 1) or not self._needs_refinement(cell, tolerance, interpolation_tolerance, refine_boundary):
+                cells.append(cell)
+                continue
+            im, jm = (i0 + i1) // 2, (j0 + j1) // 2
+            x_splits = [(i0, im), (im, i1)] if i1 - i0 > 1 else [(i0, i1)]
+            y_splits = [(j0, jm), (jm, j1)] if j1 - j0 > 1 else [(j0, j1)]
+            cells.extend((a0, a1, b0, b1) for a0, a1 in x_splits for b0, b1 in y_splits)
+            # New points and their values interpolated (bilinear) from the corners of the cell
+            corner_values = {(i, j): self.values[self.number(i, j)] for i in (i0, i1) for j in (j0, j1)}
+            for i in sorted({i0, im, i1}):
+                for j in sorted({j0, jm, j1}):
+                    number = self.number(i, j)
+                    if number in self.values or number in new_points:
+                        continue
+                    u, v = (i - i0) / (i1 - i0), (j - j0) / (j1 - j0)
+                    new_points[number] = ((1 - u) * (1 - v) * corner_values[(i0, j0)] + u * (1 - v) * corner_values[(i1, j0)]
+                                          + (1 - u) * v * corner_values[(i0, j1)] + u * v * corner_values[(i1, j1)])
+        self._cells = cells
+        for number, prediction in new_points.items():
+            if not np.isnan(prediction):
+                self._predictions[number] = prediction
+        return sorted(new_points)
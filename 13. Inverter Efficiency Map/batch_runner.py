@@ -0,0 +1,117 @@
+"""
+Run the points of a sweep by batches in a multiprocessing pool.
+
+With pool.imap, every operating point is a separate task: its arguments and its result are pickled
+and exchanged with the worker process one by one. For short simulations this overhead is not
+negligible. run_batched() sends a block of points to a worker, which simulates them in sequence with
+its already loaded design and returns all the results in one NumPy array.
+
+The block size adapts to the measured duration of the simulations: blocks of about
+target_batch_time seconds are sent, and smaller ones at the end of the sweep so that all processes
+finish together.
+
+Usage:
+    def run_point(Lr, Cr, fin, sim_number):    # module-level function, returns a tuple of floats
+        ...
+        return (sim_number, vout)
+
+    for sim_number, vout in batch_runner.run_batched(pool, run_point, pool_args, number_of_parallel_simulations):
+        ...
+"""
+
+import math
+import queue
+import time
+import numpy as np
+
+
+def run_batch(function, batch):
+    """
+    Run function(*args) for each args of the batch in the current worker process.
+
+    Returns:
+        (float, numpy.ndarray): duration of the batch [s] and the results (one row per point)
+    """
+    start_time = time.perf_counter()
+    results = np.array([function(*args) for args in batch], dtype=float)
+    return time.perf_counter() - start_time, results
+
+
+class AdaptiveBatchSize:
+    """
+    Batch size computed from the average duration of one point.
+
+    Args:
+        target_batch_time (float): targeted duration of a batch [s]
+        max_batch_size (int): maximum number of points per batch
+        smoothing (float): weight of the last measurement in the average duration of one point
+    """
+
+    def __init__(self, target_batch_time=2.0, max_batch_size=100, smoothing=0.3):
+        self.target_batch_time = target_batch_time
+        self.max_batch_size = max_batch_size
+        self.smoothing = smoothing
+        self.time_per_point = None      # unknown until the first batch is done
+
+    def update(self, batch_size, duration):
+        """
+        Record the duration [s] of a batch of batch_size points.
+        """
+        time_per_point = duration / max(1, batch_size)
+        if self.time_per_point is None:
+            self.time_per_point = time_per_point
+        else:
+            self.time_per_point += self.smoothing * (time_per_point - self.time_per_point)
+
+    def size(self, remaining_points, number_of_workers):
+        """
+        Return the size of the next batch.
+        """
+        if self.time_per_point is None:
+            return 1  # first batches: measure the duration of one point
+        size = int(self.target_batch_time / max(self.time_per_point, 1e-6))
+        tail_size = math.ceil(remaining_points / (2 * number_of_workers))  # balance the end of the sweep
+        return max(1, min(size, tail_size, self.max_batch_size))
+
+
+def run_batched(pool, function, work_items, number_of_workers, target_batch_time=2.0, max_batch_size=100):
+    """
+    Run function(*args) for each args of work_items in pool, by batches, and yield the results as soon as
+    their batch is done (not in the order of work_items).
+
+    Args:
+        pool (multiprocessing.Pool): pool of processes
+        function (function): module-level function which returns a tuple of floats (same length for all points)
+        work_items ([tuple]): arguments of each point, dispatched in this order
+        number_of_workers (int): number of processes of the pool
+        target_batch_time (float): targeted duration of a batch [s]
+        max_batch_size (int): maximum number of points per batch
+
+    Yields:
+        numpy.ndarray: result row of each point
+    """
+    work_items = list(work_items)
+    batch_size = AdaptiveBatchSize(target_batch_time, max_batch_size)
+    done_batches = queue.Queue()
+    max_in_flight = 2 * number_of_workers  # keep processes busy while the next batch sizes are computed
+    next_item = 0
+    in_flight = 0
+
+    while next_item < len(work_items) or in_flight > 0:
+        while in_flight < max_in_flight and next_item < len(work_items):
+            size = batch_size.size(len(work_items) - next_item, number_of_workers)
+            batch = work_items[next_item:next_item + size]
+            next_item += size
+            in_flight += 1
+            pool.apply_async(run_batch, (function, batch),
+                             callback=lambda result, size=size: done_batches.put((size, result, None)),
+                             error_callback=lambda error: done_batches.put((0, None, error)))
+
+        size, result, error = done_batches.get()
+        in_flight -= 1
+        if error is not None:
+            raise error
+        duration, rows = result
+        batch_size.update(size, duration)
+        for row in rows:
+            yield row
@@ -0,0 +1,215 @@
+"""
+Continuation sweeps: neighbouring operating points are simulated one after the other in the same job.
+
+Calling job.Run() again after a parameter change continues the simulation from the previous state (see the
+example "32. Modify Parameter During Simulation"). Starting each operating point from the steady state of a
+neighbouring point avoids most of the startup transient:
+ - order_chains() orders the operating points into chains of neighbours (nearest neighbour first). A new
+   chain, and a new job, is started when the next point is too far from the previous one,
+ - ContinuationSweep applies the parameters of a point, runs the job by blocks of points_per_run time points
+   and computes the average of the monitored signals over each block. The point is in steady state when the
+   last two changes of the block averages, and the change still to come, are below tolerance (relative) plus
+   absolute_tolerance. The change still to come is extrapolated from the decay of the last two changes
+   (first-order transient): a slow drift is not taken for a steady state, whatever the block length,
+ - each point is simulated for at most end_time, by default the end time of the design: a point is measured in the
+   same conditions as when it is simulated alone, from t=0, by a fresh job,
+ - a point which does not reach steady state within max_runs blocks or end_time (or whose simulation fails) is
+   simulated again from a fresh job (fallback). A fresh job is measured at its steady state or at end_time, as a
+   job run with the settings of the design, and the chain continues from it if it reached its steady state.
+The scope data are cleared before each point: the signals read by measure() only contain the current point.
+
+Usage:
+    def apply(design, fsw):
+        design.Circuit.GetDeviceByName('C1').Frequency = fsw
+
+    def measure(job):
+        return job.GetSignalByName('IGBT1 - Junction Temperature (°)').DataPoints[-1]
+
+    sweep = ContinuationSweep(design, apply, measure, ['IGBT1 - Junction Temperature (°)'], points_per_run=5000)
+    results = sweep.run([(fsw,) for fsw in fsw_list], coordinates=numpy.log10(fsw_list), max_step=0.5)
+"""
+
+import numpy as np
+
+
+def order_chains(coordinates, max_step=None, max_length=None):
+    """
+    Order operating points into chains of neighbours and return the chains as lists of point indices.
+
+    Args:
+        coordinates (array): coordinates of the points, shape (number of points,) or (number of points, dimensions).
+            Scale them so that a unit distance has the same meaning in all the dimensions.
+        max_step (float): a new chain is started when the nearest remaining point is farther than max_step
+        max_length (int): maximum number of points per chain (ex: to share the chains between processes)
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    if coordinates.ndim == 1:
+        coordinates = coordinates[:, None]
+    remaining = np.ones(len(coordinates), dtype=bool)
+    chains = []
+    while remaining.any():
+        current = int(np.lexsort(coordinates[remaining].T[::-1])[0])  # lowest remaining point starts the chain
+        current = int(np.flatnonzero(remaining)[current])
+        chain = [current]
+        remaining[current] = False
+        while remaining.any() and (max_length is None or len(chain) < max_length):
+            distances = np.linalg.norm(coordinates - coordinates[current], axis=1)
+            distances[~remaining] = np.inf
+            nearest = int(np.argmin(distances))
+            if max_step is not None and distances[nearest] > max_step:
+                break
+            chain.append(nearest)
+            remaining[nearest] = False
+            current = nearest
+        chains.append(chain)
+    return chains
+
+
+class ContinuationSweep:
+    """
+    Simulate chains of operating points, each chain in one job.
+
+    Args:
+        design: SIMBA design
+        apply (function): apply(design, *parameters) sets the parameters of an operating point
+        measure (function): measure(job) returns the results of the operating point (None if it failed)
+        monitored_signals ([str]): names of the signals which must be in steady state before measuring
+        points_per_run (int): number of time points simulated by each job.Run() (block)
+        tolerance (float): maximum change of the block average of the monitored signals in steady state, relative to the average
+        absolute_tolerance (float or [float]): maximum change added to the relative one, for each monitored signal
+            or for all of them (needed for signals whose average is close to 0)
+        max_runs (int): maximum number of blocks per point before the fallback to a fresh job
+        max_runs_fresh (int): maximum number of blocks per point simulated from a fresh job (startup transient)
+        end_time (float): maximum simulated time of each point [s]. None: end time of the design (as a fresh job).
+    """
+
+    def __init__(self, design, apply, measure, monitored_signals, points_per_run=5000, tolerance=1e-3,
+                 absolute_tolerance=0.0, max_runs=20, max_runs_fresh=100, end_time=None):
+        if not monitored_signals:
+            raise ValueError("at least one monitored signal is needed to detect the steady state")
+        self.design = design
+        self.apply = apply
+        self.measure = measure
+        self.monitored_signals = list(monitored_signals)
+        self.points_per_run = points_per_run
+        self.tolerance = tolerance
+        self.absolute_tolerance = np.broadcast_to(np.asarray(absolute_tolerance, dtype=np.float64), (len(self.monitored_signals),))
+        self.max_runs = max_runs
+        self.max_runs_fresh = max_runs_fresh
+        self.end_time = end_time
+        self.log = []  # one dict per point: index, fresh_job, runs, simulated_time, steady_state
+
+    def _block_averages(self, job, start_time):
+        """
+        Return the time-average of each monitored signal from start_time, and the first and last time points of the block.
+        """
+        averages, first_time, last_time = [], np.inf, -np.inf
+        for name in self.monitored_signals:
+            signal = job.GetSignalByName(name)
+            t = np.asarray(signal.TimePoints, dtype=np.float64)
+            d = np.asarray(signal.DataPoints, dtype=np.float64)
+            inside = t >= start_time
+            t, d = t[inside], d[inside]
+            if t.size == 0:
+                averages.append(np.nan)
+                continue
+            first_time, last_time = min(first_time, t[0]), max(last_time, t[-1])
+            if t[-1] > t[0]:
+                averages.append(np.dot(np.diff(t), d[1:] + d[:-1]) / 2 / (t[-1] - t[0]))
+            else:
+                averages.append(d[-1])
+        return np.array(averages), first_time, last_time
+
+    def _steady(self, history):
+        """
+        Return True if the block averages of the last three blocks show a steady state.
+        """
+        if len(history) < 3:
+            return False
+        change_1, change_2 = history[-2] - history[-3], history[-1] - history[-2]
+        limit = self.tolerance * np.abs(history[-1]) + self.absolute_tolerance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.abs(change_2) / np.abs(change_1)
+            # Changes in the same direction: transient decaying by ratio per block, the change still to come is
+            # change_2 * (ratio + ratio**2 + ...). Not decaying: drift. Changes of opposite signs: ripple around the steady state.
+            same_direction = change_1 * change_2 > 0
+            remaining = np.where(same_direction, np.where(ratio < 1, np.abs(change_2) * ratio / (1 - ratio), np.inf), 0.0)
+        settled = (np.abs(change_1) <= limit) & (np.abs(change_2) <= limit) & (remaining <= limit)
+        noise = np.abs(change_1) + np.abs(change_2) <= 0.1 * limit  # changes too small to tell a drift from the noise
+        return bool(np.all(settled | noise))
+
+    def _settle(self, job, max_runs, start_time, max_time):
+        """
+        Run the job by blocks until the monitored signals are in steady state, for at most max_runs blocks and
+        max_time after start_time (time of the job when the point is applied).
+        Returns (steady state reached, number of blocks, time of the job at the end of the point).
+        """
+        history, block_start, last_time = [], -np.inf, start_time
+        for runs in range(1, max_runs + 1):
+            status = job.Run()
+            if str(status) != "OK":
+                return False, runs, last_time
+            averages, block_first, block_last = self._block_averages(job, block_start)
+            if block_last < block_first:
+                return False, runs, last_time  # the job does not progress (end time reached)
+            last_time = block_last
+            history.append(averages)
+            if self._steady(history):
+                return True, runs, last_time
+            if last_time - start_time >= max_time * (1 - 1e-9):
+                return False, runs, last_time
+            block_start = np.nextafter(block_last, np.inf)
+        return False, max_runs, last_time
+
+    def run(self, parameters, coordinates=None, max_step=None, max_length=None):
+        """
+        Simulate the operating points and return their results in the order of parameters (None for failed points).
+
+        Args:
+            parameters ([tuple]): parameters of each operating point, passed to apply(design, *parameters)
+            coordinates (array): coordinates of the points used to build the chains (default: parameters)
+            max_step (float): maximum distance between two consecutive points of a chain (see order_chains)
+            max_length (int): maximum number of points per chain
+        """
+        parameters = [tuple(p) for p in parameters]
+        chains = order_chains(parameters if coordinates is None else coordinates, max_step, max_length)
+        transient_analysis = self.design.TransientAnalysis
+        settings = (transient_analysis.StopAtSteadyState, transient_analysis.NumberOfPointsToSimulate, transient_analysis.EndTime)
+        point_time = float(transient_analysis.EndTime) if self.end_time is None else self.end_time
+        transient_analysis.StopAtSteadyState = False
+        transient_analysis.NumberOfPointsToSimulate = self.points_per_run
+        results = [None] * len(parameters)
+
+        def new_job(number_of_points):
+            transient_analysis.EndTime = point_time * (number_of_points + 1)  # time of the remaining points of the chain
+            return transient_analysis.NewJob()
+
+        try:
+            for chain in chains:
+                job, job_time = None, 0.0
+                for position, index in enumerate(chain):
+                    fresh_job = job is None
+                    if fresh_job:
+                        job, job_time = new_job(len(chain) - position), 0.0
+                    else:
+                        job.ClearScopesData()  # the signals only contain the current point
+                    self.apply(self.design, *parameters[index])
+                    steady, runs, end_time = self._settle(job, self.max_runs_fresh if fresh_job else self.max_runs, job_time, point_time)
+                    if not steady and not fresh_job:  # fallback: simulate the point from a fresh job
+                        job.Dispose()
+                        job, job_time = new_job(len(chain) - position), 0.0
+                        fresh_job = True
+                        steady, runs, end_time = self._settle(job, self.max_runs_fresh, job_time, point_time)
+                    simulated_time, job_time = end_time - job_time, end_time
+                    self.log.append({'index': index, 'fresh_job': fresh_job, 'runs': runs,
+                                     'steady_state': steady, 'simulated_time': simulated_time})
+                    if steady or (fresh_job and simulated_time >= point_time * (1 - 1e-9)):  # fresh job: measured at end_time as a job run alone
+                        results[index] = self.measure(job)
+                    if not steady:  # do not continue the chain from a point which is not in steady state
+                        job.Dispose()
+                        job = None
+                if job is not None:
+                    job.Dispose()
+        finally:
+            transient_analysis.StopAtSteadyState, transient_analysis.NumberOfPointsToSimulate, transient_analysis.EndTime = settings
+        return results
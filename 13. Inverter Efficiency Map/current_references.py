@@ -0,0 +1,145 @@
+"""
+Vectorized Id, Iq current references of a PMSM: MTPA (Maximum Torque Per Ampere) and flux weakening.
+
+current_references() computes the references of whole arrays of (current, speed) operating points at once
+and returns a feasibility mask instead of a status per point:
+ - below the corner speed, the current vector follows the MTPA trajectory (closed-form angle, Ld != Lq supported),
+ - above, the current vector is at the intersection of the current limit circle (|i| = current) and of the
+   voltage limit ellipse ((flux + Ld id)^2 + (Lq iq)^2 = (voltage_limit / electrical speed)^2). Without stator
+   resistance, this intersection is the root of a quadratic equation in id (closed form). With a stator
+   resistance, the voltage limit is no longer an ellipse centered on the d axis and the intersection is found
+   with vectorized Newton iterations on the angle of the current vector, starting from the lossless solution.
+An operating point is not feasible when the voltage limit cannot be met with the requested current.
+
+Source: S. Morimoto, Y. Takeda, T. Hirasa and K. Taniguchi, "Expansion of operating limits for permanent magnet motor by
+current vector control considering inverter capacity," in IEEE Transactions on Industry Applications, vol. 26, no. 5,
+pp. 866-871, Sept.-Oct. 1990, doi: 10.1109/28.60058.
+
+Usage:
+    speed_grid, current_grid = numpy.meshgrid(speed_refs, current_refs)
+    id_refs, iq_refs, feasible = current_references(current_grid, speed_grid, voltage_limit=bus_voltage / 2,
+                                                    flux=PM_Wb, Ld=Ld_H, Lq=Lq_H, pole_pairs=NPP)
+"""
+
+import numpy as np
+
+
+def mtpa_angle(current, flux, Ld, Lq):
+    """
+    Return the MTPA angle [rad] of the current vector from the q axis (id = -current * sin(angle), iq = current * cos(angle)).
+
+    Args:
+        current (array): amplitude of the current vector [A]
+        flux (float): permanent magnet flux [Wb]
+        Ld (float): d-axis inductance [H]
+        Lq (float): q-axis inductance [H]
+    """
+    current = np.asarray(current, dtype=np.float64)
+    if abs(Ld - Lq) <= 1.0e-8:  # non-salient machine: the current is on the q axis
+        return np.zeros(current.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sine = (-flux + np.sqrt(flux ** 2 + 8 * (Lq - Ld) ** 2 * current ** 2)) / (4.0 * (Lq - Ld) * current)
+    return np.where(current > 0, np.arcsin(np.clip(np.nan_to_num(sine), -1.0, 1.0)), 0.0)
+
+
+def _voltage(id_, iq, electrical_speed, flux, Ld, Lq, resistance):
+    """
+    Return the d and q steady-state voltages [V].
+    """
+    vd = resistance * id_ - electrical_speed * Lq * iq
+    vq = resistance * iq + electrical_speed * (flux + Ld * id_)
+    return vd, vq
+
+
+def _flux_weakening_lossless(current, electrical_speed, voltage_limit, flux, Ld, Lq, id_mtpa):
+    """
+    Return id at the intersection of the current circle and of the voltage ellipse, between the MTPA point and
+    the negative d axis (NaN if they do not intersect there). id is a root of:
+    (Ld^2 - Lq^2) id^2 + 2 flux Ld id + flux^2 + Lq^2 current^2 - (voltage_limit / electrical_speed)^2 = 0
+    When both roots are valid, the largest one (least flux weakening current) is used.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = Ld ** 2 - Lq ** 2
+        b = 2 * flux * Ld
+        c = flux ** 2 + (Lq * current) ** 2 - (voltage_limit / electrical_speed) ** 2
+        discriminant = b ** 2 - 4 * a * c
+        q = -(b + np.sqrt(discriminant)) / 2  # numerically stable roots c / q and q / a (b > 0)
+        roots = [c / q, q / a if a != 0 else np.full(q.shape, np.nan)]
+    id_ = np.full(np.shape(current), np.nan)
+    for root in roots:
+        valid = (root >= -current) & (root <= id_mtpa) & ~(root <= id_)
+        id_ = np.where(valid, root, id_)
+    return id_
+
+
+def current_references(current, speed, voltage_limit, flux, Ld, Lq, pole_pairs, resistance=0.0,
+                       tolerance=1e-9, max_iterations=20):
+    """
+    Calculate the Id and Iq references of arrays of operating points with the MTPA and flux weakening algorithm.
+
+    Args:
+        current (array): amplitude of the current vector [A], limit of the current circle
+        speed (array): mechanical speed [RPM]. Broadcast with current.
+        voltage_limit (float): maximum amplitude of the phase voltage [V] (ex: bus voltage / 2)
+        flux (float): permanent magnet flux [Wb]
+        Ld (float): d-axis inductance [H]
+        Lq (float): q-axis inductance [H]
+        pole_pairs (float): number of pole pairs
+        resistance (float): stator resistance [Ohm]. If 0, the closed-form lossless solution is used.
+        tolerance (float): tolerance on the angle of the current vector of the Newton iterations [rad]
+        max_iterations (int): maximum number of Newton iterations
+
+    Returns:
+        tuple: id, iq [A] and feasible (bool) arrays. id and iq are NaN where the point is not feasible.
+    """
+    current, speed = np.broadcast_arrays(np.asarray(current, dtype=np.float64), np.asarray(speed, dtype=np.float64))
+    electrical_speed = np.abs(speed) / 60 * 2 * np.pi * pole_pairs
+
+    # MTPA (Mode 1): valid while the voltage at the MTPA point is within the voltage limit (below the corner speed)
+    beta = mtpa_angle(current, flux, Ld, Lq)
+    id_mtpa = -current * np.sin(beta)
+    iq_mtpa = current * np.cos(beta)
+    vd, vq = _voltage(id_mtpa, iq_mtpa, electrical_speed, flux, Ld, Lq, resistance)
+    mtpa = np.hypot(vd, vq) < voltage_limit
+
+    # Flux weakening (Mode 2): intersection of the current circle and of the voltage limit
+    id_fw = _flux_weakening_lossless(current, electrical_speed, voltage_limit, flux, Ld, Lq, id_mtpa)
+    if resistance != 0:
+        id_fw = _flux_weakening_newton(current, electrical_speed, voltage_limit, flux, Ld, Lq, resistance,
+                                       id_fw, beta, tolerance, max_iterations)
+    iq_fw = np.sqrt(np.maximum(current ** 2 - id_fw ** 2, 0.0))
+
+    id_ref = np.where(mtpa, id_mtpa, id_fw)
+    iq_ref = np.where(mtpa, iq_mtpa, iq_fw)
+    feasible = ~np.isnan(id_ref)
+    return id_ref, iq_ref, feasible
+
+
+def _flux_weakening_newton(current, electrical_speed, voltage_limit, flux, Ld, Lq, resistance, id_start, beta,
+                           tolerance, max_iterations):
+    """
+    Return id at the intersection of the current circle and of the voltage limit with a stator resistance
+    (NaN if there is no intersection between the MTPA angle and the negative d axis).
+    Newton iterations on the angle gamma of the current vector from the q axis: |v(gamma)|^2 = voltage_limit^2.
+    """
+    with np.errstate(invalid='ignore'):
+        gamma = np.arcsin(np.clip(-id_start / np.where(current > 0, current, 1.0), 0.0, 1.0))
+    gamma = np.where(np.isnan(gamma), beta, np.maximum(gamma, beta))  # start from the lossless solution if it exists
+    for _ in range(max_iterations):
+        id_, iq = -current * np.sin(gamma), current * np.cos(gamma)
+        vd, vq = _voltage(id_, iq, electrical_speed, flux, Ld, Lq, resistance)
+        # derivatives with respect to gamma (did = -iq, diq = id)
+        dvd = -resistance * iq - electrical_speed * Lq * id_
+        dvq = resistance * id_ - electrical_speed * Ld * iq
+        slope = 2 * (vd * dvd + vq * dvq)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(slope != 0, (vd ** 2 + vq ** 2 - voltage_limit ** 2) / slope, 0.0)
+        new_gamma = np.clip(gamma - step, beta, np.pi / 2)
+        converged = np.all(np.abs(new_gamma - gamma) < tolerance)
+        gamma = new_gamma
+        if converged:
+            break
+    id_ = -current * np.sin(gamma)
+    vd, vq = _voltage(id_, current * np.cos(gamma), electrical_speed, flux, Ld, Lq, resistance)
+    on_limit = np.abs(np.hypot(vd, vq) - voltage_limit) <= 1e-6 * voltage_limit
+    return np.where(on_limit, id_, np.nan)
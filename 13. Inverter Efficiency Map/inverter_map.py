@@ -7,13 +7,19 @@ Make sure to run 'pip install -r requirements.txt' to ensure you have the requir
 ##### Requires aesim.simba version 2022.12.13 or higher #####
 """
 
-import multiprocessing, os
-import math
+import multiprocessing, os, math
 import numpy as np
-import pandas as pd
 from tqdm import tqdm
-from aesim.simba import ProjectRepository, License
+from aesim.simba import License
 from datetime import datetime
+import sweep_worker
+import shared_results
+import batch_runner
+import adaptive_map
+import current_references
+import continuation_sweep
+from result_cache import ResultCache
+from sweep_writer import SweepWriter
 
 
 #############################
@@ -27,11 +33,18 @@ bus_voltage = 600.0;            # Bus Voltage [V]
 max_speed_ref = 4000            # RPM
 max_current_ref = 15.0          # A
 
-number_of_speed_points = 10     # Total number of simulations is number_of_speed_points * number_of_current_points
-number_of_current_points = 10   # Total number of simulations is number_of_speed_points * number_of_current_points
+number_of_speed_points = 10     # Resolution of the map: at most number_of_speed_points * number_of_current_points simulations
+number_of_current_points = 10   # Resolution of the map: at most number_of_speed_points * number_of_current_points simulations
+refinement_levels = 2           # adaptive map: initial grid with one point every 2**refinement_levels points, refined where needed (0: uniform grid)
+efficiency_tolerance = 0.005    # adaptive map: cells are refined if the efficiency varies more than this (gradient or interpolation error)
 relative_minimum_speed = 0.2    # fraction of max_speed_ref
 relative_minimum_current = 0.2  # fraction of max_torque_ref
 simulation_time = 0.4           # time simulated in each run
+use_cache = True                # if true, results are cached on disk and already simulated points are skipped
+use_continuation = False        # if true, neighbouring operating points are simulated in the same job (see continuation_sweep.py)
+continuation_max_step = 0.25    # continuation: maximum distance between consecutive points of a chain (speed and current relative to their maximum)
+continuation_points_per_run = 10000  # continuation: time points simulated between two steady state checks
+continuation_tolerance = 1e-3   # continuation: maximum relative change of the average losses, input power and torque in steady state
 
 NPP = 5.0;                      # PMSM Number of pole pair
 PM_Wb = 0.0802;                 # PMSM Ke/NPP
@@ -46,200 +59,297 @@ if os.environ.get("SIMBA_SCRIPT_TEST"): # Accelerate simulation in test environm
 #############################
 #           METHODS         #
 #############################
-def run_simulation(id_ref, iq_ref, speed_ref, case_temperature, Rg, sim_number, result_dict, lock):
+def configure_design(design):
     """
-    Run SIMBA Simulation of the design "Full Design" and place the results in "result_dict"
+    Apply the settings shared by all operating points. Called once per process by sweep_worker.
+
+    :param: design, SIMBA design "1-Full Design"
+    """
+    # inverter settings
+    design.Circuit.SetVariableValue("fsw", str(switching_frequency))
+    design.Circuit.SetVariableValue("Vbus", str(bus_voltage))
+
+    # motor settings
+    design.Circuit.SetVariableValue("PM_Wb", str(PM_Wb))
+    design.Circuit.SetVariableValue("Npp", str(NPP))
+    design.Circuit.SetVariableValue("Ld", str(Ld_H))
+    design.Circuit.SetVariableValue("Lq", str(Lq_H))
+    design.Circuit.GetDeviceByName("PMSM1").Rs = str(Rs)
+    design.TransientAnalysis.EndTime = simulation_time
+
+
+def init_process(project_path, lock, results_handle):
+    """
+    Pool initializer: load the project and attach the process to the shared result table
+    """
+    sweep_worker.init_worker(project_path, lock, configure_design)
+    shared_results.init_worker(results_handle)
+
+
+def run_simulation(id_ref, iq_ref, speed_ref, case_temperature, Rg, sim_number):
+    """
+    Run SIMBA Simulation of the design "Full Design" and place the results in the shared result table (row sim_number)
+    The project is loaded once per process by sweep_worker.init_worker (pool initializer).
 
     :param: id_ref, d-axis current refereance[A]
     :param: iq_ref, q-axis current refereance[A]    
     :param: speed_ref, Speed Reference [RPM]
     :param: case_temperature, Case Temperature [Celsius]
     :param: Rg, Gate Resistance [Ohm]
-    :param: sim_number, Simulation Number. Used for log purpose [N.m]
-    :param: result_dict, Thread safedictionnary used to store results [N.m]
-    :param: lock, Mutex. Used to avoid race conditions.
+    :param: sim_number, Simulation Number. Row of the shared result table
     """
+    result = simulate_operating_point(id_ref, iq_ref, speed_ref, case_temperature, Rg, sim_number)
+    if result is not None:
+        shared_results.write(sim_number, result)
+    return sim_number
 
-    log = False # if true, log simulation results
 
-    # Read the jsimba file
-    with lock:
-        script_folder = os.path.realpath(os.path.dirname(__file__))
-        project = ProjectRepository(os.path.join(script_folder , "inverter_map.jsimba"))
-    
-    simba_full_design = project.GetDesignByName('1-Full Design')
+def simulate_operating_point(id_ref, iq_ref, speed_ref, case_temperature, Rg, sim_number):
+    """
+    Simulate one operating point with the design loaded by sweep_worker.init_worker.
+    Returns (total_inverter_losses, torque, speed, efficiency) or None if the simulation failed.
+    """
 
-    # Set Test Target Data
-    # operating point
-    simba_full_design.Circuit.SetVariableValue("rpm", str(speed_ref))
-    simba_full_design.Circuit.SetVariableValue("idref", str(id_ref))
-    simba_full_design.Circuit.SetVariableValue("iqref", str(iq_ref))
-    simba_full_design.Circuit.SetVariableValue("Tcase", str(case_temperature))
-    
-    # inverter settings
-    simba_full_design.Circuit.SetVariableValue("fsw", str(switching_frequency))
-    simba_full_design.Circuit.SetVariableValue("Vbus", str(bus_voltage))
+    log = False # if true, log simulation results
 
-    # motor settings
-    simba_full_design.Circuit.SetVariableValue("PM_Wb", str(PM_Wb))
-    simba_full_design.Circuit.SetVariableValue("Npp", str(NPP))
-    simba_full_design.Circuit.SetVariableValue("Ld", str(Ld_H))
-    simba_full_design.Circuit.SetVariableValue("Lq", str(Lq_H))
-    simba_full_design.Circuit.GetDeviceByName("PMSM1").Rs = str(Rs)
+    # Get the design already loaded by this process
+    simba_full_design = sweep_worker.get_design('1-Full Design')
+    apply_operating_point(simba_full_design, id_ref, iq_ref, speed_ref, case_temperature, Rg)
 
-    # mosfet gate resistances Rgon and Rgoff
-    for i in range(1, 6):
-        simba_full_design.Circuit.GetDeviceByName("T{0}".format(i)).CustomVariables[0].Value = str(Rg)
-        simba_full_design.Circuit.GetDeviceByName("T{0}".format(i)).CustomVariables[1].Value = str(Rg)
-        
     if log: print ("\n{0}> Running Full Model... (Id_ref={1:.2f} A Iq_ref={2:.2f} A speed_ref={3:.2f} RPM)".format(sim_number, id_ref, iq_ref, speed_ref))
 
     # Run Simulation
-    simba_full_design.TransientAnalysis.EndTime = simulation_time
     job = simba_full_design.TransientAnalysis.NewJob()
     status = job.Run()
     
     if str(status) != "OK": 
         print (job.Summary()[:-1])
-        return; # ERROR 
+        job.Dispose()
+        return None; # ERROR 
     if log: print (job.Summary()[:-1])
 
     # Read and return results
-    total_inverter_losses = job.GetSignalByName('Total_losses - Heat Flow').DataPoints[-1]
-    actual_torque = job.GetSignalByName('PMSM1 - Te').DataPoints[-1]
-    actual_speed_rpm = job.GetSignalByName('speed_rpm - Out').DataPoints[-1]
-    input_power = job.GetSignalByName('Input Power:average - Out').DataPoints[-1]
-    if (actual_speed_rpm < 0): return; # ERROR 
+    result = read_operating_point(job)
+    job.Dispose() # free memory, the process is reused for the next operating point
+    if result is None: return None; # ERROR 
+    total_inverter_losses, actual_torque, actual_speed_rpm, efficiency = result
 
     if log: print ('{0}> Total Inverter Losses = {1:.2f}W'.format(sim_number, total_inverter_losses))
-    if log: print ('{0}> Input Power = {1:.2f}W'.format(sim_number, input_power))
     if log: print ('{0}> Actual Torque = {1:.2f}N.m Id Ref = {2:.2f} A Iq Ref = {3:.2f} A'.format(sim_number, actual_torque, id_ref, iq_ref))
     if log: print ('{0}> Actual Speed = {1:.2f}RPM Speed Ref = {2:.2f} RPM'.format(sim_number, actual_speed_rpm, speed_ref))
+    if log: print ('{0}> Efficiency = {1:.2f}%'.format(sim_number, 100*efficiency))
+    return result
+
+
+def apply_operating_point(design, id_ref, iq_ref, speed_ref, case_temperature, Rg):
+    """
+    Set the operating point and the gate resistances of the design
+
+    :param: design, SIMBA design "1-Full Design" returned by sweep_worker.get_design
+    """
+    # operating point
+    sweep_worker.set_variable(design, "rpm", speed_ref)
+    sweep_worker.set_variable(design, "idref", id_ref)
+    sweep_worker.set_variable(design, "iqref", iq_ref)
+    sweep_worker.set_variable(design, "Tcase", case_temperature)
+
+    # mosfet gate resistances Rgon and Rgoff
+    for i in range(1, 6):
+        design.Circuit.GetDeviceByName("T{0}".format(i)).CustomVariables[0].Value = str(Rg)
+        design.Circuit.GetDeviceByName("T{0}".format(i)).CustomVariables[1].Value = str(Rg)
+
+
+def read_operating_point(job):
+    """
+    Read the results of a simulated operating point.
+    Returns (total_inverter_losses, torque, speed, efficiency) or None if the results are not valid.
+    """
+    total_inverter_losses = job.GetSignalByName('Total_losses - Heat Flow').DataPoints[-1]
+    actual_torque = job.GetSignalByName('PMSM1 - Te').DataPoints[-1]
+    actual_speed_rpm = job.GetSignalByName('speed_rpm - Out').DataPoints[-1]
+    input_power = job.GetSignalByName('Input Power:average - Out').DataPoints[-1]
+    if (actual_speed_rpm < 0): return None; # ERROR 
 
     efficiency = 1 - total_inverter_losses / (total_inverter_losses + input_power)
-    if log: print ('{0}> Efficiency = {1:.2f}%  Input Power {2:.2f}W total_inverter_losses  {3:.2f}W'.format(sim_number, 100*efficiency, input_power, total_inverter_losses))
-    result_dict[sim_number] = [total_inverter_losses, actual_torque, actual_speed_rpm, efficiency]
+    return (total_inverter_losses, actual_torque, actual_speed_rpm, efficiency)
 
-def run_simulation_star(args):
+
+def run_chain(chain_args):
+    """
+    Simulate a chain of neighbouring operating points in the same job, each one starting from the steady state
+    of the previous one (see continuation_sweep.py), and place the results in the shared result table.
+    Returns the simulation numbers of the chain.
+
+    :param: chain_args, run_simulation(...) arguments of the operating points, in the order of the chain
+    """
+    simba_full_design = sweep_worker.get_design('1-Full Design')
+    sweep = continuation_sweep.ContinuationSweep(simba_full_design, apply_operating_point, read_operating_point,
+                                                 ['Total_losses - Heat Flow', 'Input Power:average - Out', 'PMSM1 - Te'],
+                                                 points_per_run=continuation_points_per_run, tolerance=continuation_tolerance)
+    chain_results = sweep.run([args[:-1] for args in chain_args], coordinates=np.arange(len(chain_args)))  # keep the order of the chain
+    for args, result in zip(chain_args, chain_results):
+        if result is not None:
+            shared_results.write(args[-1], result)
+    return [args[-1] for args in chain_args]
+
+
+def cache_key(cache, project_path, id_ref, iq_ref, speed_ref, case_temperature, Rg):
+    """
+    Return the key of an operating point in the result cache
+    """
+    parameters = {'rpm': speed_ref, 'idref': id_ref, 'iqref': iq_ref, 'Tcase': case_temperature, 'Rg': Rg,
+                  'fsw': switching_frequency, 'Vbus': bus_voltage, 'PM_Wb': PM_Wb, 'Npp': NPP,
+                  'Ld': Ld_H, 'Lq': Lq_H, 'Rs': Rs}
+    return cache.key(project_path, '1-Full Design', parameters, {'EndTime': simulation_time})
+
+
+def write_result(writer, results, args):
+    """
+    Append the results of an operating point to the result folder
+
+    :param: writer, SweepWriter of the sweep
+    :param: results, shared result table
+    :param: args, run_simulation(...) arguments of the operating point
+    """
+    id_ref, iq_ref, speed_ref, case_temperature, Rg, sim_number = args
+    row = {'sim_number': sim_number, 'id_ref': id_ref, 'iq_ref': iq_ref, 'speed_ref': speed_ref}
+    row.update(zip(results.array.dtype.names, results[sim_number].tolist()))
+    writer.write_scalars(row)
+
+
+def run_points(pool, pool_args, results, writer, cache, project_path):
     """
-    Helper function used to call run_simulation with a single argument
+    Simulate the operating points of pool_args in the pool (points already in the cache are read instead)
+    and write each result as soon as it is available
+
+    :param: pool, processing pool created with init_process
+    :param: pool_args, run_simulation(...) arguments of the operating points
+    :param: results, shared result table
+    :param: writer, SweepWriter of the sweep
+    :param: cache, ResultCache or None
+    :param: project_path, path of the project (part of the cache keys)
     """
-    return run_simulation(*args)
+    # Read the operating points already simulated from the cache: only new or modified points are simulated
+    keys = {}
+    if cache is not None:
+        remaining_args = []
+        for args in pool_args:
+            keys[args[-1]] = cache_key(cache, project_path, *args[:-1])
+            cached_result = cache.get(keys[args[-1]])
+            if cached_result is None:
+                remaining_args.append(args)
+            else:
+                results[args[-1]] = cached_result
+                write_result(writer, results, args)
+        print("{0} operating points read from the cache, {1} to simulate".format(len(pool_args) - len(remaining_args), len(remaining_args)))
+        pool_args = remaining_args
+
+    args_by_number = {args[-1]: args for args in pool_args}
+    if use_continuation:
+        # Neighbouring points (relative speed and current) are chained, one chain per process
+        coordinates = [(args[2] / max_speed_ref, math.hypot(args[0], args[1]) / max_current_ref) for args in pool_args]
+        chains = continuation_sweep.order_chains(coordinates, max_step=continuation_max_step,
+                                                 max_length=max(1, math.ceil(len(pool_args) / number_of_parallel_simulations)))
+        chain_numbers = pool.imap_unordered(run_chain, [[pool_args[k] for k in chain] for chain in chains])
+        sim_numbers = (sim_number for numbers in chain_numbers for sim_number in numbers)
+    else:
+        # Each process simulates the operating points by batches sized from the measured run time
+        sim_numbers = batch_runner.run_batched(pool, run_simulation, pool_args, number_of_parallel_simulations)
+    for sim_number in tqdm(sim_numbers, total=len(pool_args)):
+        sim_number = int(sim_number)
+        if np.isnan(results[sim_number]['efficiency']):
+            continue  # failed simulation
+        # Write and cache each result as soon as it is available
+        write_result(writer, results, args_by_number[sim_number])
+        if cache is not None:
+            cache.put(keys[sim_number], dict(zip(results.array.dtype.names, results[sim_number].tolist())))
 
 
-def SelectIdIq(ref_idiq, current_ref, speed_ref):
+def select_id_iq(current_refs, speed_refs):
     """
-    Calculate Id and Iq references calculated with MTPA and flux weakening algorithm.
+    Calculate Id and Iq references with MTPA and flux weakening algorithm for arrays of operating points (see current_references.py).
     Source: S. Morimoto, Y. Takeda, T. Hirasa and K. Taniguchi, "Expansion of operating limits for permanent magnet motor by current vector control considering inverter capacity," in IEEE Transactions on Industry Applications, vol. 26, no. 5, pp. 866-871, Sept.-Oct. 1990, doi: 10.1109/28.60058.
     Args:
-        ref_idiq ([float, float]): Used to store the Id&Iq references calculated by this function
-        current_ref (float): current reference
-        speed_ref (float): speed reference
+        current_refs ([float]): current references
+        speed_refs ([float]): speed references [RPM]
 
     Returns:
-        boolean: True if success, False is this point is not achieveble
-    """
-    ret = False
-    Vdc_V = bus_voltage
-    Ia_A = current_ref
-    speed_rpm = speed_ref
-
-    Vo_V = Vdc_V/2.0
-    speed_radpsec = speed_rpm/60*2*math.pi
-    		
-    Beta_MTPA_rad = 0.0
-    if abs(Ld_H - Lq_H) > 1.0e-8:
-        nume = -PM_Wb + math.sqrt(PM_Wb**2 + 8 * (Lq_H - Ld_H)**2  * Ia_A**2)
-        deno = 4.0*(Lq_H - Ld_H)*Ia_A
-        Beta_MTPA_rad = math.asin(nume/deno) 
-    
-    id_MTPA_A = -1.0* Ia_A * math.sin(Beta_MTPA_rad) 
-    iq_MTPA_A = Ia_A * math.cos(Beta_MTPA_rad)
-    
-    Flux_Wb = math.sqrt( math.pow(PM_Wb+Ld_H*id_MTPA_A,2) + math.pow(Lq_H*iq_MTPA_A,2))
-    corner_speed_radpsec_mech = ( Vo_V/Flux_Wb) / NPP 
-    speed_radpsec_elec = speed_radpsec*NPP
-        
-    if speed_radpsec < corner_speed_radpsec_mech:
-    #% MTPA (Mode 1)
-        ref_idiq[0] = id_MTPA_A
-        ref_idiq[1] = iq_MTPA_A
-        ret = True
-    else :
-    #	% Flux weakening (Mode 2)
-        iq_FW_A = iq_MTPA_A
-        for i in range(100):
-            iq_A_old = iq_FW_A;
-            if (math.pow(Vo_V/speed_radpsec_elec, 2) -math.pow(Lq_H*iq_FW_A,2) ) < 0.0:
-                continue
-            
-            id_FW_A = (-1.0*PM_Wb + math.sqrt( math.pow(Vo_V/speed_radpsec_elec, 2) -math.pow(Lq_H*iq_FW_A,2) ) )/Ld_H
-            if(Ia_A*Ia_A - id_FW_A*id_FW_A < 0.0):
-                continue
-            iq_FW_A = math.sqrt(Ia_A*Ia_A - id_FW_A*id_FW_A)
-            if math.fabs(iq_FW_A -iq_A_old) < 1.0e-3 :
-                ref_idiq[0] = id_FW_A
-                ref_idiq[1] = iq_FW_A	
-                ret = True
-                break
-    return ret
-            
+        tuple: Id references, Iq references and feasible arrays (False if the point is not achievable)
+    """
+    return current_references.current_references(current_refs, speed_refs, voltage_limit=bus_voltage/2.0, flux=PM_Wb,
+                                                  Ld=Ld_H, Lq=Lq_H, pole_pairs=NPP)
+
 #############################
 #         MAIN SCRIPT       #
 #############################
 
-# Distribute and run the calculations. Results are saved in result_dict
+# Distribute and run the calculations. Results are saved in the shared result table
 if __name__ == "__main__": # Called only in main thread. It confirms that the code is under main function
 
+    script_folder = os.path.realpath(os.path.dirname(__file__))
+    project_path = os.path.join(script_folder, "inverter_map.jsimba")
+    # Results are written in the folder map_<date> as they arrive (inverter_map_plot.py can read it during the sweep).
+    # The writer is created first: a folder written with other parameters is refused before any process is started.
+    timestamp = datetime.now().strftime("%Y-%m-%d")
+    writer = SweepWriter(os.path.join(script_folder, "map_" + timestamp))
+    writer.write_metadata(
+        {'case_temperature': case_temperature,
+         'Rg': Rg,
+         'switching_frequency': switching_frequency,
+         'bus_voltage': bus_voltage,
+         'max_speed_ref': max_speed_ref,
+         'max_current_ref': max_current_ref,
+         'refinement_levels': refinement_levels,
+         'efficiency_tolerance': efficiency_tolerance})
+
     #initialization
     min_speed_ref = relative_minimum_speed * max_speed_ref;
     min_current_ref = relative_minimum_current * max_current_ref;
     
     speed_refs = np.arange(min_speed_ref, max_speed_ref, (max_speed_ref - min_speed_ref)/number_of_speed_points).tolist()
     current_refs = np.arange(min_current_ref, max_current_ref, (max_current_ref - min_current_ref)/number_of_current_points).tolist()
-    
-    manager = multiprocessing.Manager()
-    result_dict = manager.dict()
-    i=0
-    jobs=[]
-    lock = manager.Lock()
-    pool_args = []
-
-    # Create the run_simulation(...) arguments for each scenario
-    for current_ref in current_refs:
-        for speed_ref in speed_refs:
-            
-            ref_idiq = [0.0, 0.0]
-            ret = SelectIdIq(ref_idiq, current_ref, speed_ref)
-            
-            if ret == True:
-                pool_args.append((ref_idiq[0], ref_idiq[1], speed_ref, case_temperature, Rg,  i, result_dict, lock));
-                i=i+1
-
-    # Create and start the processing pool
-    pool = multiprocessing.Pool(number_of_parallel_simulations)
-    for _ in tqdm(pool.imap(run_simulation_star, pool_args), total=len(pool_args)):
-        pass
-
-    # plot the efficency map
-    t = []
-    s = []
-    e = []
-    for i in result_dict.items():
-        t.append(i[1][1])
-        s.append(i[1][2])
-        e.append(i[1][3])
-
-    # Store results and parameters in dataframes
-    data = pd.DataFrame({'torque': t, 'speed': s, 'efficiency': e}, index=None)
-    parameters = pd.Series(
-        {'case_temperature': case_temperature,
-         'Rg': Rg,
-         'switching_frequency': switching_frequency,
-         'bus_voltage': bus_voltage,
-         'max_speed_ref': max_speed_ref,
-         'max_current_ref': max_current_ref})
-    script_folder = os.path.realpath(os.path.dirname(__file__))
-    timestamp = datetime.now().strftime("%Y-%m-%d")
-    data.to_pickle(os.path.join(script_folder, "map_data_" + timestamp + ".pkl"))
-    parameters.to_pickle(os.path.join(script_folder, "map_parameters_" + timestamp + ".pkl"))
+
+    # Operating points are simulated on a coarse grid first, then only where the efficiency varies (see adaptive_map.py)
+    grid = adaptive_map.AdaptiveGrid(speed_refs, current_refs, coarse_step=2**refinement_levels)
+
+    # Id, Iq references of all the points of the final grid, computed at once (point number = j * number_of_speed_points + i)
+    speed_grid, current_grid = np.meshgrid(speed_refs, current_refs)
+    id_refs, iq_refs, feasible = select_id_iq(current_grid.ravel(), speed_grid.ravel())
+    print("{0} achievable operating points out of {1}".format(np.count_nonzero(feasible), feasible.size))
+
+    results = shared_results.SharedResults([('total_inverter_losses', 'f8'), ('torque', 'f8'),
+                                            ('speed', 'f8'), ('efficiency', 'f8')], grid.size)  # one row per point of the final grid
+
+    cache = ResultCache(os.path.join(script_folder, "simulation_cache")) if use_cache else None
+
+    # Create and start the processing pool. Each process loads the project only once.
+    pool = multiprocessing.Pool(number_of_parallel_simulations, initializer=init_process,
+                                initargs=(project_path, multiprocessing.Lock(), results.handle()))
+
+    try:
+        # Create the run_simulation(...) arguments of each new point, simulate them and refine the grid
+        points = grid.initial_points()
+        while points:
+            pool_args = []
+            for sim_number in points:
+                speed_ref = grid.point(sim_number)[0]
+                if feasible[sim_number]:
+                    pool_args.append((id_refs[sim_number], iq_refs[sim_number], speed_ref, case_temperature, Rg, sim_number))
+                else:
+                    grid.set_value(sim_number, None)  # operating point not achievable
+            run_points(pool, pool_args, results, writer, cache, project_path)
+            for args in pool_args:
+                grid.set_value(args[-1], results[args[-1]]['efficiency'])  # NaN if the simulation failed
+            points = grid.refine(efficiency_tolerance)
+        print("{0} operating points evaluated for a {1}x{2} map".format(len(grid.values), len(speed_refs), len(current_refs)))
+
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        if use_cache:
+            cache.close()
+        writer.close()
+        results.close()
@@ -0,0 +1,183 @@
+"""
+Distributed version of inverter_map.py: the operating points are simulated by workers running on
+one or several computers, so that the sweep is not limited by the parallel simulation licenses of a
+single machine.
+
+The main script publishes one job descriptor per operating point to a job broker (see sweep_broker.py).
+Workers pull the jobs, simulate them and stream the results back to the broker. The jobs of a lost
+worker are delivered again to the other workers. The results are written in the folder map_distributed_<date>
+(plot them with: python inverter_map_plot.py distributed_<date>).
+
+Usage:
+    python inverter_map_distributed.py                                # broker + local workers (this computer only)
+    python inverter_map_distributed.py --listen 0.0.0.0               # broker accepting workers from other computers
+    python inverter_map_distributed.py --worker broker-host           # additional workers on another computer
+
+The worker computers need a copy of this folder (scripts and .jsimba file). When other computers take part, the
+broker and the workers must share a secret authentication key (environment variable SIMBA_SWEEP_AUTHKEY): the
+messages are pickled, anyone knowing the key can run code on the broker. Without --listen, the broker only
+accepts connections from this computer and uses a random key.
+
+##### Requires aesim.simba version 2022.12.13 or higher #####
+"""
+
+import argparse
+import secrets, sys
+import multiprocessing, os
+import numpy as np
+from tqdm import tqdm
+from datetime import datetime
+import inverter_map
+import sweep_worker
+from sweep_broker import SweepBroker, run_worker
+from sweep_writer import SweepWriter
+
+
+#############################
+#   DISTRIBUTION PARAMETERS #
+#############################
+broker_port = 6000                                                        # TCP port of the broker
+authkey_variable = "SIMBA_SWEEP_AUTHKEY"                                  # environment variable of the key shared by the broker and the workers
+lease_time = 600.0                                                        # maximum time [s] to simulate one operating point before it is delivered to another worker
+worker_timeout = 300.0                                                    # time [s] without any connected worker after which the remaining operating points are reported as failed
+number_of_local_workers = inverter_map.number_of_parallel_simulations     # workers started on the broker computer
+
+script_folder = os.path.realpath(os.path.dirname(__file__))
+_worker_lock = None         # lock shared by the worker processes of this computer (opening the project)
+_project_loaded = False     # True once this worker process has loaded the project
+
+
+#############################
+#           METHODS         #
+#############################
+def run_descriptor(descriptor):
+    """
+    Simulate the operating point described by a job descriptor. The project is loaded once per worker process.
+
+    :param: descriptor, {'project': .jsimba file name, 'design': design name, 'parameters': {...}}
+    """
+    global _project_loaded
+    if not _project_loaded:
+        project_path = os.path.join(script_folder, descriptor['project'])
+        sweep_worker.init_worker(project_path, _worker_lock, configure=inverter_map.configure_design)
+        _project_loaded = True
+
+    parameters = descriptor['parameters']
+    return inverter_map.simulate_operating_point(parameters['idref'], parameters['iqref'], parameters['rpm'],
+                                                 parameters['Tcase'], parameters['Rg'], parameters['sim_number'])
+
+
+def worker_main(address, authkey, lock):
+    """
+    Worker process: pull and simulate jobs until the broker stops
+    """
+    global _worker_lock
+    _worker_lock = lock
+    run_worker(address, authkey, run_descriptor)
+
+
+def read_authkey():
+    """
+    Return the authentication key defined by the environment variable SIMBA_SWEEP_AUTHKEY (exit if not defined)
+    """
+    key = os.environ.get(authkey_variable)
+    if not key:
+        sys.exit("Define the secret key shared by the broker and the workers in the environment variable " + authkey_variable)
+    return key.encode()
+
+
+def run_workers(host, port, number_of_workers, authkey):
+    """
+    Start number_of_workers worker processes connected to the broker running on host and wait for them
+    """
+    lock = multiprocessing.Lock()
+    workers = [multiprocessing.Process(target=worker_main, args=((host, port), authkey, lock)) for _ in range(number_of_workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def job_descriptors():
+    """
+    Return the job descriptors of all the operating points of the map (same points as inverter_map.py)
+    """
+    min_speed_ref = inverter_map.relative_minimum_speed * inverter_map.max_speed_ref
+    min_current_ref = inverter_map.relative_minimum_current * inverter_map.max_current_ref
+    speed_refs = np.arange(min_speed_ref, inverter_map.max_speed_ref, (inverter_map.max_speed_ref - min_speed_ref)/inverter_map.number_of_speed_points).tolist()
+    current_refs = np.arange(min_current_ref, inverter_map.max_current_ref, (inverter_map.max_current_ref - min_current_ref)/inverter_map.number_of_current_points).tolist()
+
+    speed_grid, current_grid = np.meshgrid(speed_refs, current_refs)
+    id_refs, iq_refs, feasible = inverter_map.select_id_iq(current_grid.ravel(), speed_grid.ravel())
+
+    descriptors = []
+    for id_ref, iq_ref, speed_ref in zip(id_refs[feasible], iq_refs[feasible], speed_grid.ravel()[feasible]):
+        descriptors.append({'project': "inverter_map.jsimba",
+                            'design': '1-Full Design',
+                            'parameters': {'rpm': float(speed_ref), 'idref': float(id_ref), 'iqref': float(iq_ref),
+                                           'Tcase': inverter_map.case_temperature, 'Rg': inverter_map.Rg,
+                                           'sim_number': len(descriptors)}})
+    return descriptors
+
+
+#############################
+#         MAIN SCRIPT       #
+#############################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed inverter efficiency map")
+    parser.add_argument("--worker", metavar="HOST", help="run workers connected to the broker running on HOST")
+    parser.add_argument("--listen", metavar="HOST", default="localhost",
+                        help="interface of the broker (ex: 0.0.0.0 to accept workers from other computers, default: localhost)")
+    parser.add_argument("--workers", type=int, default=number_of_local_workers, help="number of worker processes")
+    args = parser.parse_args()
+
+    if args.worker:  # worker computer
+        run_workers(args.worker, broker_port, args.workers, read_authkey())
+
+    else:  # broker computer
+        # Results are written in the folder map_distributed_<date> as they arrive, in the same format as inverter_map.py.
+        # The folder is not shared with inverter_map.py: the operating points are not numbered in the same way.
+        # The writer is created first: a folder written with other parameters is refused before any worker is started.
+        timestamp = datetime.now().strftime("%Y-%m-%d")
+        writer = SweepWriter(os.path.join(script_folder, "map_distributed_" + timestamp))
+        writer.write_metadata(
+            {'case_temperature': inverter_map.case_temperature,
+             'Rg': inverter_map.Rg,
+             'switching_frequency': inverter_map.switching_frequency,
+             'bus_voltage': inverter_map.bus_voltage,
+             'max_speed_ref': inverter_map.max_speed_ref,
+             'max_current_ref': inverter_map.max_current_ref})
+
+        # Workers of other computers need the shared key. A random key is enough for the local workers.
+        authkey = secrets.token_bytes(32) if args.listen == "localhost" else read_authkey()
+        broker = SweepBroker((args.listen, broker_port), authkey=authkey, lease_time=lease_time)
+        descriptors = job_descriptors()
+        for job_id, descriptor in enumerate(descriptors):
+            broker.submit(job_id, descriptor)
+
+        # Local workers: the map can be computed on a single computer. Other computers may join at any time.
+        local_host = 'localhost' if args.listen in ('', '0.0.0.0', 'localhost') else args.listen
+        lock = multiprocessing.Lock()
+        local_workers = []
+        try:
+            for _ in range(args.workers):
+                worker = multiprocessing.Process(target=worker_main, args=((local_host, broker_port), authkey, lock))
+                worker.start()
+                local_workers.append(worker)
+
+            for job_id, result in tqdm(broker.results(worker_timeout=worker_timeout), total=len(descriptors)):
+                if result is None:
+                    print("Operating point {0} failed: {1}".format(job_id, broker.failures.get(job_id, "simulation error")))
+                    continue
+                parameters = descriptors[job_id]['parameters']
+                row = {'sim_number': job_id, 'id_ref': parameters['idref'], 'iq_ref': parameters['iqref'], 'speed_ref': parameters['rpm']}
+                row.update(zip(['total_inverter_losses', 'torque', 'speed', 'efficiency'], result))
+                writer.write_scalars(row)
+        finally:
+            writer.close()
+            broker.close()
+            for worker in local_workers:
+                worker.join(5)  # idle workers stop at their next request
+                if worker.is_alive():  # still simulating an operating point which is no longer needed
+                    worker.terminate()
+                    worker.join()
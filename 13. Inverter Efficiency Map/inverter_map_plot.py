@@ -1,40 +1,43 @@
 #%% Load modules
 import matplotlib as mpl
 import matplotlib.pyplot as plt
-import matplotlib.tri as tri
-from scipy.spatial import ConvexHull
 import numpy as np
 from datetime import datetime
 import pandas as pd
-import os
+import argparse, os
+import sweep_writer
+from map_surrogate import MapSurrogate
+from map_rendering import MapMesh
 
 COLOR = 'black'
 
 #%% Heatmap plot function
-def show_heatmap(x, y, z, parameters):
+def show_heatmap(x, y, z, parameters, surrogate=None, mesh=None):
     """
-    Show the efficiency points and add a contour plot for efficiency values
+    Show the efficiency points and add a contour plot for efficiency values.
+    If a surrogate (MapSurrogate) is given, the contour plot shows its prediction inside the simulated area
+    instead of a linear interpolation of the triangulated points.
+    The triangulation and the interpolation grid of the points (MapMesh) can be given to reuse them for several fields.
     """
-    # Create grid values first.
-    xi, yi = np.linspace(x.min(), x.max(), 100), np.linspace(y.min(), y.max(), 100)
-
-    # Linearly interpolate the data (x, y) on a grid defined by (xi, yi).
-    triang = tri.Triangulation(x, y)
-    interpolator = tri.LinearTriInterpolator(triang, z)
-    Xi, Yi = np.meshgrid(xi, yi)
-    zi = interpolator(Xi, Yi)
+    if mesh is None:
+        mesh = MapMesh(x, y)
+    if surrogate is not None:
+        xi, yi = mesh.grid(resolution=100)[:2]
+        Xi, Yi = np.meshgrid(xi, yi)
+        zi = np.ma.masked_where(~surrogate.inside(Xi, Yi), surrogate(Xi, Yi))
+    else:
+        # Linearly interpolate the data (x, y) on a 100x100 grid (weights computed once per mesh).
+        xi, yi, zi = mesh.interpolate(z, resolution=100)
     fig, (ax1) = plt.subplots(nrows=1)
     
     # Creating outer plot
-    points = np.column_stack((x, y))
-    hull = ConvexHull(points)
-    ax1.plot(points[hull.vertices,0], points[hull.vertices,1], color=COLOR, linestyle='dashed', lw=2)
+    mesh.plot_hull(ax1, color=COLOR, linestyle='dashed', lw=2)
 
     cntr1 = ax1.contourf(xi, yi, zi, levels=100, cmap="PiYG")
 
     fig.colorbar(cntr1, ax=ax1)
-    ax1.plot(x, y, color=COLOR, linestyle='none', marker='o', ms=1)
-    ax1.set(xlim=(0, x.max()), ylim=(0, y.max()))
+    mesh.plot_points(ax1, color=COLOR, linestyle='none', marker='o', ms=1)
+    ax1.set(xlim=(0, np.max(x)), ylim=(0, np.max(y)))
     ax1.set_xlabel("Speed [RPM]")
     ax1.set_ylabel("Torque [N.m]")
     ax1.set_title("Inverter Losses [W]\nRg = {0:.0f} Ω, Fsw ={1:.0f} kHz, Vbus = {2:.0f} V, T_case = {3:.0f} °C".format(parameters['Rg'], parameters['switching_frequency']/1e3, parameters['bus_voltage'], parameters['case_temperature']))
@@ -42,10 +45,50 @@ def show_heatmap(x, y, z, parameters):
     return fig
 
 
+#%% Load function
+def load_map(script_folder, date):
+    """
+    Load the results and the parameters of the map computed on date (YYYY-MM-DD).
+    Results written by inverter_map.py in the folder map_<date> can be read while the sweep is running (partial map).
+    When the sweep was run several times in the same folder, the last result of each operating point is used.
+    Maps saved as map_data_<date>.pkl / map_parameters_<date>.pkl by previous versions are also supported.
+    """
+    folder = os.path.join(script_folder, 'map_' + date)
+    if os.path.isdir(folder):
+        data = sweep_writer.read_scalars(folder)
+        if 'sim_number' in data:
+            data = data.drop_duplicates('sim_number', keep='last').reset_index(drop=True)
+        return data, pd.Series(sweep_writer.read_metadata(folder))
+    data = pd.read_pickle(os.path.join(script_folder, 'map_data_' + date + '.pkl'))
+    parameters = pd.read_pickle(os.path.join(script_folder, 'map_parameters_' + date + '.pkl'))
+    return data, parameters
+
+
 #%% Load data, parameters and plot heatmap
-script_folder = os.path.realpath(os.path.dirname(__file__))
-data = pd.read_pickle(os.path.join(script_folder, 'map_data_2024-05-02.pkl'))
-parameters = pd.read_pickle(os.path.join(script_folder, 'map_parameters_2024-05-02.pkl'))
-fig = show_heatmap(data['speed'], data['torque'], data['efficiency'], parameters)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plot an inverter efficiency map")
+    parser.add_argument("date", nargs='?', default='2024-05-02', help="date of the map (YYYY-MM-DD)")
+    parser.add_argument("--surrogate", action='store_true',
+                        help="fit a surrogate model of the map, save it in surrogate_<date>.npz, print the points to simulate next and plot its prediction")
+    args = parser.parse_args()    # ex: python inverter_map_plot.py 2024-05-02 --surrogate
+
+    script_folder = os.path.realpath(os.path.dirname(__file__))
+    data, parameters = load_map(script_folder, args.date)
+    print("{0} operating points loaded".format(len(data)))
+
+    surrogate = None
+    if args.surrogate:
+        # Surrogate model of the map, saved for fast queries by other studies (see map_surrogate.py)
+        surrogate = MapSurrogate.fit(data['speed'], data['torque'], data['efficiency'])
+        surrogate.save(os.path.join(script_folder, 'surrogate_' + args.date + '.npz'))
+
+        # Operating points where the surrogate is the least accurate: candidates for the next simulations
+        speed_next, torque_next = surrogate.suggest_points(5)
+        _, std_next = surrogate.predict(speed_next, torque_next, return_std=True)
+        print("Operating points with the largest uncertainty:")
+        for speed, torque, std in zip(speed_next, torque_next, std_next):
+            print("  speed = {0:.0f} RPM, torque = {1:.2f} N.m: efficiency std = {2:.2e}".format(speed, torque, std))
+
+    fig = show_heatmap(data['speed'], data['torque'], data['efficiency'], parameters, surrogate)
 
-plt.show()
\ No newline at end of file
+    plt.show()
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Render the efficiency and loss maps of all the maps of this folder to PNG files, in parallel processes.
+
+The maps are the folders map_<date> written by inverter_map.py and the files map_data_<date>.pkl saved by
+previous versions. Each map is rendered by one process: its triangulation and interpolation grid are built
+once (see map_rendering.py) and reused for all its fields. The images are saved in the folder report.
+Maps which cannot be rendered (ex: fewer than 3 distinct or aligned operating points) are skipped and reported.
+
+Usage:
+    python inverter_map_report.py                          # all the maps of the folder
+    python inverter_map_report.py 2024-05-02 2024-06-12    # selected maps
+"""
+
+#%% Load modules
+import os, sys, re
+import matplotlib
+matplotlib.use('Agg')  # images are only saved to files
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+from map_rendering import MapMesh, render_batch
+from inverter_map_plot import load_map
+
+script_folder = os.path.realpath(os.path.dirname(__file__))
+report_folder = os.path.join(script_folder, 'report')
+fields = [('efficiency', 'Efficiency', 'PiYG'),                    # (column, title, colormap)
+          ('total_inverter_losses', 'Inverter Losses [W]', 'coolwarm')]
+
+
+#%% Methods
+def map_dates(folder):
+    """
+    Return the dates of the maps saved in the folder (map_<date> folders and map_data_<date>.pkl files).
+    """
+    dates = set()
+    for name in os.listdir(folder):
+        match = re.fullmatch(r'map_(?:data_)?(\d{4}-\d{2}-\d{2})(\.pkl)?', name)
+        if match and (match.group(2) or os.path.isdir(os.path.join(folder, name))):
+            dates.add(match.group(1))
+    return sorted(dates)
+
+
+def render_map(date):
+    """
+    Render all the fields of the map computed on date to report/map_<date>.png.
+    Returns (path of the image, None), or (None, reason) if the map cannot be rendered.
+    """
+    data, parameters = load_map(script_folder, date)
+    try:
+        mesh = MapMesh(data['speed'], data['torque'])  # triangulation shared by all the fields of the map
+    except (KeyError, ValueError) as e:  # no results, not enough operating points or aligned points
+        return None, "{0}: {1}".format(type(e).__name__, e)
+    available_fields = [field for field in fields if field[0] in data]
+
+    fig = Figure(figsize=(max(7, 6 * len(available_fields)), 5))
+    FigureCanvasAgg(fig)
+    for k, (column, title, cmap) in enumerate(available_fields):
+        ax = fig.add_subplot(1, len(available_fields), k + 1)
+        contours = mesh.contourf(ax, data[column], levels=100, cmap=cmap)
+        fig.colorbar(contours, ax=ax)
+        mesh.plot_hull(ax, color='black', linestyle='dashed', lw=2)
+        mesh.plot_points(ax, color='black', linestyle='none', marker='o', ms=1)
+        ax.set(xlim=(0, np.max(data['speed'])), ylim=(0, np.max(data['torque'])),
+               xlabel="Speed [RPM]", ylabel="Torque [N.m]", title=title)
+    fig.suptitle("Map {0}\nRg = {1:.0f} Ω, Fsw ={2:.0f} kHz, Vbus = {3:.0f} V, T_case = {4:.0f} °C".format(
+        date, parameters['Rg'], parameters['switching_frequency']/1e3, parameters['bus_voltage'], parameters['case_temperature']))
+    fig.tight_layout()
+
+    path = os.path.join(report_folder, 'map_' + date + '.png')
+    fig.savefig(path)
+    return path, None
+
+
+#%% Render the maps in parallel
+if __name__ == "__main__":
+    dates = sys.argv[1:] or map_dates(script_folder)
+    os.makedirs(report_folder, exist_ok=True)
+    for date, (path, reason) in zip(dates, render_batch(render_map, dates)):
+        print(path if path is not None else "Map {0} skipped ({1})".format(date, reason))
@@ -0,0 +1,253 @@
+"""
+Surrogate model of an efficiency map (Gaussian process regression) for fast queries.
+
+The sweep gives scattered (speed, torque, efficiency) points. MapSurrogate fits a Gaussian process on these
+points once (squared exponential kernel, one length scale per input, hyperparameters chosen by maximum
+likelihood) and is then evaluated with matrix products on whole arrays of query points:
+ - predictions between the simulated points, without re-triangulating the map for each plot or study,
+ - the standard deviation of the prediction, large where the points are sparse: the points with the largest
+   uncertainty are suggested as the next operating points to simulate,
+ - the model is saved to a .npz file and loaded without refitting (ex: by drive-cycle studies),
+ - for repeated queries, surrogate(x, y) interpolates (bilinear) a table of the prediction computed once on a
+   fine grid, which is much faster than the exact prediction of predict() and accurate as long as the table
+   resolution is small compared to the length scales of the model.
+The inputs are scaled to [0, 1] with the range of the simulated points. Queries outside the convex hull
+of the simulated points are extrapolations: inside() tells which points are covered by the map.
+The cost of a Gaussian process grows with the cube of the number of points: large maps are subsampled to
+max_points points spread over the map (farthest point sampling), and the hyperparameters are searched on the
+first search_points of them.
+
+Usage:
+    surrogate = MapSurrogate.fit(data['speed'], data['torque'], data['efficiency'])
+    surrogate.save('surrogate_2024-05-02.npz')
+    surrogate = MapSurrogate.load('surrogate_2024-05-02.npz')
+    efficiency = surrogate(speed, torque)                     # fast (lookup table)
+    efficiency, std = surrogate.predict(speed, torque, return_std=True)
+    speed_next, torque_next = surrogate.suggest_points(10)
+"""
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+
+_LENGTH_SCALES = np.geomspace(0.05, 2.0, 12)     # candidate length scales (inputs scaled to [0, 1])
+_NOISE_RATIOS = np.array([1e-8, 1e-6, 1e-4, 1e-2])  # candidate noise variance / signal variance
+
+
+def _cross(u, v):
+    return u[0] * v[1] - u[1] * v[0]
+
+
+def _spread_order(points, count):
+    """
+    Return the indices of count points spread over the points (farthest point sampling): each point is the
+    farthest from the points before it, so that any first k indices are spread over the whole set.
+    """
+    order = [0]
+    distances = ((points - points[0]) ** 2).sum(axis=1)
+    for _ in range(count - 1):
+        order.append(int(np.argmax(distances)))
+        distances = np.minimum(distances, ((points - points[order[-1]]) ** 2).sum(axis=1))
+    return np.array(order)
+
+
+def _convex_hull(points):
+    """
+    Return the vertices of the convex hull of 2D points, counterclockwise (monotone chain).
+    """
+    points = np.unique(points, axis=0)
+    if len(points) < 3:
+        return points
+
+    def half_hull(sorted_points):
+        hull = []
+        for point in sorted_points:
+            while len(hull) >= 2 and _cross(hull[-1] - hull[-2], point - hull[-2]) <= 0:
+                hull.pop()
+            hull.append(point)
+        return hull[:-1]
+
+    return np.array(half_hull(points) + half_hull(points[::-1]))
+
+
+class MapSurrogate:
+    """
+    Gaussian process model of a quantity (ex: efficiency) vs two inputs (ex: speed and torque).
+    Use MapSurrogate.fit() or MapSurrogate.load() to create it.
+    """
+
+    def __init__(self, points, values, lower, upper, length_scales, signal_variance, noise_ratio, mean, table_resolution=512):
+        self.points = np.asarray(points, dtype=np.float64)      # training inputs, scaled to [0, 1]
+        self.values = np.asarray(values, dtype=np.float64)
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+        self.length_scales = np.asarray(length_scales, dtype=np.float64)
+        self.signal_variance = float(signal_variance)
+        self.noise_ratio = float(noise_ratio)
+        self.mean = float(mean)
+        self._cholesky = cho_factor(self._correlation(self.points, self.points) + self.noise_ratio * np.eye(len(self.points)), lower=True)
+        self._weights = cho_solve(self._cholesky, self.values - self.mean)
+        self._hull = _convex_hull(self.points)
+        self.table_resolution = table_resolution
+        self._table = None  # prediction on a table_resolution x table_resolution grid, computed on first call
+
+    @classmethod
+    def fit(cls, x, y, values, max_points=500, search_points=200):
+        """
+        Fit the model on scattered points. NaN values (failed simulations) are ignored.
+
+        Args:
+            x ([float]): first input of the points (ex: speed)
+            y ([float]): second input of the points (ex: torque)
+            values ([float]): value at the points (ex: efficiency)
+            max_points (int): maximum number of points of the model (larger maps are subsampled)
+            search_points (int): number of points used to search the hyperparameters
+        """
+        x, y, values = (np.asarray(a, dtype=np.float64).ravel() for a in (x, y, values))
+        valid = ~(np.isnan(x) | np.isnan(y) | np.isnan(values))
+        raw_points = np.column_stack((x[valid], y[valid]))
+        values = values[valid]
+        if len(values) < 3:
+            raise ValueError("at least 3 valid points are needed to fit the surrogate")
+        lower, upper = raw_points.min(axis=0), raw_points.max(axis=0)
+        points = (raw_points - lower) / np.where(upper > lower, upper - lower, 1.0)
+        if len(values) > search_points:  # points spread over the map first
+            order = _spread_order(points, min(len(values), max_points))
+            points, values = points[order], values[order]
+        mean = values.mean()
+        search = slice(0, min(len(values), search_points))
+        residuals = values[search] - mean
+
+        # Maximum likelihood hyperparameters: the signal variance is profiled out (closed form)
+        best = None
+        squared_distances = [(points[search, None, k] - points[None, search, k]) ** 2 for k in range(2)]
+        for length_x in _LENGTH_SCALES:
+            correlation_x = np.exp(-0.5 * squared_distances[0] / length_x ** 2)
+            for length_y in _LENGTH_SCALES:
+                correlation = correlation_x * np.exp(-0.5 * squared_distances[1] / length_y ** 2)
+                for noise_ratio in _NOISE_RATIOS:
+                    try:
+                        cholesky = np.linalg.cholesky(correlation + noise_ratio * np.eye(len(residuals)))
+                    except np.linalg.LinAlgError:
+                        continue
+                    whitened = solve_triangular(cholesky, residuals, lower=True)
+                    signal_variance = max(whitened @ whitened / len(residuals), 1e-300)
+                    log_likelihood = -0.5 * len(residuals) * np.log(signal_variance) - np.log(np.diag(cholesky)).sum()
+                    if best is None or log_likelihood > best[0]:
+                        best = (log_likelihood, (length_x, length_y), signal_variance, noise_ratio)
+        if best is None:
+            raise ValueError("the surrogate could not be fitted (duplicated points?)")
+        return cls(points, values, lower, upper, best[1], best[2], best[3], mean)
+
+    def _scale(self, x, y):
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        points = (np.column_stack((x.ravel(), y.ravel())) - self.lower) / np.where(self.upper > self.lower, self.upper - self.lower, 1.0)
+        return points, x.shape
+
+    def _correlation(self, a, b):
+        a, b = a / self.length_scales, b / self.length_scales
+        squared_distances = (a ** 2).sum(axis=1)[:, None] + (b ** 2).sum(axis=1)[None, :] - 2 * a @ b.T
+        return np.exp(-0.5 * np.maximum(squared_distances, 0.0))
+
+    def predict(self, x, y, return_std=False, chunk_size=4096):
+        """
+        Return the predicted values at the query points (arrays of any shape), and their standard deviation if return_std.
+        Query points are processed by chunks of chunk_size points to limit the memory used.
+        """
+        points, shape = self._scale(x, y)
+        mean = np.empty(len(points))
+        std = np.empty(len(points)) if return_std else None
+        for start in range(0, len(points), chunk_size):
+            correlation = self._correlation(points[start:start + chunk_size], self.points)
+            mean[start:start + chunk_size] = self.mean + correlation @ self._weights
+            if return_std:
+                explained = (solve_triangular(self._cholesky[0], correlation.T, lower=True) ** 2).sum(axis=0)
+                variance = self.signal_variance * (1 + self.noise_ratio - explained)
+                std[start:start + chunk_size] = np.sqrt(np.maximum(variance, 0.0))
+        if return_std:
+            return mean.reshape(shape), std.reshape(shape)
+        return mean.reshape(shape)
+
+    def __call__(self, x, y):
+        """
+        Return the prediction at the query points interpolated from the table (exact prediction outside the range of the simulated points).
+        """
+        points, shape = self._scale(x, y)
+        if self._table is None:
+            grid = np.linspace(0.0, 1.0, self.table_resolution)
+            grid_x, grid_y = np.meshgrid(grid, grid, indexing='ij')
+            self._table = self.predict(grid_x * (self.upper[0] - self.lower[0]) + self.lower[0],
+                                       grid_y * (self.upper[1] - self.lower[1]) + self.lower[1])
+        position = points * (self.table_resolution - 1)
+        index = np.clip(np.floor(position), 0, self.table_resolution - 2).astype(np.intp)
+        fraction = position - index
+        ix, iy, fx, fy = index[:, 0], index[:, 1], fraction[:, 0], fraction[:, 1]
+        table = self._table
+        values = ((table[ix, iy] * (1 - fx) + table[ix + 1, iy] * fx) * (1 - fy)
+                  + (table[ix, iy + 1] * (1 - fx) + table[ix + 1, iy + 1] * fx) * fy)
+        outside = ((points < 0) | (points > 1)).any(axis=1)
+        if outside.any():
+            values[outside] = self.predict(*(points[outside] * (self.upper - self.lower) + self.lower).T)
+        return values.reshape(shape)
+
+    def inside(self, x, y):
+        """
+        Return True for the query points inside the convex hull of the simulated points (no extrapolation).
+        """
+        points, shape = self._scale(x, y)
+        hull = self._hull
+        if len(hull) < 3:
+            return np.zeros(shape, dtype=bool)
+        edges = np.roll(hull, -1, axis=0) - hull
+        relative = points[:, None, :] - hull[None, :, :]
+        cross = edges[None, :, 0] * relative[:, :, 1] - edges[None, :, 1] * relative[:, :, 0]
+        return (cross >= -1e-12).all(axis=1).reshape(shape)
+
+    def suggest_points(self, number_of_points, resolution=100, x_candidates=None, y_candidates=None):
+        """
+        Return the (x, y) arrays of the points where the prediction is the most uncertain, as new simulations.
+        The points are chosen one by one: each chosen point reduces the uncertainty around it (the standard
+        deviation of a Gaussian process does not depend on the simulated values), so the points are spread out.
+        The variance of the candidates is updated after each chosen point (rank-1 update, no new factorization).
+
+        Args:
+            number_of_points (int): number of points to suggest
+            resolution (int): candidates on a resolution x resolution grid inside the convex hull of the simulated points
+            x_candidates, y_candidates ([float]): candidate points (instead of the grid)
+        """
+        if x_candidates is None:
+            x_grid, y_grid = np.meshgrid(np.linspace(self.lower[0], self.upper[0], resolution),
+                                         np.linspace(self.lower[1], self.upper[1], resolution))
+            covered = self.inside(x_grid, y_grid)
+            x_candidates, y_candidates = x_grid[covered], y_grid[covered]
+        candidates, _ = self._scale(x_candidates, y_candidates)
+        chosen = []
+        whitened = solve_triangular(self._cholesky[0], self._correlation(self.points, candidates), lower=True)
+        variance = 1 - (whitened ** 2).sum(axis=0)  # posterior variance of the candidates / signal variance
+        updates = []                                # rank-1 updates of the posterior covariance
+        for _ in range(min(number_of_points, len(candidates))):
+            best = int(np.argmax(variance))
+            chosen.append(best)
+            covariance = self._correlation(candidates, candidates[best:best + 1])[:, 0] - whitened.T @ whitened[:, best]
+            for update in updates:
+                covariance -= update * update[best]
+            updates.append(covariance / np.sqrt(variance[best] + self.noise_ratio))
+            variance = variance - updates[-1] ** 2
+        chosen = candidates[chosen] * np.where(self.upper > self.lower, self.upper - self.lower, 1.0) + self.lower
+        return chosen[:, 0], chosen[:, 1]
+
+    def save(self, path):
+        """
+        Save the model to a .npz file.
+        """
+        np.savez(path, points=self.points, values=self.values, lower=self.lower, upper=self.upper,
+                 length_scales=self.length_scales, signal_variance=self.signal_variance,
+                 noise_ratio=self.noise_ratio, mean=self.mean)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a model saved with save().
+        """
+        with np.load(path) as data:
+            return cls(data['points'], data['values'], data['lower'], data['upper'], data['length_scales'],
+                       data['signal_variance'], data['noise_ratio'], data['mean'])
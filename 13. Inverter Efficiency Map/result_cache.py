@@ -0,0 +1,162 @@
+"""
+On-disk cache of simulation results, used to resume a sweep after an interruption.
+
+Each simulation is identified by a key computed from:
+ - the content of the .jsimba file (a modified project invalidates the results),
+ - the design name,
+ - the parameters applied to the design,
+ - the solver settings (time step, end time...).
+
+Two tiers are stored in the cache folder:
+ - scalars (dictionary of float values) in a SQLite database, kept forever,
+ - signals (time and data arrays), optional, in .npz files. This tier is limited in size: the least
+   recently used signals are removed first.
+
+Usage:
+    cache = ResultCache(os.path.join(script_folder, "simulation_cache"))
+    key = cache.key(project_path, '1-Full Design', {'rpm': 1000, 'idref': 0, 'iqref': 5}, {'EndTime': 0.4})
+    result = cache.get(key)
+    if result is None:
+        result = ...  # run the simulation
+        cache.put(key, result)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+
+
+class ResultCache:
+    """
+    Content-addressed cache of simulation results.
+
+    Args:
+        folder (str): cache folder (created if needed)
+        max_signal_bytes (int): maximum size of the signal files. Least recently used signals are removed above this size.
+    """
+
+    def __init__(self, folder, max_signal_bytes=2e9):
+        self.folder = folder
+        self.signal_folder = os.path.join(folder, "signals")
+        self.max_signal_bytes = max_signal_bytes
+        os.makedirs(self.signal_folder, exist_ok=True)
+        self._project_hashes = {}
+        self._db = sqlite3.connect(os.path.join(folder, "cache.db"))
+        self._db.execute("CREATE TABLE IF NOT EXISTS scalars (key TEXT PRIMARY KEY, value TEXT, created REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS signals (key TEXT PRIMARY KEY, size INTEGER, last_access REAL)")
+        self._db.commit()
+
+    def project_hash(self, project_path):
+        """
+        Return the SHA-256 of the project file content (computed once per file modification).
+        """
+        stat = os.stat(project_path)
+        cache_key = (os.path.realpath(project_path), stat.st_mtime_ns, stat.st_size)
+        if cache_key not in self._project_hashes:
+            sha = hashlib.sha256()
+            with open(project_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+            self._project_hashes[cache_key] = sha.hexdigest()
+        return self._project_hashes[cache_key]
+
+    def key(self, project_path, design_name, parameters, solver_settings=None):
+        """
+        Return the key of a simulation.
+
+        Args:
+            project_path (str): path of the .jsimba file
+            design_name (str): name of the simulated design
+            parameters (dict): parameters applied to the design {name: value}
+            solver_settings (dict): transient analysis settings {name: value}
+        """
+        description = json.dumps({'project': self.project_hash(project_path),
+                                  'design': design_name,
+                                  'parameters': parameters,
+                                  'solver': solver_settings or {}},
+                                 sort_keys=True, default=str)
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Return the scalars stored for key, or None if this simulation is not in the cache.
+        """
+        row = self._db.execute("SELECT value FROM scalars WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key, scalars, signals=None):
+        """
+        Store the results of a simulation.
+
+        Args:
+            key (str): key returned by key()
+            scalars (dict): scalar results {name: value}
+            signals (dict): optional signals {name: (time, data)}
+        """
+        scalars = {name: float(value) for name, value in scalars.items()}
+        self._db.execute("INSERT OR REPLACE INTO scalars VALUES (?, ?, ?)", (key, json.dumps(scalars), time.time()))
+        self._db.commit()
+        if signals:
+            self.put_signals(key, signals)
+
+    def put_signals(self, key, signals):
+        """
+        Store the signals {name: (time, data)} of a simulation and remove the least recently used signals if needed.
+        """
+        arrays = {}
+        for index, (name, (time_points, data_points)) in enumerate(signals.items()):
+            arrays['name_{0}'.format(index)] = np.array(name)
+            arrays['time_{0}'.format(index)] = np.asarray(time_points, dtype=np.float64)
+            arrays['data_{0}'.format(index)] = np.asarray(data_points, dtype=np.float64)
+        path = self._signal_path(key)
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+        size = os.path.getsize(path)
+        self._db.execute("INSERT OR REPLACE INTO signals VALUES (?, ?, ?)", (key, size, time.time()))
+        self._db.commit()
+        self._evict()
+
+    def get_signals(self, key):
+        """
+        Return the signals {name: (time, data)} stored for key, or None if they are not in the cache.
+        """
+        path = self._signal_path(key)
+        if not os.path.exists(path):
+            return None
+        signals = {}
+        with np.load(path) as arrays:
+            for index in range(len(arrays.files) // 3):
+                name = str(arrays['name_{0}'.format(index)])
+                signals[name] = (arrays['time_{0}'.format(index)], arrays['data_{0}'.format(index)])
+        self._db.execute("UPDATE signals SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return signals
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def close(self):
+        self._db.close()
+
+    def _signal_path(self, key):
+        return os.path.join(self.signal_folder, key + ".npz")
+
+    def _evict(self):
+        """
+        Remove the least recently used signals until the signal tier fits in max_signal_bytes.
+        """
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM signals").fetchone()[0]
+        if total <= self.max_signal_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM signals ORDER BY last_access").fetchall():
+            if total <= self.max_signal_bytes:
+                break
+            path = self._signal_path(key)
+            if os.path.exists(path):
+                os.remove(path)
+            self._db.execute("DELETE FROM signals WHERE key = ?", (key,))
+            total -= size
+        self._db.commit()
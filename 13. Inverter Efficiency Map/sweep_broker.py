@@ -0,0 +1,241 @@
+"""
+Job broker used to distribute a sweep on several computers.
+
+The broker runs in the main script. It publishes job descriptors (a picklable dictionary such as
+{'project': ..., 'design': ..., 'parameters': {...}}) and listens on a TCP port. Workers, on the
+same computer or on other computers, connect to the broker, pull the jobs one by one, simulate
+them and send the results back as soon as they are available.
+
+Jobs are re-delivered to another worker when:
+ - the connection with the worker running them is lost (worker crashed, computer stopped...),
+ - they are not done within lease_time seconds,
+ - the worker reports an error,
+up to max_attempts deliveries: a job which crashes the worker process is not delivered forever.
+
+The broker and the workers use multiprocessing.connection (pickled messages authenticated with
+authkey). Only run it on a trusted network.
+
+Usage:
+    # main script
+    broker = SweepBroker(('localhost', 6000), authkey=secret_key)
+    for job_id, descriptor in enumerate(descriptors):
+        broker.submit(job_id, descriptor)
+    for job_id, result in broker.results():
+        ...
+    broker.close()
+
+    # each worker process
+    run_worker(('broker-host', 6000), secret_key, simulate)    # simulate(descriptor) returns the result
+"""
+
+import collections
+import threading
+import time
+import queue
+from multiprocessing.connection import Listener, Client
+
+
+class SweepBroker:
+    """
+    TCP job broker.
+
+    Args:
+        address ((str, int)): address to listen on. Use ('', port) to accept workers from other computers.
+        authkey (bytes): secret key shared with the workers (anyone knowing it can run code on the broker)
+        lease_time (float): maximum time [s] to get the result of a job before it is delivered to another worker
+        max_attempts (int): maximum number of deliveries of a job which fails
+    """
+
+    def __init__(self, address, authkey, lease_time=3600.0, max_attempts=3):
+        self._listener = Listener(address, authkey=authkey)
+        self.address = self._listener.address
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.failures = {}                      # job_id -> last error message
+        self._lock = threading.Lock()
+        self._jobs = {}                         # job_id -> descriptor
+        self._pending = collections.deque()     # job ids waiting for a worker
+        self._in_flight = {}                    # job_id -> (worker_id, deadline)
+        self._attempts = collections.Counter()  # job_id -> number of deliveries
+        self._done = set()
+        self._results = queue.Queue()
+        self._connections = {}
+        self._closed = False
+        threading.Thread(target=self._accept_workers, daemon=True).start()
+
+    def submit(self, job_id, descriptor):
+        """
+        Publish a job. job_id must be unique and descriptor picklable.
+        """
+        with self._lock:
+            self._jobs[job_id] = descriptor
+            self._pending.append(job_id)
+
+    def results(self, poll_interval=1.0, worker_timeout=None):
+        """
+        Yield (job_id, result) for each submitted job as soon as it is done.
+        result is None for the jobs which failed max_attempts times (see failures).
+
+        Args:
+            poll_interval (float): time [s] between two checks of the expired leases
+            worker_timeout (float): time [s] without any connected worker after which the remaining jobs are
+                reported as failed. None to wait for workers forever.
+        """
+        remaining = len(self._jobs) - len(self._done)
+        last_worker_time = time.monotonic()
+        while remaining > 0:
+            try:
+                job_id, result = self._results.get(timeout=poll_interval)
+            except queue.Empty:
+                with self._lock:
+                    self._requeue_expired()
+                    if self._connections:
+                        last_worker_time = time.monotonic()
+                    elif worker_timeout is not None and time.monotonic() - last_worker_time > worker_timeout:
+                        for job_id in self._jobs:
+                            if job_id not in self._done:
+                                self._finish_failed(job_id, "no worker connected for {0:.0f} s".format(worker_timeout))
+                continue
+            remaining -= 1
+            yield job_id, result
+
+    def number_of_workers(self):
+        """
+        Return the number of connected workers.
+        """
+        with self._lock:
+            return len(self._connections)
+
+    def close(self):
+        """
+        Stop the broker: connected workers are asked to stop.
+        """
+        self._closed = True
+        self._listener.close()
+
+    # Internal methods (run by the threads of the broker)
+    def _accept_workers(self):
+        worker_ids = iter(range(1, 1 << 30))
+        while not self._closed:
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closed:
+                    break
+                continue  # failed authentication or connection
+            worker_id = next(worker_ids)
+            threading.Thread(target=self._serve_worker, args=(connection, worker_id), daemon=True).start()
+
+    def _serve_worker(self, connection, worker_id):
+        with self._lock:
+            self._connections[worker_id] = connection
+        try:
+            while True:
+                message = connection.recv()
+                if message[0] == 'get':
+                    connection.send(self._next_job(worker_id))
+                elif message[0] == 'result':
+                    self._complete(message[1], message[2])
+                elif message[0] == 'error':
+                    self._fail(message[1], message[2])
+        except (EOFError, OSError):
+            pass  # worker lost
+        finally:
+            with self._lock:
+                del self._connections[worker_id]
+                for job_id, (owner, _) in list(self._in_flight.items()):
+                    if owner == worker_id:  # re-deliver the jobs of the lost worker
+                        del self._in_flight[job_id]
+                        self._retry(job_id, "worker lost while running the job", first=True)
+            connection.close()
+
+    def _next_job(self, worker_id):
+        with self._lock:
+            self._requeue_expired()
+            while self._pending:
+                job_id = self._pending.popleft()
+                if job_id in self._done or job_id in self._in_flight:
+                    continue
+                self._in_flight[job_id] = (worker_id, time.monotonic() + self.lease_time)
+                self._attempts[job_id] += 1
+                return ('job', job_id, self._jobs[job_id])
+            if self._closed:
+                return ('stop',)
+            return ('wait', 1.0)
+
+    def _complete(self, job_id, result):
+        with self._lock:
+            self._in_flight.pop(job_id, None)
+            if job_id in self._done:
+                return  # result of a job re-delivered after its lease expired
+            self._done.add(job_id)
+        self._results.put((job_id, result))
+
+    def _fail(self, job_id, error_message):
+        with self._lock:
+            self._in_flight.pop(job_id, None)
+            if job_id in self._done:
+                return
+            self._retry(job_id, error_message)
+
+    def _requeue_expired(self):
+        now = time.monotonic()
+        for job_id, (_, deadline) in list(self._in_flight.items()):
+            if deadline < now:
+                del self._in_flight[job_id]
+                self._retry(job_id, "no result within {0:.0f} s".format(self.lease_time), first=True)
+
+    def _retry(self, job_id, error_message, first=False):
+        """
+        Deliver a job again (first in the queue if first) or report it as failed after max_attempts deliveries.
+        Called with the lock held.
+        """
+        self.failures[job_id] = error_message
+        if self._attempts[job_id] < self.max_attempts:
+            if first:
+                self._pending.appendleft(job_id)
+            else:
+                self._pending.append(job_id)
+        else:
+            self._finish_failed(job_id, error_message)
+
+    def _finish_failed(self, job_id, error_message):
+        """
+        Report a job as failed. Called with the lock held.
+        """
+        self.failures[job_id] = error_message
+        self._done.add(job_id)
+        self._results.put((job_id, None))
+
+
+def run_worker(address, authkey, function):
+    """
+    Pull jobs from the broker at address, call function(descriptor) and send the results back
+    until the broker stops.
+
+    Args:
+        address ((str, int)): address of the broker
+        authkey (bytes): key shared with the broker
+        function (function): function called with each job descriptor. Its return value must be picklable.
+    """
+    connection = Client(address, authkey=authkey)
+    try:
+        while True:
+            connection.send(('get',))
+            message = connection.recv()
+            if message[0] == 'stop':
+                break
+            if message[0] == 'wait':
+                time.sleep(message[1])
+                continue
+            _, job_id, descriptor = message
+            try:
+                result = function(descriptor)
+            except Exception as e:
+                connection.send(('error', job_id, "{0}: {1}".format(type(e).__name__, e)))
+                continue
+            connection.send(('result', job_id, result))
+    except (EOFError, OSError):
+        pass  # broker closed
+    finally:
+        connection.close()
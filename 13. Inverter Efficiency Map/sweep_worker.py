@@ -0,0 +1,120 @@
+"""
+Helper functions used to run SIMBA parameter sweeps with a multiprocessing pool.
+
+Instead of reading the .jsimba file for every operating point, each process of the pool loads the
+project once (pool initializer) and keeps the designs in memory. The original value of every
+variable or device property modified by a simulation is recorded the first time it is changed, so
+that the design can be brought back to its pristine state before the next operating point.
+
+Usage:
+    pool = multiprocessing.Pool(number_of_parallel_simulations, initializer=sweep_worker.init_worker,
+                                initargs=(project_path, multiprocessing.Lock(), configure_design))
+
+    def run_simulation(...):
+        design = sweep_worker.get_design('Design name')
+        sweep_worker.set_variable(design, 'rpm', speed_ref)
+        ...
+"""
+
+from aesim.simba import ProjectRepository
+
+_project = None         # ProjectRepository loaded once per process
+_designs = {}           # designs already fetched from _project, by name
+_configure = None       # optional function called once on each design (settings common to all points)
+_templates = {}         # original values of the modified parameters, by design name
+
+
+def init_worker(project_path, lock=None, configure=None):
+    """
+    Pool initializer: load the SIMBA project once in the current process.
+
+    Args:
+        project_path (str): path of the .jsimba file
+        lock (multiprocessing.Lock): optional lock used to avoid opening the file in several processes at once
+        configure (function): optional function called with each design the first time it is used.
+            Use it to apply the settings shared by all operating points (must be a module-level function).
+    """
+    global _project, _configure
+    if lock is not None:
+        with lock:
+            _project = ProjectRepository(project_path)
+    else:
+        _project = ProjectRepository(project_path)
+    _configure = configure
+    _designs.clear()
+    _templates.clear()
+
+
+def get_design(design_name):
+    """
+    Return the design named design_name from the project loaded by init_worker().
+    The design is restored to its original state: parameters changed by the previous operating point are reset.
+
+    Args:
+        design_name (str): name of the design
+
+    Returns:
+        Design: SIMBA design ready to be modified
+    """
+    if _project is None:
+        raise RuntimeError("sweep_worker.init_worker() must be called before get_design()")
+
+    design = _designs.get(design_name)
+    if design is None:
+        design = _project.GetDesignByName(design_name)
+        if _configure is not None:
+            _configure(design)
+        _designs[design_name] = design
+        _templates[design_name] = {}
+    else:
+        reset_design(design)
+    return design
+
+
+def set_variable(design, name, value):
+    """
+    Set the value of a circuit variable and remember its original value.
+    """
+    template = _templates.setdefault(design.Name, {})
+    key = ('variable', name)
+    if key not in template:
+        template[key] = design.Circuit.GetVariableValue(name)
+    design.Circuit.SetVariableValue(name, str(value))
+
+
+def set_device_property(design, device_name, property_name, value):
+    """
+    Set a property of a device (ex: set_device_property(design, 'Lr', 'Value', 1e-6)) and remember its original value.
+    """
+    template = _templates.setdefault(design.Name, {})
+    device = design.Circuit.GetDeviceByName(device_name)
+    key = ('device', device_name, property_name)
+    if key not in template:
+        template[key] = getattr(device, property_name)
+    setattr(device, property_name, value)
+
+
+def set_analysis_setting(design, property_name, value):
+    """
+    Set a transient analysis setting (ex: set_analysis_setting(design, 'EndTime', 0.4)) and remember its original value.
+    """
+    template = _templates.setdefault(design.Name, {})
+    key = ('analysis', property_name)
+    if key not in template:
+        template[key] = getattr(design.TransientAnalysis, property_name)
+    setattr(design.TransientAnalysis, property_name, value)
+
+
+def reset_design(design):
+    """
+    Restore only the variables, device properties and analysis settings modified since the design was loaded.
+    """
+    template = _templates.get(design.Name, {})
+    for key, value in template.items():
+        if key[0] == 'variable':
+            design.Circuit.SetVariableValue(key[1], value)
+        elif key[0] == 'device':
+            setattr(design.Circuit.GetDeviceByName(key[1]), key[2], value)
+        else:
+            setattr(design.TransientAnalysis, key[1], value)
+    template.clear()
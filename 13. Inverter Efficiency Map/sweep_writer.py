@@ -0,0 +1,182 @@
+"""
+Append-only writer used to save the results of a sweep as they arrive.
+
+Instead of keeping all the results in memory and saving them at the end of the sweep, each result is
+added to a buffer which is regularly flushed to a new Parquet file (part file) in the result folder:
+
+    <folder>/metadata.json          sweep parameters
+    <folder>/scalars/part-*.parquet one row per operating point (scalar results)
+    <folder>/waveforms/part-*.parquet one row per waveform (key columns, signal name, time and data arrays)
+
+Part files are written under a temporary name and renamed once complete: the results can be read
+with read_scalars() / read_waveforms() while the sweep is still running. The results already in the folder are
+kept (ex: sweep run again on the same day or restarted): new part files are numbered after the existing ones.
+
+Usage:
+    with SweepWriter(os.path.join(script_folder, "map_2024-05-02")) as writer:
+        writer.write_metadata({'Rg': 5, ...})
+        for ...:
+            writer.write_scalars({'sim_number': i, 'torque': torque, 'efficiency': efficiency})
+            writer.write_waveform({'sim_number': i}, 'U12 - Voltage', time_points, data_points)
+
+    data = read_scalars(os.path.join(script_folder, "map_2024-05-02"))
+"""
+
+import glob
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class SweepWriter:
+    """
+    Streaming writer of sweep results.
+
+    Args:
+        folder (str): result folder. New results are appended to the results already in the folder.
+        flush_rows (int): number of buffered scalar rows which triggers a flush
+        flush_bytes (int): size of the buffered waveforms which triggers a flush [bytes]
+        flush_interval (float): maximum time [s] between two flushes of the scalars (results visible to the readers)
+        overwrite (bool): if True, the previous content of the folder is removed
+    """
+
+    def __init__(self, folder, flush_rows=100, flush_bytes=64e6, flush_interval=10.0, overwrite=False):
+        self.folder = folder
+        self.flush_rows = flush_rows
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        if overwrite and os.path.isdir(folder):
+            shutil.rmtree(folder)
+        os.makedirs(os.path.join(folder, "scalars"), exist_ok=True)
+        os.makedirs(os.path.join(folder, "waveforms"), exist_ok=True)
+        self._scalars = []
+        self._waveforms = []
+        self._waveform_bytes = 0
+        self._part_numbers = {name: _last_part_number(folder, name) for name in ('scalars', 'waveforms')}
+        self._last_flush = time.monotonic()
+
+    def write_metadata(self, metadata):
+        """
+        Save the parameters of the sweep {name: value} in metadata.json.
+        Raises ValueError if the folder already contains results of a sweep with other parameters (use overwrite=True).
+        """
+        previous = read_metadata(self.folder)
+        if previous and any(self._part_numbers.values()) and previous != json.loads(json.dumps(metadata, default=float)):
+            raise ValueError("{0} contains the results of a sweep with other parameters: use another folder "
+                             "or SweepWriter(..., overwrite=True)".format(self.folder))
+        with open(os.path.join(self.folder, "metadata.json"), 'w') as f:
+            json.dump(metadata, f, indent=2, default=float)
+
+    def write_scalars(self, row):
+        """
+        Append the scalar results of an operating point {column: value}. All the rows must have the same columns.
+        """
+        self._scalars.append(row)
+        if len(self._scalars) >= self.flush_rows or time.monotonic() - self._last_flush > self.flush_interval:
+            self.flush()
+
+    def write_waveform(self, key, name, time_points, data_points):
+        """
+        Append a waveform.
+
+        Args:
+            key (dict): columns identifying the operating point, ex: {'sim_number': 3}
+            name (str): signal name
+            time_points ([float]): time points of the signal
+            data_points ([float]): data points of the signal
+        """
+        time_points = np.asarray(time_points, dtype=np.float64)
+        data_points = np.asarray(data_points, dtype=np.float64)
+        self._waveforms.append(dict(key, signal=name, time=time_points, data=data_points))
+        self._waveform_bytes += time_points.nbytes + data_points.nbytes
+        if self._waveform_bytes >= self.flush_bytes:
+            self._flush_waveforms()
+
+    def flush(self):
+        """
+        Write the buffered results in new part files.
+        """
+        if self._scalars:
+            self._write_part('scalars', pa.Table.from_pylist(self._scalars))
+            self._scalars = []
+        self._flush_waveforms()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _flush_waveforms(self):
+        if not self._waveforms:
+            return
+        columns = {}
+        for column in self._waveforms[0]:
+            values = [waveform[column] for waveform in self._waveforms]
+            if column in ('time', 'data'):
+                offsets = np.concatenate(([0], np.cumsum([len(v) for v in values]))).astype(np.int64)
+                columns[column] = pa.LargeListArray.from_arrays(pa.array(offsets), pa.array(np.concatenate(values)))
+            else:
+                columns[column] = pa.array(values)
+        self._write_part('waveforms', pa.table(columns))
+        self._waveforms = []
+        self._waveform_bytes = 0
+
+    def _write_part(self, table_name, table):
+        self._part_numbers[table_name] += 1
+        path = os.path.join(self.folder, table_name, "part-{0:06d}.parquet".format(self._part_numbers[table_name]))
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)  # readers only see complete part files
+
+
+def _last_part_number(folder, table_name):
+    numbers = [int(os.path.basename(path)[5:-8]) for path in glob.glob(os.path.join(folder, table_name, "part-*.parquet"))]
+    return max(numbers, default=0)
+
+
+def _read_parts(folder, table_name, columns=None, filters=None):
+    paths = sorted(glob.glob(os.path.join(folder, table_name, "part-*.parquet")))
+    tables = [pq.read_table(path, columns=columns, filters=filters) for path in paths]
+    if not tables:
+        return None
+    return pa.concat_tables(tables)
+
+
+def read_metadata(folder):
+    """
+    Return the parameters saved with write_metadata() (empty dictionary if not written yet).
+    """
+    path = os.path.join(folder, "metadata.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def read_scalars(folder):
+    """
+    Return the scalar results written so far as a pandas DataFrame (the sweep may still be running).
+    """
+    table = _read_parts(folder, 'scalars')
+    return pd.DataFrame() if table is None else table.to_pandas()
+
+
+def read_waveforms(folder, filters=None):
+    """
+    Return the waveforms written so far as a pandas DataFrame: key columns, 'signal', 'time' and 'data' (NumPy arrays).
+
+    Args:
+        folder (str): result folder
+        filters (list): optional pyarrow filters, ex: [('signal', '==', 'U12 - Voltage')]
+    """
+    table = _read_parts(folder, 'waveforms', filters=filters)
+    return pd.DataFrame() if table is None else table.to_pandas()
@@ -11,9 +11,13 @@ Before running the script, make sure to install the required packages by executi
 """
 
 import numpy as np
-import os,multiprocessing, tqdm, math
+import os,multiprocessing, tqdm, math, time
 import matplotlib.pyplot as plt
-from aesim.simba import ProjectRepository, License
+from aesim.simba import License
+import sweep_worker
+import batch_runner
+from job_scheduler import CostModel, utilization
+import waveform_metrics
 
 #############################
 #   SIMULATION PARAMETERS   #
@@ -52,99 +56,85 @@ if os.environ.get("SIMBA_SCRIPT_TEST"): # Accelerate simulation in test environm
     Q_RANGE = [0.4]
     FIN_RANGE = np.logspace(-1, 0.5, num=4).tolist()
 
+TIME_STEP = 2e-8
+
 #############################
 #           METHODS         #
 #############################
 
-def run_simulation(Lr, Cr, Lm, fin, sim_number, result_dict, lock):
+def configure_design(LLC_open_loop):
     """
-    Run LLC Open Loop Simulation for the given parameters and place the results in "result_dict"
+    Apply the settings shared by all simulations. Called once per process by sweep_worker.
     """
+    LLC_open_loop.TransientAnalysis.TimeStep = TIME_STEP
+    LLC_open_loop.TransientAnalysis.StopAtSteadyState = True
+    LLC_open_loop.TransientAnalysis.NumberOfBasePeriodsSaved = 2
+    LLC_open_loop.TransientAnalysis.BaseFrequencyParameterEnabled = True
+    LLC_open_loop.TransientAnalysis.CompressScopes = True
+    LLC_open_loop.Circuit.GetDeviceByName('vin').Voltage = VIN_RATED
+    LLC_open_loop.Circuit.GetDeviceByName('Ro').Value = RO
+    LLC_open_loop.Circuit.GetDeviceByName('fres').value = F_RES
+    LLC_open_loop.Circuit.GetDeviceByName('Transfo').Ratio = N
 
-    log = False # if true, log simulation results
-    if log: print ("\n{0}> Running LLC Open loop... (Lr={1:.2e} Cr={2:2e} Lm={3:.2e})".format(sim_number, Lr, Cr, Lm))
 
-    # Read the jsimba file
-    script_folder = os.path.realpath(os.path.dirname(__file__)) 
-    file_path = os.path.join(script_folder  , "LLC_Resonant_Converter.jsimba")
-    with lock:
-        project = ProjectRepository(file_path)
-        LLC_open_loop = project.GetDesignByName('LLC Resonant Converter-open loop')
+def run_simulation(Lr, Cr, Lm, fin, sim_number):
+    """
+    Run LLC Open Loop Simulation for the given parameters.
+    The project is loaded once per process by sweep_worker.init_worker (pool initializer).
+    Returns the simulation number, the average output voltage gain (NaN if the simulation failed) and the run time of the simulation [s]
+    """
 
+    log = False # if true, log simulation results
+    if log: print ("\n{0}> Running LLC Open loop... (Lr={1:.2e} Cr={2:2e} Lm={3:.2e})".format(sim_number, Lr, Cr, Lm))
 
-    # Get Elements
-    simba_vin = LLC_open_loop.Circuit.GetDeviceByName('vin')
-    simba_Lr = LLC_open_loop.Circuit.GetDeviceByName('Lr')
-    simba_Cr = LLC_open_loop.Circuit.GetDeviceByName('Cr')
-    simba_Lm = LLC_open_loop.Circuit.GetDeviceByName('Lm')
-    simba_fin = LLC_open_loop.Circuit.GetDeviceByName('fin')
-    simba_fres = LLC_open_loop.Circuit.GetDeviceByName('fres')
-    simba_Rout = LLC_open_loop.Circuit.GetDeviceByName('Ro')
-    simba_transfo = LLC_open_loop.Circuit.GetDeviceByName('Transfo')
+    # Get the design already loaded by this process
+    LLC_open_loop = sweep_worker.get_design('LLC Resonant Converter-open loop')
 
     # Apply parameters
     fsw = F_RES*fin
-    LLC_open_loop.TransientAnalysis.TimeStep = 2e-8
-    LLC_open_loop.TransientAnalysis.StopAtSteadyState = True
-    LLC_open_loop.TransientAnalysis.BaseFrequency = fsw
-    LLC_open_loop.TransientAnalysis.NumberOfBasePeriodsSaved = 2
-    LLC_open_loop.TransientAnalysis.BaseFrequencyParameterEnabled = True
-    LLC_open_loop.TransientAnalysis.CompressScopes = True
-    simba_vin.Voltage = VIN_RATED
-    simba_Rout.Value = RO
-    simba_fres.value = F_RES
-    simba_transfo.Ratio = N
-    simba_Lr.Value = Lr
-    simba_Cr.Value = Cr 
-    simba_Lm.Value = Lm
-    simba_fin.Value = fin
+    sweep_worker.set_analysis_setting(LLC_open_loop, 'BaseFrequency', fsw)
+    sweep_worker.set_device_property(LLC_open_loop, 'Lr', 'Value', Lr)
+    sweep_worker.set_device_property(LLC_open_loop, 'Cr', 'Value', Cr)
+    sweep_worker.set_device_property(LLC_open_loop, 'Lm', 'Value', Lm)
+    sweep_worker.set_device_property(LLC_open_loop, 'fin', 'Value', fin)
 
     # run simulation 
     job = LLC_open_loop.TransientAnalysis.NewJob()
+    start_time = time.perf_counter()
     status = job.Run()
+    run_time = time.perf_counter() - start_time
     if str(status) != "OK": 
         print ("\nSimulation {0} Failed > (Lr={1:2e} Cr={2:.2e} Lm={3:.2e})".format(sim_number, Lr, Cr, Lm))
         print (job.Summary()[:-1])
-        result_dict[sim_number] = [fin, math.nan]
-        return; # ERROR 
+        job.Dispose()
+        return sim_number, math.nan, run_time # ERROR 
 
     if log: print (job.Summary()[:-1])
 
     # Get results calculate the average of the steady state output voltage using the trapezoidal rule
     vout_signal = job.GetSignalByName('Ro - Instantaneous Voltage')
-    time = vout_signal.TimePoints
-    vout_res = vout_signal.DataPoints
-    t1 = time[0]
-    t2 = time[-1]
-    vout_sum = 0
-    range_idx = range(0, len(time)-1, 1)
-    for idx in range_idx:
-        vout_sum += (time[idx+1] - time[idx]) * (vout_res[idx+1] + vout_res[idx]) / 2
-    vout_average = 1 / (t2 - t1) * vout_sum * 1 / VIN_RATED
+    vout_average = waveform_metrics.average(vout_signal.TimePoints, vout_signal.DataPoints) / VIN_RATED
     if log: print ("\n{0}> vout_average={1:.3f}".format(sim_number, vout_average))
 
-    result_dict[sim_number] = [fin, vout_average]
     job.Dispose() # free memory
+    return sim_number, vout_average, run_time
 
 
-def run_simulation_star(args):
+def estimated_time_steps(fin, Lr, Lm):
     """
-    Helper function used to call run_simulation with a single argument
+    Prior cost of a simulation: number of time steps per switching period.
+    The simulations with a low switching frequency are the longest ones.
     """
-    return run_simulation(*args)
+    return 1 / (F_RES * fin * TIME_STEP)
 
 #############################
 #         MAIN SCRIPT       #
 #############################
 
-# Distribute and run the calculations. Results are saved in result_dict
+# Distribute and run the calculations. Results are saved in vout_averages
 if __name__ == "__main__": # Called only in main thread.
 
-    manager = multiprocessing.Manager()
-    result_dict = manager.dict()
     i=0
-    jobs=[]
-    lock = manager.Lock()
     pool_args = []
     figure, axs = plt.subplots(nrows=2, ncols=4, figsize=(15, 12))
 
@@ -155,13 +145,34 @@ if __name__ == "__main__": # Called only in main thread.
             Cr = 1/(2*np.pi*F_RES*Q*RO_RATED_PRI)
             Lm = L*Lr
             for fin in FIN_RANGE:
-                pool_args.append((Lr, Cr, Lm, float(fin),  i, result_dict, lock));
+                pool_args.append((Lr, Cr, Lm, float(fin),  i));
                 i=i+1
 
-    # Run Actual Simulation
-    pool = multiprocessing.Pool(number_of_parallel_simulations)
-    for _ in tqdm.tqdm(pool.imap(run_simulation_star, pool_args), total=len(pool_args)):
-        pass
+    # Dispatch the longest simulations first. The cost is estimated from the run times of previous sweeps
+    # (run_time_history.json) or, by default, from the number of time steps per switching period.
+    script_folder = os.path.realpath(os.path.dirname(__file__))
+    cost_model = CostModel(os.path.join(script_folder, "run_time_history.json"), prior=estimated_time_steps)
+    features = [(args[3], args[0], args[2]) for args in pool_args]  # fin, Lr, Lm
+    dispatch_order = cost_model.longest_first(features)
+
+    # Run Actual Simulation. Each process loads the project only once and simulates the points by batches:
+    # the batch size adapts to the measured run time to limit the scheduling overhead of short simulations.
+    project_path = os.path.join(script_folder, "LLC_Resonant_Converter.jsimba")
+    pool = multiprocessing.Pool(number_of_parallel_simulations, initializer=sweep_worker.init_worker,
+                                initargs=(project_path, multiprocessing.Lock(), configure_design))
+    vout_averages = np.full(len(pool_args), math.nan)
+    run_times = []
+    sweep_start_time = time.perf_counter()
+    for sim_number, vout_average, run_time in tqdm.tqdm(batch_runner.run_batched(pool, run_simulation, [pool_args[k] for k in dispatch_order], number_of_parallel_simulations), total=len(pool_args)):
+        sim_number = int(sim_number)
+        vout_averages[sim_number] = vout_average
+        cost_model.record(features[sim_number], run_time)
+        run_times.append(run_time)
+    makespan = time.perf_counter() - sweep_start_time
+    pool.close()
+    pool.join()
+    cost_model.save()
+    print("Sweep duration: {0:.1f} s, pool utilization: {1:.0%}".format(makespan, utilization(run_times, makespan, number_of_parallel_simulations)))
         
     # Plot curves
     if os.environ.get("SIMBA_SCRIPT_TEST"):
@@ -178,7 +189,7 @@ if __name__ == "__main__": # Called only in main thread.
         for Q in Q_RANGE:
             vouts = []
             for fin in FIN_RANGE:
-                vout_average = result_dict[i][1]
+                vout_average = vout_averages[i]
                 vouts.append(vout_average)
                 i = i+1;
             vout_total.append(vouts)
@@ -0,0 +1,114 @@
+"""
+Cost-aware ordering of the simulations of a sweep.
+
+When the run time of the simulations varies a lot, submitting them in the order of the parameter
+grid leaves a few long simulations at the end of the sweep while the other processes are idle.
+Dispatching the longest simulations first reduces the total duration (makespan) of the sweep.
+
+The cost of each simulation is estimated:
+ - from a prior cost function of the parameters (ex: number of time steps per simulated period),
+ - or, when run times of previous sweeps are recorded, from a log-log regression of the run time
+   on the parameters: log(run_time) = a0 + a1*log(x1) + a2*log(x2) + ...
+
+Usage:
+    model = CostModel(history_path, prior=lambda fin: 1 / fin)
+    order = model.longest_first([(fin,) for fin in fins])
+    ...
+    model.record((fin,), run_time)
+    model.save()
+"""
+
+import json
+import os
+import numpy as np
+
+
+class CostModel:
+    """
+    Estimate the run time of simulations from their (positive) features.
+
+    Args:
+        history_path (str): JSON file where the run times are recorded. None to disable the history.
+        prior (function): prior cost function called with the features of a simulation, used when the history is too short
+        min_records (int): minimum number of recorded run times to use the regression instead of the prior
+        max_records (int): number of recorded run times kept (the oldest ones are removed first)
+    """
+
+    def __init__(self, history_path=None, prior=None, min_records=10, max_records=1000):
+        self.history_path = history_path
+        self.prior = prior
+        self.min_records = min_records
+        self.max_records = max_records
+        self.history = []   # list of [features, run_time]
+        self._coefficients = None
+        if history_path is not None and os.path.exists(history_path):
+            with open(history_path, 'r') as f:
+                self.history = json.load(f)[-max_records:]
+
+    def record(self, features, run_time):
+        """
+        Record the run time [s] of a simulation. Only the last max_records run times are kept.
+        """
+        self.history.append([[float(x) for x in features], float(run_time)])
+        del self.history[:-self.max_records]
+        self._coefficients = None
+
+    def save(self):
+        """
+        Save the recorded run times in history_path.
+        """
+        if self.history_path is None:
+            return
+        with open(self.history_path, 'w') as f:
+            json.dump(self.history, f)
+
+    def _fit(self):
+        """
+        Fit log(run_time) = a0 + sum(ai * log(xi)) on the recorded run times.
+        """
+        records = [(features, run_time) for features, run_time in self.history
+                   if run_time > 0 and all(x > 0 for x in features)]
+        if len(records) < self.min_records or len({len(features) for features, _ in records}) != 1:
+            return None
+        features = np.log(np.array([features for features, _ in records], dtype=float))
+        run_times = np.log(np.array([run_time for _, run_time in records], dtype=float))
+        matrix = np.column_stack((np.ones(len(records)), features))
+        coefficients, *_ = np.linalg.lstsq(matrix, run_times, rcond=None)
+        return coefficients
+
+    def estimate(self, features_list):
+        """
+        Return the estimated cost of each simulation (in seconds when fitted on the history, arbitrary unit with the prior).
+
+        Args:
+            features_list ([tuple]): features of each simulation
+        """
+        if self._coefficients is None:
+            self._coefficients = self._fit()
+        features = np.array(features_list, dtype=float)
+        if self._coefficients is not None and features.ndim == 2 and features.shape[1] == len(self._coefficients) - 1 and np.all(features > 0):
+            return np.exp(self._coefficients[0] + np.log(features) @ self._coefficients[1:])
+        if self.prior is not None:
+            return np.array([self.prior(*f) for f in features_list], dtype=float)
+        return np.ones(len(features_list))
+
+    def longest_first(self, features_list):
+        """
+        Return the indices of the simulations sorted by decreasing estimated cost.
+        """
+        costs = self.estimate(features_list)
+        return np.argsort(-costs, kind='stable').tolist()
+
+
+def utilization(run_times, makespan, number_of_workers):
+    """
+    Return the fraction of the available worker time actually used to simulate.
+
+    Args:
+        run_times ([float]): run time of each simulation [s]
+        makespan (float): total duration of the sweep [s]
+        number_of_workers (int): number of parallel processes
+    """
+    if makespan <= 0 or number_of_workers <= 0:
+        return float('nan')
+    return float(np.sum(run_times)) / (makespan * number_of_workers)
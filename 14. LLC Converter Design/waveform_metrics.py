@@ -0,0 +1,147 @@
+"""
+Vectorized metrics of simulated waveforms.
+
+SIMBA signals are sampled on a non-uniform time base (variable time step, compressed scopes), so the
+metrics are calculated with the trapezoidal rule on the actual time points. All the functions accept
+the raw TimePoints / DataPoints of a signal (lists or NumPy arrays) and work on whole arrays: no Python
+loop over the samples.
+
+Usage:
+    signal = job.GetSignalByName('Ro - Instantaneous Voltage')
+    vout_average = waveform_metrics.average(signal.TimePoints, signal.DataPoints)
+    m = waveform_metrics.metrics(signal.TimePoints, signal.DataPoints, fundamental_frequency=fsw)
+    print(m['average'], m['rms'], m['ripple'], m['thd'])
+"""
+
+import numpy as np
+
+
+def _as_arrays(time_points, data_points):
+    time_points = np.asarray(time_points, dtype=np.float64)
+    data_points = np.asarray(data_points, dtype=np.float64)
+    if time_points.shape != data_points.shape or time_points.size < 2:
+        raise ValueError("time_points and data_points must have the same length (at least 2 points)")
+    return time_points, data_points
+
+
+def _integral(time_points, values):
+    """
+    Trapezoidal integral of values over time_points.
+    """
+    return float(np.dot(np.diff(time_points), values[1:] + values[:-1]) / 2)
+
+
+def _ratio(numerator, denominator):
+    """
+    Return numerator / denominator, NaN if the ratio is not defined (ex: zero average or rms value).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.float64(numerator) / np.float64(denominator)
+    return float(value) if np.isfinite(value) else float('nan')
+
+
+def average(time_points, data_points):
+    """
+    Return the average value of the waveform (equal time steps are not required).
+    """
+    time_points, data_points = _as_arrays(time_points, data_points)
+    return _integral(time_points, data_points) / (time_points[-1] - time_points[0])
+
+
+def rms(time_points, data_points):
+    """
+    Return the rms value of the waveform (trapezoidal integral of the squared samples).
+    """
+    time_points, data_points = _as_arrays(time_points, data_points)
+    return float(np.sqrt(_integral(time_points, data_points * data_points) / (time_points[-1] - time_points[0])))
+
+
+def peak(time_points, data_points):
+    """
+    Return the maximum absolute value of the waveform.
+    """
+    return float(np.max(np.abs(np.asarray(data_points, dtype=np.float64))))
+
+
+def peak_to_peak(time_points, data_points):
+    """
+    Return the difference between the maximum and the minimum of the waveform.
+    """
+    return float(np.ptp(np.asarray(data_points, dtype=np.float64)))
+
+
+def ripple(time_points, data_points):
+    """
+    Return the relative ripple of the waveform: peak to peak value divided by the absolute average value
+    (NaN for a zero average value).
+    """
+    return _ratio(peak_to_peak(time_points, data_points), abs(average(time_points, data_points)))
+
+
+def crest_factor(time_points, data_points):
+    """
+    Return the crest factor of the waveform: peak value divided by the rms value (NaN for a zero rms value).
+    """
+    return _ratio(peak(time_points, data_points), rms(time_points, data_points))
+
+
+def thd(time_points, data_points, fundamental_frequency, number_of_harmonics=50, number_of_periods=None):
+    """
+    Return the total harmonic distortion of the waveform: rms value of the harmonics 2 to number_of_harmonics
+    divided by the rms value of the fundamental (NaN without fundamental).
+
+    The waveform is resampled on a uniform time base over an integer number of fundamental periods
+    (the last ones of the signal) and analyzed with a FFT.
+
+    Args:
+        time_points ([float]): time points [s]
+        data_points ([float]): data points
+        fundamental_frequency (float): frequency of the fundamental [Hz]
+        number_of_harmonics (int): highest harmonic taken into account
+        number_of_periods (int): number of periods analyzed. Default: all the complete periods of the signal.
+    """
+    time_points, data_points = _as_arrays(time_points, data_points)
+    period = 1 / fundamental_frequency
+    available_periods = int(np.floor((time_points[-1] - time_points[0]) / period * (1 + 1e-9)))
+    if number_of_periods is None:
+        number_of_periods = available_periods
+    if number_of_periods < 1 or number_of_periods > available_periods:
+        raise ValueError("the signal does not contain {0} complete period(s)".format(number_of_periods))
+
+    # Uniform resampling: at least 16 points per period of the highest harmonic
+    number_of_samples = int(2 ** np.ceil(np.log2(16 * number_of_harmonics * number_of_periods)))
+    start = time_points[-1] - number_of_periods * period
+    uniform_time = start + np.arange(number_of_samples) * (number_of_periods * period / number_of_samples)
+    spectrum = np.abs(np.fft.rfft(np.interp(uniform_time, time_points, data_points)))
+
+    harmonics = spectrum[number_of_periods::number_of_periods][:number_of_harmonics]
+    return _ratio(np.sqrt(np.sum(harmonics[1:] ** 2)), harmonics[0])
+
+
+def metrics(time_points, data_points, fundamental_frequency=None, number_of_harmonics=50):
+    """
+    Return the average, rms, peak, peak to peak, ripple and crest factor values of the waveform, and its
+    THD if fundamental_frequency is given. The time differences and integrals are computed once for all the metrics.
+    The ratios (ripple, crest factor, THD) are NaN when they are not defined, as with ripple(), crest_factor() and thd().
+
+    Returns:
+        dict: {'average', 'rms', 'peak', 'peak_to_peak', 'ripple', 'crest_factor'[, 'thd']}
+    """
+    time_points, data_points = _as_arrays(time_points, data_points)
+    dt = np.diff(time_points)
+    duration = time_points[-1] - time_points[0]
+    average_value = float(np.dot(dt, data_points[1:] + data_points[:-1]) / (2 * duration))
+    squares = data_points * data_points
+    rms_value = float(np.sqrt(np.dot(dt, squares[1:] + squares[:-1]) / (2 * duration)))
+    minimum, maximum = float(np.min(data_points)), float(np.max(data_points))
+    peak_value = max(abs(minimum), abs(maximum))
+
+    result = {'average': average_value,
+              'rms': rms_value,
+              'peak': peak_value,
+              'peak_to_peak': maximum - minimum,
+              'ripple': _ratio(maximum - minimum, abs(average_value)),
+              'crest_factor': _ratio(peak_value, rms_value)}
+    if fundamental_frequency is not None:
+        result['thd'] = thd(time_points, data_points, fundamental_frequency, number_of_harmonics)
+    return result
@@ -8,6 +8,7 @@ Simple example showing how to read and use sampled signals (Multi Time-Steps Sol
 from aesim.simba import DesignExamples
 import matplotlib.pyplot as plt
 import os
+from sampled_signals import SignalTable, sampling_times
 
 #%% Load project
 flybackConverter = DesignExamples.DCDC_Flyback()
@@ -38,7 +39,15 @@ print ("len(sampled_signal_data): "+ str(len(sampled_signal_data)))
 # Vout and sampled_signal_data have different sizes! 
 # job.TimePoints cannot be used as time data for sampled signals. 
 # Instead, we can reconstruct the time data array from the sampling time.
-sampled_signal_time = [sampled_signal.SamplingTime*i for i in range(len(sampled_signal_data))]
+sampled_signal_time = sampling_times(VP1.SamplingTime, len(sampled_signal_data))
+
+#%% Align the sampled and continuous signals in one table
+table = SignalTable()
+table.add_signal(Vout_signal)                                        # linear interpolation
+table.add_signal(sampled_signal, sampling_time=VP1.SamplingTime)     # zero-order hold
+window_time, window_values = table.window(t[-1] / 2, t[-1] / 2 + 20 * VP1.SamplingTime)
+held_error = window_values['VP1 - Out'] - window_values['R2 - Instantaneous Voltage']
+print("max difference between held samples and Vout in the window: {0:.3g} V".format(abs(held_error).max()))
 
 #%% Plot Curve
 fig, ax = plt.subplots()
@@ -47,5 +56,6 @@ ax.set_ylabel('Vout (V)')
 ax.set_xlabel('time (s)')
 ax.plot(t,Vout, label="original")
 ax.plot(sampled_signal_time, sampled_signal_data, '+', label="sampled")
+ax.step(window_time, window_values['VP1 - Out'], where='post', label="sampled (held, window)")
 ax.legend()
 plt.show()
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+Time vectors and alignment of sampled signals (Multi Time-Steps Solver).
+
+A sampled signal (probe with a SamplingTime) has one point per sampling period, whereas the other signals
+follow the variable time step of the solver. This module:
+ - rebuilds the time vector of a sampled signal with np.arange (no Python loop),
+ - aligns sampled signals with different sampling times and continuous signals in one table: sampled
+   signals are held between two samples (zero-order hold) and continuous signals are interpolated linearly,
+ - answers window queries: only the samples inside the window are read. The sample index of a sampled
+   signal is computed from its sampling time (no search), continuous signals are cut with searchsorted.
+
+Usage:
+    table = SignalTable()
+    table.add_signal(job.GetSignalByName('R2 - Instantaneous Voltage'))
+    table.add_signal(job.GetSignalByName('VP1 - Out'), sampling_time=5e-6)
+    time, values = table.window(1e-3, 2e-3)           # union of the time points in the window
+    time, values = table.window(1e-3, 2e-3, time_step=1e-6)
+    print(values['VP1 - Out'])
+"""
+
+import numpy as np
+
+_TOLERANCE = 1e-9  # relative tolerance on the sample times (floating point rounding of k * sampling_time)
+
+
+def _continuous_values(time_points, data_points, query_times, hold):
+    if data_points.size == 0:
+        return np.full(query_times.shape, np.nan)
+    if hold:
+        index = np.clip(np.searchsorted(time_points, query_times, side='right') - 1, 0, data_points.size - 1)
+        return data_points[index]
+    return np.interp(query_times, time_points, data_points)
+
+
+def sampling_times(sampling_time, number_of_points, start_time=0.0):
+    """
+    Return the time vector of a sampled signal: start_time + k * sampling_time for k in [0, number_of_points).
+    """
+    return start_time + np.arange(number_of_points) * sampling_time
+
+
+class SignalTable:
+    """
+    Sampled and continuous signals aligned on common time bases.
+    """
+
+    def __init__(self):
+        self._columns = {}  # name -> dict(time, data, sampling_time, start_time, hold)
+
+    @property
+    def names(self):
+        return list(self._columns)
+
+    def add(self, name, data_points, time_points=None, sampling_time=None, start_time=0.0, hold=None):
+        """
+        Add a signal to the table.
+
+        Args:
+            name (str): name of the column
+            data_points ([float]): data points
+            time_points ([float]): time points of a continuous signal
+            sampling_time (float): sampling time of a sampled signal (its time points are not stored)
+            start_time (float): time of the first sample of a sampled signal
+            hold (bool): zero-order hold (default for sampled signals) or linear interpolation (default for continuous signals)
+        """
+        if (time_points is None) == (sampling_time is None):
+            raise ValueError("either time_points or sampling_time must be given for " + name)
+        data_points = np.asarray(data_points, dtype=np.float64)
+        if time_points is not None:
+            time_points = np.asarray(time_points, dtype=np.float64)
+            if time_points.shape != data_points.shape:
+                raise ValueError("time_points and data_points of {0} must have the same length".format(name))
+        self._columns[name] = {'time': time_points, 'data': data_points, 'sampling_time': sampling_time,
+                               'start_time': start_time, 'hold': sampling_time is not None if hold is None else hold}
+
+    def add_signal(self, signal, sampling_time=None, name=None, hold=None):
+        """
+        Add a SIMBA signal. For a sampled signal, sampling_time is the SamplingTime of its probe.
+        """
+        name = name or signal.Name
+        if sampling_time:
+            self.add(name, signal.DataPoints, sampling_time=sampling_time, hold=hold)
+        else:
+            self.add(name, signal.DataPoints, time_points=signal.TimePoints, hold=hold)
+
+    def time_points(self, name):
+        """
+        Return the time points of a signal (rebuilt from the sampling time for a sampled signal).
+        """
+        column = self._columns[name]
+        if column['time'] is not None:
+            return column['time']
+        return sampling_times(column['sampling_time'], column['data'].size, column['start_time'])
+
+    def _index_range(self, column, start_time, end_time):
+        """
+        Return the range of points of a column in [start_time, end_time], with one more point on each side.
+        """
+        size = column['data'].size
+        if column['time'] is None:
+            first = int(np.floor((start_time - column['start_time']) / column['sampling_time'] + _TOLERANCE))
+            last = int(np.floor((end_time - column['start_time']) / column['sampling_time'] + _TOLERANCE)) + 1
+        else:
+            first = int(np.searchsorted(column['time'], start_time, side='right')) - 1
+            last = int(np.searchsorted(column['time'], end_time, side='left'))
+        return min(max(first, 0), size), min(max(last + 1, 0), size)  # last: first point after end_time
+
+    def time_base(self, start_time=None, end_time=None, names=None):
+        """
+        Return the union of the time points of the signals (all of them by default) in [start_time, end_time].
+        """
+        start_time = self.start_time if start_time is None else start_time
+        end_time = self.end_time if end_time is None else end_time
+        parts = []
+        for name in names or self.names:
+            column = self._columns[name]
+            first, last = self._index_range(column, start_time, end_time)
+            if column['time'] is None:
+                parts.append(column['start_time'] + np.arange(first, last) * column['sampling_time'])
+            else:
+                parts.append(column['time'][first:last])
+        time = np.unique(np.concatenate(parts)) if parts else np.empty(0)
+        return time[(time >= start_time) & (time <= end_time)]
+
+    @property
+    def start_time(self):
+        return min(self.time_points(name)[0] for name in self.names)
+
+    @property
+    def end_time(self):
+        return max(self.time_points(name)[-1] for name in self.names)
+
+    def values(self, name, time_points):
+        """
+        Return the values of a signal at the given times (zero-order hold or linear interpolation).
+        """
+        column = self._columns[name]
+        time_points = np.asarray(time_points, dtype=np.float64)
+        data = column['data']
+        if column['time'] is None:  # sample index from the sampling time
+            position = (time_points - column['start_time']) / column['sampling_time']
+            index = np.clip(np.floor(position + _TOLERANCE).astype(np.intp), 0, data.size - 1)
+            if column['hold']:
+                return data[index]
+            following = np.minimum(index + 1, data.size - 1)
+            fraction = np.clip(position - index, 0, 1)
+            return data[index] + fraction * (data[following] - data[index])
+        return _continuous_values(column['time'], data, time_points, column['hold'])
+
+    def window(self, start_time=None, end_time=None, time_step=None, names=None):
+        """
+        Return the time vector and the values of the signals in [start_time, end_time].
+
+        Args:
+            start_time (float): start of the window (default: first time point)
+            end_time (float): end of the window (default: last time point)
+            time_step (float): if set, uniform time vector, otherwise union of the time points of the signals
+            names ([str]): signals of the table (default: all)
+
+        Returns:
+            tuple: time array, {name: values array}
+        """
+        names = names or self.names
+        start_time = self.start_time if start_time is None else start_time
+        end_time = self.end_time if end_time is None else end_time
+        if time_step is None:
+            time = self.time_base(start_time, end_time, names)
+        else:
+            time = start_time + np.arange(int(np.floor((end_time - start_time) / time_step + _TOLERANCE)) + 1) * time_step
+        values = {}
+        for name in names:
+            column = self._columns[name]
+            if column['time'] is None:
+                values[name] = self.values(name, time)
+            else:  # interpolate only on the points of the window
+                first, last = self._index_range(column, start_time, end_time)
+                values[name] = _continuous_values(column['time'][first:last], column['data'][first:last], time, column['hold'])
+        return time, values
@@ -4,6 +4,7 @@ import numpy as np
 from aesim.simba import ProjectRepository
 import matplotlib.pyplot as plt
 import matplotlib as mpl
+from continuation_sweep import ContinuationSweep
 
 #%% plot histogram
 def plot_bar(Tab1 = [], 
@@ -69,15 +70,49 @@ for scope in igbt.Scopes:
 junction_temps = []
 Losses = []
 fsw_list  = [1e3, 2e3, 5e3, 10e3, 20e3, 50e3, 100e3]
+use_continuation = False  # if true, neighbouring frequencies are simulated in the same job (see continuation_sweep.py)
+compare_with_fresh_jobs = False  # continuation: the frequencies are also simulated in fresh jobs and both results are printed
+if os.environ.get("SIMBA_SCRIPT_TEST"):  # Accelerate simulation in test environment
+    fsw_list = fsw_list[:2]
 
-#%% Get the job object and solve the system
-for fsw in fsw_list:
+def set_switching_frequency(design, fsw):
     design.Circuit.GetDeviceByName('C1').Frequency = fsw
-    job = design.TransientAnalysis.NewJob()
-    status = job.Run()
 
+def read_results(job):
     Tj = job.GetSignalByName('IGBT1 - Junction Temperature (°)').DataPoints[-1]
     Loss = job.GetSignalByName('IGBT1 - Average Total Losses (W)').DataPoints[-1]
+    return Tj, Loss
+
+def run_fresh_jobs(fsw_list):
+    results = []
+    for fsw in fsw_list:
+        set_switching_frequency(design, fsw)
+        job = design.TransientAnalysis.NewJob()
+        status = job.Run()
+        results.append(read_results(job))
+    return results
+
+#%% Get the job object and solve the system
+if use_continuation:
+    # Each frequency starts from the steady state of the previous one (less than a factor 3.2 apart) instead of t=0.
+    # Each frequency is simulated for at most the end time of the design, as a fresh job.
+    sweep = ContinuationSweep(design, set_switching_frequency, read_results,
+                              ['IGBT1 - Junction Temperature (°)', 'IGBT1 - Average Total Losses (W)'],
+                              points_per_run=5000, tolerance=1e-3, absolute_tolerance=[0.01, 1e-3])  # [°C, W]
+    results = sweep.run([(fsw,) for fsw in fsw_list], coordinates=np.log10(fsw_list), max_step=0.5)
+    results = [result if result is not None else (np.nan, np.nan) for result in results]
+    for entry in sweep.log:
+        print("fsw = {0:.0f} kHz: {1:.3f} s simulated{2}{3}".format(fsw_list[entry['index']] / 1e3, entry['simulated_time'],
+                                                                    " (fresh job)" if entry['fresh_job'] else "",
+                                                                    "" if entry['steady_state'] else " (no steady state)"))
+    if compare_with_fresh_jobs:  # check that the continuation gives the results of the fresh jobs before using it
+        for fsw, (Tj, Loss), (fresh_Tj, fresh_Loss) in zip(fsw_list, results, run_fresh_jobs(fsw_list)):
+            print("fsw = {0:.0f} kHz: Tj = {1:.2f} / {2:.2f} °C, losses = {3:.3f} / {4:.3f} W (continuation / fresh job)".format(
+                fsw / 1e3, Tj, fresh_Tj, Loss, fresh_Loss))
+else:
+    results = run_fresh_jobs(fsw_list)
+
+for (Tj, Loss) in results:
     junction_temps.append(Tj)
     Losses.append(Loss)
 
@@ -1,10 +1,10 @@
 #%% Load modules
 import os
 import random
-import numpy as np
 from aesim.simba import ProjectRepository
 import matplotlib.pyplot as plt
 import pandas as pd
+from signal_view import JobSignals
 
 
 def generate_random_values(circuit):
@@ -47,8 +47,9 @@ for iter in iterations:
     status = job.Run()
     L1_values.append(circuit_values['inductor'])
     R2_values.append(circuit_values['resistor'])
-    peak_voltages.append(max(np.array(job.GetSignalByName('R1 - Voltage').DataPoints))) 
-    peak_currents.append(max(np.array(job.GetSignalByName('L1 - Current').DataPoints)))
+    with JobSignals(job) as signals:  # signals converted once, job disposed at the end of each iteration
+        peak_voltages.append(signals.data('R1 - Voltage').max())
+        peak_currents.append(signals.data('L1 - Current').max())
 
 #%% Create a dataframe to store results
 results = pd.DataFrame({"peak_voltages":peak_voltages, "peak_currents":peak_currents, "L1":L1_values, "R2":R2_values})
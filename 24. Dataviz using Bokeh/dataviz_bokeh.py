@@ -1,7 +1,8 @@
 #%% Load modules
 from aesim.simba import DesignExamples
 from bokeh.plotting import figure
-from bokeh.io import show, output_notebook
+from bokeh.io import show, output_notebook, curdoc
+from decimation import zoomable_line
 
 #%% Load SIMBA project
 forward = DesignExamples.DCDC_Forward_Converter()
@@ -34,7 +35,11 @@ p = figure(
            tools='pan,wheel_zoom,box_zoom,reset,save',
            active_drag='box_zoom',
            tooltips = TOOLTIPS)
-p.line(t, Vds, legend_label="Mosfet Vds voltage", line_width=1)
+# Min-max decimation to the figure width: with a Bokeh server, the line is decimated again when zooming
+zoomable_line(p, t, Vds, legend_label="Mosfet Vds voltage", line_width=1)
 p.legend.location = "bottom_right"
-#output_notebook()  # For Jupyter Notebook: if this line is disable, a new HTML page will be opened showing the result. If this line is enable, run the script with interactive cell
-show(p)
+if __name__.startswith('bokeh_app'):  # run with: bokeh serve --show dataviz_bokeh.py
+    curdoc().add_root(p)
+else:
+    #output_notebook()  # For Jupyter Notebook: if this line is disable, a new HTML page will be opened showing the result. If this line is enable, run the script with interactive cell
+    show(p)
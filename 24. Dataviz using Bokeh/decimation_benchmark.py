@@ -0,0 +1,92 @@
+"""
+Benchmark of the decimation of waveforms for plotting: render time vs number of points, with and without
+decimation, for Bokeh (serialization of the figure sent to the browser) and Matplotlib (drawing of the figure).
+The waveform is a 100 kHz PWM voltage with ringing, sampled with a 2 ns time step.
+"""
+#%% Load modules
+import os
+import json
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from bokeh.plotting import figure
+from bokeh.embed import json_item
+from decimation import decimate
+
+#%% Parameters
+point_counts = [10**4, 10**5, 10**6, 10**7]
+if os.environ.get("SIMBA_SCRIPT_TEST"):  # Accelerate benchmark in test environment
+    point_counts = [10**3, 10**4, 10**5]
+width = 800  # width of the plots in pixels
+
+
+def pwm_waveform(number_of_points, time_step=2e-9, switching_frequency=100e3):
+    """
+    Return the time and voltage arrays of a PWM voltage with ringing after each edge.
+    """
+    t = np.arange(number_of_points) * time_step
+    phase = (t * switching_frequency) % 1
+    time_since_edge = np.where(phase < 0.5, phase, phase - 0.5) / switching_frequency
+    ringing = 80 * np.exp(-time_since_edge / 100e-9) * np.sin(2 * np.pi * 20e6 * time_since_edge)
+    return t, 800 * (phase < 0.5) + ringing
+
+
+def bokeh_render_time(t, v):
+    """
+    Return the time to build and serialize a Bokeh figure of the waveform, and the size of the payload.
+    """
+    start = time.perf_counter()
+    p = figure(width=width, height=300)
+    p.line(t, v)
+    payload = json.dumps(json_item(p))
+    return time.perf_counter() - start, len(payload)
+
+
+def matplotlib_render_time(t, v):
+    """
+    Return the time to draw a Matplotlib figure of the waveform (off-screen).
+    """
+    start = time.perf_counter()
+    fig = Figure(figsize=(width / 100, 3), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    fig.add_subplot().plot(t, v)
+    canvas.draw()
+    return time.perf_counter() - start
+
+
+#%% Run the benchmark
+results = {key: [] for key in ['decimation', 'bokeh_full', 'bokeh_decimated', 'payload_full', 'payload_decimated',
+                               'matplotlib_full', 'matplotlib_decimated']}
+print(f"{'points':>10} | {'decimation':>10} | {'Bokeh full':>10} | {'decimated':>10} | {'MPL full':>10} | {'decimated':>10}")
+for number_of_points in point_counts:
+    t, v = pwm_waveform(number_of_points)
+    start = time.perf_counter()
+    t_plot, v_plot = decimate(t, v, width)
+    results['decimation'].append(time.perf_counter() - start)
+
+    for suffix, (x, y) in [('full', (t, v)), ('decimated', (t_plot, v_plot))]:
+        render_time, payload = bokeh_render_time(x, y)
+        results['bokeh_' + suffix].append(render_time)
+        results['payload_' + suffix].append(payload)
+        results['matplotlib_' + suffix].append(matplotlib_render_time(x, y))
+
+    print(f"{number_of_points:>10} | {results['decimation'][-1]:>9.3f}s | {results['bokeh_full'][-1]:>9.3f}s | "
+          f"{results['bokeh_decimated'][-1]:>9.3f}s | {results['matplotlib_full'][-1]:>9.3f}s | {results['matplotlib_decimated'][-1]:>9.3f}s")
+    print(f"{'':>10}   Bokeh payload: {results['payload_full'][-1] / 1e6:.1f} MB full, {results['payload_decimated'][-1] / 1e6:.3f} MB decimated ({t_plot.size} points)")
+
+if os.environ.get("SIMBA_SCRIPT_TEST"): exit() # Skip plotting in test environment
+
+#%% Plot render time vs number of points
+fig, ax = plt.subplots()
+ax.loglog(point_counts, results['bokeh_full'], 'r-o', label='Bokeh, full resolution')
+ax.loglog(point_counts, np.add(results['bokeh_decimated'], results['decimation']), 'r--o', label='Bokeh, decimated (incl. decimation)')
+ax.loglog(point_counts, results['matplotlib_full'], 'b-o', label='Matplotlib, full resolution')
+ax.loglog(point_counts, np.add(results['matplotlib_decimated'], results['decimation']), 'b--o', label='Matplotlib, decimated (incl. decimation)')
+ax.set_xlabel('Number of points')
+ax.set_ylabel('Render time (s)')
+ax.set_title(f'Render time vs number of points (min-max decimation to {width} pixels)')
+ax.grid(which='both')
+ax.legend()
+plt.show()
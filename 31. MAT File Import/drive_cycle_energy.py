@@ -0,0 +1,294 @@
+"""
+Energy consumption of drive cycles evaluated on the loss maps of a motor drive.
+
+Simulating a motor drive over a whole drive cycle takes much longer than the cycle itself. Instead, the
+efficiency map of the drive is simulated once (see the example "13. Inverter Efficiency Map") and the
+drive cycles are evaluated on it:
+ - Vehicle converts a drive cycle (time [s], speed [km/h]) into the speed [RPM] and torque [N.m] demanded to
+   the motor (road load equation, wheel radius, gear ratio),
+ - LossMap interpolates the losses of the map at all the operating points of a cycle at once (linear
+   interpolation on the Delaunay triangulation of the simulated points). The operating points outside the
+   convex hull of the simulated points are flagged; their losses are estimated with the nearest simulated point
+   and reported separately (extrapolated losses),
+ - evaluate_cycle() integrates the shaft, loss and DC energies of a cycle and evaluate_cycles() evaluates
+   many cycles in a pool of processes,
+ - queue_points() groups the operating points outside the map in cells and adds them to a CSV file of new
+   operating points to simulate.
+The maps only contain positive torques: braking (regeneration) torques are evaluated on the map with their
+absolute value (losses assumed symmetrical).
+
+Usage:
+    vehicle = Vehicle(mass=2057, wheel_radius=0.3, gear_ratio=9.0)
+    loss_map = LossMap.from_inverter_map(data['speed'], data['torque'], data['efficiency'], motor_efficiency=0.9)
+    result = evaluate_cycle(time, speed_kmh, vehicle, loss_map)
+    results = evaluate_cycles(drive_cycles, vehicle, loss_map)     # {name: result}, under if __name__ == "__main__":
+    queue_points('new_operating_points.csv', result['outside_speed'], result['outside_torque'], result['outside_duration'])
+"""
+
+import multiprocessing
+import os
+import numpy as np
+from scipy.spatial import Delaunay, cKDTree
+
+_WH = 3600.0  # J per Wh
+
+
+def _integrate(power, time):
+    """
+    Return the energy [J] of a power [W] sampled at time [s] (trapezoidal rule).
+    """
+    return float(np.dot(np.diff(time), power[1:] + power[:-1]) / 2)
+
+
+class Vehicle:
+    """
+    Road load and driveline of a vehicle. The default road load coefficients are those of the electric car of
+    the example "16. CSV File Import".
+
+    Args:
+        mass (float): mass of the vehicle [kg]
+        rolling_resistance (float): constant road load on flat land [N]
+        viscous_resistance (float): road load proportional to the speed [N / (m/s)]
+        aerodynamic_drag (float): road load proportional to the square of the speed [N / (m/s)²]
+        wheel_radius (float): wheel radius [m]
+        gear_ratio (float): motor speed / wheel speed
+        gear_efficiency (float): efficiency of the gearbox
+        number_of_motors (int): number of motors sharing the traction torque
+        regenerative_braking (bool): if False, the braking torque is provided by the mechanical brakes (motor torque = 0)
+    """
+
+    def __init__(self, mass=2057.0, rolling_resistance=178.7, viscous_resistance=3.3084, aerodynamic_drag=0.5231952,
+                 wheel_radius=0.3, gear_ratio=9.0, gear_efficiency=0.97, number_of_motors=1, regenerative_braking=True):
+        self.mass = mass
+        self.rolling_resistance = rolling_resistance
+        self.viscous_resistance = viscous_resistance
+        self.aerodynamic_drag = aerodynamic_drag
+        self.wheel_radius = wheel_radius
+        self.gear_ratio = gear_ratio
+        self.gear_efficiency = gear_efficiency
+        self.number_of_motors = number_of_motors
+        self.regenerative_braking = regenerative_braking
+
+    def motor_demand(self, time, speed_kmh):
+        """
+        Return the speed [RPM] and the torque [N.m] of each motor along a drive cycle.
+
+        Args:
+            time (array): time points [s]
+            speed_kmh (array): vehicle speed [km/h]
+        """
+        time = np.asarray(time, dtype=np.float64)
+        speed_ms = np.asarray(speed_kmh, dtype=np.float64) / 3.6
+        acceleration = np.gradient(speed_ms, time) if len(time) > 1 else np.zeros(speed_ms.shape)
+
+        tractive_force = (self.mass * acceleration + self.rolling_resistance + self.viscous_resistance * speed_ms
+                          + self.aerodynamic_drag * speed_ms ** 2)
+        tractive_force = np.where(speed_ms > 0, tractive_force, 0.0)  # vehicle stopped: no torque
+        if not self.regenerative_braking:
+            tractive_force = np.maximum(tractive_force, 0.0)
+
+        wheel_torque = tractive_force * self.wheel_radius / self.number_of_motors
+        motor_torque = np.where(wheel_torque > 0, wheel_torque / self.gear_efficiency, wheel_torque * self.gear_efficiency) / self.gear_ratio
+        motor_speed = speed_ms / self.wheel_radius * self.gear_ratio * 60 / (2 * np.pi)
+        return motor_speed, motor_torque
+
+
+class LossMap:
+    """
+    Losses of a motor drive vs speed and torque, linearly interpolated between the simulated operating points.
+
+    Args:
+        speed ([float]): speed of the simulated operating points [RPM]
+        torque ([float]): torque of the simulated operating points [N.m]
+        losses (dict): losses at the simulated operating points [W], by name (ex: {'inverter': ..., 'motor': ...})
+    """
+
+    def __init__(self, speed, torque, losses):
+        speed = np.asarray(speed, dtype=np.float64).ravel()
+        torque = np.asarray(torque, dtype=np.float64).ravel()
+        losses = {name: np.asarray(values, dtype=np.float64).ravel() for name, values in losses.items()}
+        valid = np.isfinite(speed) & np.isfinite(torque)
+        for values in losses.values():
+            valid &= np.isfinite(values)
+        self.speed, self.torque = speed[valid], torque[valid]
+        self.losses = {name: values[valid] for name, values in losses.items()}
+        if self.speed.size < 3:
+            raise ValueError("at least 3 valid operating points are needed to build the loss map")
+        self._lower = np.array([self.speed.min(), self.torque.min()])
+        self._range = np.array([self.speed.max(), self.torque.max()]) - self._lower
+        self._range[self._range == 0] = 1.0
+        points = self._scale(self.speed, self.torque)
+        self._triangulation = Delaunay(points)
+        self._tree = cKDTree(points)
+
+    @classmethod
+    def from_inverter_map(cls, speed, torque, efficiency, inverter_losses=None, motor_efficiency=1.0):
+        """
+        Build the loss map from an inverter efficiency map (ex: written by inverter_map.py).
+
+        Args:
+            speed ([float]): speed of the operating points [RPM]
+            torque ([float]): torque of the operating points [N.m]
+            efficiency ([float]): inverter efficiency (inverter output power / inverter input power)
+            inverter_losses ([float]): simulated inverter losses [W]. If None, they are calculated from the efficiency.
+            motor_efficiency (float): constant motor efficiency (shaft power / motor input power). 1: no motor losses.
+        """
+        speed = np.asarray(speed, dtype=np.float64)
+        torque = np.asarray(torque, dtype=np.float64)
+        shaft_power = np.abs(torque * speed * 2 * np.pi / 60)
+        motor_losses = shaft_power * (1 / motor_efficiency - 1)
+        if inverter_losses is None:
+            inverter_losses = (shaft_power + motor_losses) * (1 / np.asarray(efficiency, dtype=np.float64) - 1)
+        losses = {'inverter': inverter_losses}
+        if motor_efficiency != 1.0:
+            losses['motor'] = motor_losses
+        return cls(speed, torque, losses)
+
+    def _scale(self, speed, torque):
+        return (np.column_stack((np.ravel(speed), np.ravel(torque))) - self._lower) / self._range
+
+    def __call__(self, speed, torque):
+        """
+        Return the interpolated losses {name: array} at the query points and the mask of the points outside the map.
+        The losses of the points outside the map are those of the nearest simulated point.
+
+        Args:
+            speed (array): speed [RPM]
+            torque (array): torque [N.m]. Broadcast with speed.
+        """
+        speed, torque = np.broadcast_arrays(np.asarray(speed, dtype=np.float64), np.asarray(torque, dtype=np.float64))
+        points = self._scale(speed, torque)
+        simplex = self._triangulation.find_simplex(points)
+        outside = simplex < 0
+        transform = self._triangulation.transform[np.where(outside, 0, simplex)]  # (n, 3, 2)
+        barycentric = np.einsum('nij,nj->ni', transform[:, :2], points - transform[:, 2])
+        weights = np.column_stack((barycentric, 1 - barycentric.sum(axis=1)))
+        vertices = self._triangulation.simplices[np.where(outside, 0, simplex)]
+        if outside.any():  # nearest simulated point
+            _, nearest = self._tree.query(points[outside])
+            vertices[outside] = nearest[:, None]
+            weights[outside] = 1.0 / 3
+        losses = {name: np.einsum('ij,ij->i', values[vertices], weights).reshape(speed.shape)
+                  for name, values in self.losses.items()}
+        return losses, outside.reshape(speed.shape)
+
+    def __reduce__(self):
+        # the triangulation is rebuilt from the simulated points (sent to the processes of evaluate_cycles)
+        return (LossMap, (self.speed, self.torque, self.losses))
+
+
+def evaluate_cycle(time, speed_kmh, vehicle, loss_map, time_step=1.0):
+    """
+    Evaluate the energies of a drive cycle on a loss map. The cycle is resampled with a constant time step.
+
+    Args:
+        time (array): time points of the drive cycle [s]
+        speed_kmh (array): vehicle speed [km/h]
+        vehicle (Vehicle): vehicle
+        loss_map (LossMap): losses of one motor drive
+        time_step (float): time step of the evaluation [s]
+
+    Returns:
+        dict: duration [s], distance [km], traction_energy and braking_energy at the motor shafts [Wh],
+            <name>_losses [Wh] for each loss of the map, dc_energy [Wh] drawn from the DC bus (all motors),
+            consumption [Wh/km], outside_fraction (fraction of the driving time outside the map),
+            extrapolated_losses [Wh] and extrapolated_consumption [Wh/km] (part of the losses and of the consumption
+            estimated with the nearest simulated point, at the operating points outside the map),
+            motor_speed, motor_torque (operating points) and outside_speed, outside_torque, outside_duration
+            (operating points outside the map, absolute torque, duration [s] of each point)
+    """
+    time = np.asarray(time, dtype=np.float64)
+    uniform_time = np.arange(time[0], time[-1] + time_step / 2, time_step)
+    speed_kmh = np.interp(uniform_time, time, np.asarray(speed_kmh, dtype=np.float64))
+    motor_speed, motor_torque = vehicle.motor_demand(uniform_time, speed_kmh)
+
+    losses, outside = loss_map(motor_speed, np.abs(motor_torque))
+    driving = motor_torque != 0  # stopped or coasting without torque: no losses
+    outside &= driving
+    shaft_power = motor_torque * motor_speed * 2 * np.pi / 60
+    dc_power = shaft_power.copy()
+    extrapolated_power = np.zeros_like(shaft_power)
+    result = {'duration': float(uniform_time[-1] - uniform_time[0]),
+              'distance': _integrate(speed_kmh / 3.6, uniform_time) / 1000,
+              'traction_energy': vehicle.number_of_motors * _integrate(np.maximum(shaft_power, 0.0), uniform_time) / _WH,
+              'braking_energy': vehicle.number_of_motors * _integrate(np.minimum(shaft_power, 0.0), uniform_time) / _WH}
+    for name, values in losses.items():
+        values = np.where(driving, values, 0.0)
+        dc_power += values
+        extrapolated_power += np.where(outside, values, 0.0)
+        result[name + '_losses'] = vehicle.number_of_motors * _integrate(values, uniform_time) / _WH
+    result['dc_energy'] = vehicle.number_of_motors * _integrate(dc_power, uniform_time) / _WH
+    result['consumption'] = result['dc_energy'] / result['distance'] if result['distance'] > 0 else np.nan
+    result['extrapolated_losses'] = vehicle.number_of_motors * _integrate(extrapolated_power, uniform_time) / _WH
+    result['extrapolated_consumption'] = result['extrapolated_losses'] / result['distance'] if result['distance'] > 0 else np.nan
+    result['outside_fraction'] = np.count_nonzero(outside) / max(np.count_nonzero(driving), 1)
+    result.update({'motor_speed': motor_speed, 'motor_torque': motor_torque,
+                   'outside_speed': motor_speed[outside], 'outside_torque': np.abs(motor_torque[outside]),
+                   'outside_duration': np.full(np.count_nonzero(outside), time_step)})
+    return result
+
+
+_worker_arguments = None  # (vehicle, loss_map, time_step) of the current process
+
+
+def _init_worker(vehicle, loss_map, time_step):
+    global _worker_arguments
+    _worker_arguments = (vehicle, loss_map, time_step)
+
+
+def _evaluate_item(item):
+    name, cycle = item
+    vehicle, loss_map, time_step = _worker_arguments
+    return name, evaluate_cycle(cycle[:, 0], cycle[:, 1], vehicle, loss_map, time_step)
+
+
+def evaluate_cycles(drive_cycles, vehicle, loss_map, time_step=1.0, number_of_processes=None):
+    """
+    Evaluate drive cycles in a pool of processes and return {name: evaluate_cycle() result}.
+    The vehicle and the loss map are sent once to each process. Call it under if __name__ == "__main__":.
+
+    Args:
+        drive_cycles (dict): drive cycles by name, arrays of (time [s], speed [km/h]) rows
+        vehicle (Vehicle): vehicle
+        loss_map (LossMap): losses of one motor drive
+        time_step (float): time step of the evaluation [s]
+        number_of_processes (int): number of processes (default: number of CPUs, 1: no pool)
+    """
+    items = [(name, np.asarray(cycle, dtype=np.float64)) for name, cycle in drive_cycles.items()]
+    if number_of_processes == 1 or len(items) <= 1:
+        _init_worker(vehicle, loss_map, time_step)
+        return dict(_evaluate_item(item) for item in items)
+    number_of_processes = min(number_of_processes or multiprocessing.cpu_count(), len(items))
+    with multiprocessing.Pool(number_of_processes, initializer=_init_worker, initargs=(vehicle, loss_map, time_step)) as pool:
+        return dict(pool.map(_evaluate_item, items, chunksize=max(1, len(items) // (4 * number_of_processes))))
+
+
+def queue_points(path, speed, torque, duration, speed_step=100.0, torque_step=0.5, append=True):
+    """
+    Add operating points outside the map to a CSV file of new operating points to simulate.
+    The points are grouped in cells of speed_step x torque_step (center of the cell) and the time spent in each
+    cell is added to the time already in the file (if append): the cells with the longest duration matter the most.
+    Returns the (speed, torque, duration) arrays of the file, sorted by decreasing duration.
+
+    Args:
+        path (str): CSV file (columns: speed (RPM), torque (N.m), duration (s))
+        speed (array): speed of the operating points [RPM]
+        torque (array): torque of the operating points [N.m]
+        duration (array): time spent at each operating point [s]
+        speed_step (float): width of the cells [RPM]
+        torque_step (float): height of the cells [N.m]
+        append (bool): if False, the file is replaced
+    """
+    cells = np.column_stack(((np.floor(np.asarray(speed) / speed_step) + 0.5) * speed_step,
+                             (np.floor(np.asarray(torque) / torque_step) + 0.5) * torque_step))
+    duration = np.asarray(duration, dtype=np.float64)
+    if append and os.path.exists(path):
+        queued = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+        cells = np.vstack((cells, queued[:, :2]))
+        duration = np.concatenate((duration, queued[:, 2]))
+    cells, index = np.unique(np.round(cells, 9), axis=0, return_inverse=True)
+    duration = np.bincount(index.ravel(), weights=duration, minlength=len(cells))
+    order = np.argsort(-duration, kind='stable')
+    np.savetxt(path, np.column_stack((cells[order], duration[order])), delimiter=',', fmt='%.6g',
+               header='speed (RPM),torque (N.m),duration (s)', comments='')
+    return cells[order, 0], cells[order, 1], duration[order]
@@ -0,0 +1,117 @@
+"""
+Energy consumption of an electric vehicle over all the drive cycles of "all_drive_cycles.mat", evaluated on the
+efficiency map of the inverter computed by the example "13. Inverter Efficiency Map".
+
+Each drive cycle is converted into the speed and torque demanded to the motor and the losses are interpolated
+on the map (see drive_cycle_energy.py): all the cycles are evaluated in a few seconds, without simulating them.
+The operating points outside the map are reported and added to "new_operating_points.csv" (points to simulate
+to extend the map). The map is read with load_map() of the example "13. Inverter Efficiency Map".
+"""
+
+#%% Load modules
+import os, sys, time
+import numpy as np
+import pandas as pd
+import scipy.io as sio
+import matplotlib.pyplot as plt
+import matplotlib as mpl
+from drive_cycle_energy import Vehicle, LossMap, evaluate_cycles, queue_points
+
+script_folder = os.path.realpath(os.path.dirname(__file__))
+map_folder = os.path.join(script_folder, '..', '13. Inverter Efficiency Map')
+sys.path.append(map_folder)
+from inverter_map_plot import load_map  # map_<date> folders and map_data_<date>.pkl files written by inverter_map.py
+
+
+#############################
+#         PARAMETERS        #
+#############################
+map_date = '2024-05-02'         # date of the map computed by inverter_map.py in map_folder
+motor_efficiency = 0.9          # constant motor efficiency (the map only contains the inverter losses)
+time_step = 1.0                 # time step of the evaluation [s]
+queue_new_points = True         # if true, the operating points outside the map are added to new_operating_points.csv
+write_files = not os.environ.get("SIMBA_SCRIPT_TEST")  # results saved in drive_cycle_energy.csv (not in the test environment)
+number_of_processes = None      # number of processes evaluating the cycles (None: number of CPUs)
+
+# Small electric vehicle driven by two motors of the example map. The map only covers about 800 to 3700 RPM and
+# 1.8 to 8.3 N.m: the starts, the light loads and the highway speeds of the cycles are outside it. Their losses are
+# estimated with the nearest simulated point and reported separately (extrapolated consumption).
+vehicle = Vehicle(mass=450.0,           # mass [kg]
+                  rolling_resistance=45.0,  # constant road load [N]
+                  viscous_resistance=0.8,   # road load proportional to the speed [N / (m/s)]
+                  aerodynamic_drag=0.25,    # road load proportional to the square of the speed [N / (m/s)²]
+                  wheel_radius=0.25,        # [m]
+                  gear_ratio=5.0,           # motor speed / wheel speed
+                  number_of_motors=2)       # one motor per driven wheel
+
+
+#############################
+#           METHODS         #
+#############################
+def load_drive_cycles(path):
+    """
+    Load the drive cycles of a .mat file: {name: array of (time [s], speed [km/h]) rows}
+    """
+    contents = sio.loadmat(path)
+    return {key: value for key, value in contents.items() if isinstance(value, np.ndarray)}
+
+
+#############################
+#         MAIN SCRIPT       #
+#############################
+if __name__ == "__main__":
+
+    #%% Load the map and the drive cycles
+    data, _ = load_map(map_folder, map_date)
+    loss_map = LossMap.from_inverter_map(data['speed'], data['torque'], data['efficiency'],
+                                         data['total_inverter_losses'] if 'total_inverter_losses' in data else None,
+                                         motor_efficiency)
+    drive_cycles = load_drive_cycles(os.path.join(script_folder, 'DriveCycles', 'all_drive_cycles.mat'))
+    print("{0} operating points in the map, {1} drive cycles".format(len(loss_map.speed), len(drive_cycles)))
+
+    #%% Evaluate all the drive cycles in parallel
+    start_time = time.time()
+    results = evaluate_cycles(drive_cycles, vehicle, loss_map, time_step, number_of_processes)
+    print("{0} drive cycles evaluated in {1:.2f} s".format(len(results), time.time() - start_time))
+
+    columns = ['duration', 'distance', 'traction_energy', 'braking_energy'] + [name + '_losses' for name in loss_map.losses] \
+              + ['extrapolated_losses', 'dc_energy', 'consumption', 'extrapolated_consumption', 'outside_fraction']
+    table = pd.DataFrame({name: [result[column] for column in columns] for name, result in results.items()}, index=columns).T
+    pd.set_option('display.width', 200)
+    print(table.round(3))
+    if write_files:
+        table.to_csv(os.path.join(script_folder, 'drive_cycle_energy.csv'), index_label='cycle')
+
+    #%% Report the operating points outside the map
+    for name, result in results.items():
+        if result['outside_fraction'] > 0:
+            print("{0}: {1:.1f}% of the driving time outside the map, consumption {2:.1f} Wh/km = {3:.1f} Wh/km "
+                  "(shaft energy and losses inside the map) + {4:.1f} Wh/km (losses estimated with the nearest point)".format(
+                      name, 100 * result['outside_fraction'], result['consumption'],
+                      result['consumption'] - result['extrapolated_consumption'], result['extrapolated_consumption']))
+    if queue_new_points and write_files:
+        queue_path = os.path.join(script_folder, 'new_operating_points.csv')
+        speeds, torques, durations = queue_points(queue_path,
+                                                  np.concatenate([result['outside_speed'] for result in results.values()]),
+                                                  np.concatenate([result['outside_torque'] for result in results.values()]),
+                                                  np.concatenate([result['outside_duration'] for result in results.values()]),
+                                                  append=False)
+        print("{0} operating points to simulate in {1}".format(len(speeds), queue_path))
+
+    #%% Plot the consumption of each cycle and the operating points on the map
+    mpl.rcParams['font.size'] = 8  # Set the default font
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+    ax1.bar(table.index, table['consumption'] - table['extrapolated_consumption'], color='orange', label='inside the map')
+    ax1.bar(table.index, table['extrapolated_consumption'], bottom=table['consumption'] - table['extrapolated_consumption'],
+            color='grey', label='extrapolated losses')
+    ax1.set(ylabel='DC consumption (Wh / km)', title='Consumption per drive cycle')
+    ax1.legend()
+    ax1.tick_params(axis='x', labelrotation=90)
+
+    for name, result in results.items():
+        ax2.plot(result['motor_speed'], np.abs(result['motor_torque']), linestyle='none', marker='.', ms=1, alpha=0.3)
+    ax2.plot(loss_map.speed, loss_map.torque, color='black', linestyle='none', marker='o', ms=3, label='map points')
+    ax2.set(xlabel='Speed [RPM]', ylabel='|Torque| [N.m]', title='Operating points of the drive cycles')
+    ax2.legend()
+    fig.tight_layout()
+    plt.show()
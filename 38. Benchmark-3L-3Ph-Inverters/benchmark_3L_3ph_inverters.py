@@ -1,6 +1,7 @@
 import os, multiprocessing
 from tqdm import tqdm
-from aesim.simba import ProjectRepository, License
+from aesim.simba import License
+import sweep_worker
 import pandas as pd
 from datetime import datetime
 
@@ -28,23 +29,18 @@ else:
 #           METHODS         #
 #############################
 
-def run_simulation(topo, sim_number, manager_result_dict, lock):
+def run_simulation(topo, sim_number, manager_result_dict):
     """
     Run SIMBA Simulation and place the results in "manager_result_dict"
+    The project is loaded once per process by sweep_worker.init_worker (pool initializer).
     """ 
     log = False # if true, log simulation results
 
-    # Get simba project
-    with lock:
-        script_folder = os.path.realpath(os.path.dirname(__file__))
-        file_path = os.path.join(script_folder, "benchmark_3L_3ph_inverters.jsimba")
-        project = ProjectRepository(file_path)
-
     # Load design and run simulation
-    design = project.GetDesignByName(topo)
-    design.Circuit.SetVariableValue('ma', str(0.8))
-    design.TransientAnalysis.EndTime = end_time
-    design.TransientAnalysis.TimeStep = 5e-8
+    design = sweep_worker.get_design(topo)
+    sweep_worker.set_variable(design, 'ma', 0.8)
+    sweep_worker.set_analysis_setting(design, 'EndTime', end_time)
+    sweep_worker.set_analysis_setting(design, 'TimeStep', 5e-8)
     job = design.TransientAnalysis.NewJob()
     status = job.Run()
     if str(status) != "OK" or log: 
@@ -55,13 +51,15 @@ def run_simulation(topo, sim_number, manager_result_dict, lock):
     conduction_loss = {}
     switching_loss = {}
     Tj = {}
-    waveforms['U12-data'] = job.GetSignalByName('U12 - Voltage').DataPoints
-    waveforms['U12-time'] = job.GetSignalByName('U12 - Voltage').TimePoints
+    waveforms['U12-data'] = list(job.GetSignalByName('U12 - Voltage').DataPoints)
+    waveforms['U12-time'] = list(job.GetSignalByName('U12 - Voltage').TimePoints)
     for s in switches[topo]:
         conduction_loss[s] = job.GetSignalByName(s + ' - Average Conduction Losses (W)').DataPoints[-1]
         switching_loss[s] = job.GetSignalByName(s + ' - Average Switching Losses (W)').DataPoints[-1]
         Tj[s] = max(job.GetSignalByName(s + ' - Junction Temperature (°)').DataPoints)
     
+    job.Dispose() # free memory, the process is reused for the next simulation
+
     manager_result_dict[sim_number] = [topo, waveforms, conduction_loss, switching_loss, Tj]
 
 def run_simulation_star(args):
@@ -78,7 +76,6 @@ def run_simulation_star(args):
 if __name__ == "__main__": # Called only in main thread. It confirms that the code is under main function
 
     manager = multiprocessing.Manager()
-    lock = manager.Lock()
     manager_result_dict = manager.dict()
 
     # Create all scenarii
@@ -86,13 +83,18 @@ if __name__ == "__main__": # Called only in main thread. It confirms that the co
     sim_nb = 0
     # for op_index in range(len(op_points)):
     for topo in topos:
-        pool_args.append((topo, sim_nb, manager_result_dict, lock))
+        pool_args.append((topo, sim_nb, manager_result_dict))
         sim_nb += 1
     
-    # Start process pool
-    pool = multiprocessing.Pool(number_of_parallel_simulations)
+    # Start process pool. Each process loads the project only once.
+    script_folder = os.path.realpath(os.path.dirname(__file__))
+    project_path = os.path.join(script_folder, "benchmark_3L_3ph_inverters.jsimba")
+    pool = multiprocessing.Pool(number_of_parallel_simulations, initializer=sweep_worker.init_worker,
+                                initargs=(project_path, multiprocessing.Lock()))
     for _ in tqdm(pool.imap(run_simulation_star, pool_args), total=len(pool_args)):
         pass
+    pool.close()
+    pool.join()
 
 # Store results in dedicated dictionnary
     res = {}
@@ -17,10 +17,12 @@ import os
 from aesim.simba import ProjectRepository, License
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
 import multiprocessing
 import tqdm
 import math
+import shared_results
+from signal_alignment import align_signals
+from switching_events import switching_events, TURN_ON, TURN_OFF
 
 
 # Determine the number of available parallel simulation licenses
@@ -31,6 +33,9 @@ available_parallel_simulations = License.NumberOfAvailableParallelSimulationLice
 script_directory = os.path.realpath(os.path.dirname(__file__))
 project_file = os.path.join(script_directory, "zvs_characterization_infineonIMBG120R008M2H.jsimba")
 fundamental_frequency = 100e3  # Fundamental switching frequency in Hz
+gate_threshold = 3.2           # Gate voltage defining the switching instants in V
+switching_window = (100e-9, 200e-9)  # Event window before and after each gate edge in s
+verbose = False                # Print the per-event switching energies of each operating point
 
 
 #%% Define Data for Parametric Analysis
@@ -43,51 +48,58 @@ if os.environ.get("SIMBA_SCRIPT_TEST"):  # Accelerate simulation in test environ
     load_currents = [10, 50, 130, 250]
 
 
+# Columns of the shared result table (one row per simulation)
+result_schema = [
+    ('temperature', 'f8'), ('load_current', 'f8'), ('switching_frequency', 'f8'),
+    ('total_energy_loss', 'f8'), ('maximum_voltage', 'f8'), ('delta_voltage', 'f8'),
+    ('switched_current', 'f8'), ('forward_current', 'f8'), ('reverse_current', 'f8'),
+    ('turn_on_energy', 'f8'), ('turn_off_energy', 'f8'),
+]
+
+project_lock = None  # Lock used to guard project loading, set in each process by init_process()
+
+
 #%% Helper: Rebase Signals onto a Unified Time Base
 def rebase_signals(time1, signal1, time2, signal2, time3, signal3):
     """
-    Interpolate three signals onto a unified time base.
+    Interpolate three signals onto a unified time base (union of their sorted time points).
 
     Returns
     -------
     unified_time : np.ndarray
     rebased_signal1, rebased_signal2, rebased_signal3 : np.ndarray
     """
-    unified_time = np.array(sorted(set(time1).union(time2).union(time3)))
-
-    interp_func1 = interp1d(time1, signal1, kind='linear', fill_value="extrapolate")
-    interp_func2 = interp1d(time2, signal2, kind='linear', fill_value="extrapolate")
-    interp_func3 = interp1d(time3, signal3, kind='linear', fill_value="extrapolate")
+    return align_signals([(time1, signal1), (time2, signal2), (time3, signal3)], extrapolate=True)
 
-    rebased_signal1 = interp_func1(unified_time)
-    rebased_signal2 = interp_func2(unified_time)
-    rebased_signal3 = interp_func3(unified_time)
 
-    return unified_time, rebased_signal1, rebased_signal2, rebased_signal3
+#%% Pool Initializer
+def init_process(lock, results_handle):
+    """
+    Store the project lock and attach the process to the shared result table.
+    """
+    global project_lock
+    project_lock = lock
+    shared_results.init_worker(results_handle)
 
 
 #%% Function to Run a Single Simulation and Compute Energy-Related Values
-def run_simulation(sim_index, temperature, load_current, switching_frequency, results_list, lock):
+def run_simulation(sim_index, temperature, load_current, switching_frequency):
     """
     Run a simulation with specified parameters and compute energy losses.
 
     Parameters
     ----------
     sim_index : int
-        Index where results will be stored in the shared list.
+        Row of the shared result table where results will be stored.
     temperature : float
         Device temperature in °C.
     load_current : float
         Load current in A.
     switching_frequency : float
         Switching frequency in Hz.
-    results_list : multiprocessing.Manager().list
-        Shared list to store the results.
-    lock : multiprocessing.Manager().Lock
-        Lock used to guard project loading.
     """
     # Load project under a lock (SIMBA project open is not process-safe)
-    with lock:
+    with project_lock:
         project = ProjectRepository(project_file)
     design = project.GetDesignByName('Design - Tc')
 
@@ -136,9 +148,13 @@ def run_simulation(sim_index, temperature, load_current, switching_frequency, re
     instantaneous_power = vds_r * i_r
     total_energy_loss = float(np.trapezoid(instantaneous_power, time_array))
 
-    # Switched current when Vgs < 3.2 V (threshold assumption)
-    idxs = np.where(vgs_r < 3.2)[0]
-    switched_current = float(i_r[idxs[0]]) if idxs.size else float('nan')
+    # Switching events: all the gate edges of the window (Vgs crossing 3.2 V)
+    events = switching_events(time_array, vgs_r, vds_r, i_r, gate_threshold, *switching_window)
+    turn_on_events = events[events['kind'] == TURN_ON]
+    turn_off_events = events[events['kind'] == TURN_OFF]
+    switched_current = float(turn_off_events['current'][0]) if turn_off_events.size else float('nan')
+    turn_on_energy = float(np.mean(turn_on_events['energy'])) if turn_on_events.size else float('nan')
+    turn_off_energy = float(np.mean(turn_off_events['energy'])) if turn_off_events.size else float('nan')
 
     # Conduction-phase metrics (start at 60% of one switching period)
     period = 1.0 / switching_frequency
@@ -169,11 +185,12 @@ def run_simulation(sim_index, temperature, load_current, switching_frequency, re
         reverse_current = float('nan')
 
     # Store results
-    results_list[sim_index] = (
+    shared_results.write(sim_index, (
         float(temperature), float(load_current), float(switching_frequency),
         total_energy_loss, maximum_voltage, delta_voltage,
         switched_current, forward_current, reverse_current,
-    )
+        turn_on_energy, turn_off_energy,
+    ))
 
 
 def run_simulation_star(args):
@@ -184,24 +201,22 @@ def run_simulation_star(args):
 if __name__ == "__main__":
     print("Starting parametric analysis...")
 
-    manager = multiprocessing.Manager()
-    lock = manager.Lock()
-
     total_simulations = len(temperatures) * len(load_currents) * 2  # times 2 for f and 2f
-    results = manager.list([None] * total_simulations)
+    results = shared_results.SharedResults(result_schema, total_simulations)  # NaN rows until written
 
     # Prepare simulation arguments
     sim_args = []
     sim_index = 0
     for T in temperatures:
         for I in load_currents:
-            sim_args.append((sim_index, T, I, fundamental_frequency, results, lock)); sim_index += 1
-            sim_args.append((sim_index, T, I, 2 * fundamental_frequency, results, lock)); sim_index += 1
+            sim_args.append((sim_index, T, I, fundamental_frequency)); sim_index += 1
+            sim_args.append((sim_index, T, I, 2 * fundamental_frequency)); sim_index += 1
 
     # Worker pool sized by SIMBA license and CPU count
     n_licenses = int(available_parallel_simulations) if available_parallel_simulations is not None else 1
     num_workers = max(1, min(n_licenses, multiprocessing.cpu_count()))
-    pool = multiprocessing.Pool(processes=num_workers)
+    pool = multiprocessing.Pool(processes=num_workers, initializer=init_process,
+                                initargs=(multiprocessing.Lock(), results.handle()))
 
     for _ in tqdm.tqdm(pool.imap(run_simulation_star, sim_args), total=len(sim_args)):
         pass
@@ -209,9 +224,10 @@ if __name__ == "__main__":
     pool.close()
     pool.join()
 
-    # Index results for easy lookup
-    results_list = list(results)
-    res_index = { (r[0], r[1], r[2]): r for r in results_list if r is not None }
+    # Index results for easy lookup (rows of failed simulations are NaN)
+    results_list = results.array.tolist()
+    results.close()
+    res_index = { (r[0], r[1], r[2]): r for r in results_list if not math.isnan(r[0]) }
 
     # Process and analyze results
     switching_losses_results = []
@@ -243,6 +259,9 @@ if __name__ == "__main__":
             cond_loss = 2 * e_f - e_2f if not (math.isnan(e_f) or math.isnan(e_2f)) else float('nan')
             if not math.isnan(sw_loss) and sw_loss < 0:
                 print(f"Negative switching losses at T={T} °C, I={I} A")
+            if verbose and r_f:  # cross-check with the energies of the individual switching events
+                print(f"T={T} °C, I={I} A: switching energy {sw_loss:.3e} J (two frequencies), "
+                      f"{r_f[9] + r_f[10]:.3e} J (turn-on {r_f[9]:.3e} J + turn-off {r_f[10]:.3e} J per event)")
 
             switched_currents.append(Isw)
             forward_currents.append(Ifwd)
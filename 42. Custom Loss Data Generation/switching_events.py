@@ -0,0 +1,138 @@
+"""
+Extraction of the switching events of a power switch from simulated waveforms.
+
+All the gate edges of the gate-source voltage are detected at once with vectorized threshold crossings
+(with an optional hysteresis), then the values of every event are computed with NumPy on the whole
+arrays, without a Python loop over the events:
+ - switching energy: integral of vds * i over the event window, from the cumulative integral of the power,
+ - current and voltage at switching: values interpolated at the gate edge,
+ - peaks and overshoots of vds and i in the window (overshoot above the value at the end of the window),
+ - maximum dv/dt and di/dt in the window.
+
+The event window starts pre_time before the gate edge and ends post_time after it (limited by the
+previous and next edges). Signals must share the same time base, ex: aligned with signal_alignment.align_signals().
+
+Usage:
+    time, vds, i, vgs = align_signals([vds_signal, i_signal, vgs_signal])
+    events = switching_events(time, vgs, vds, i, threshold=3.2, pre_time=100e-9, post_time=200e-9)
+    turn_off = events[events['kind'] == TURN_OFF]
+    print(turn_off['energy'], turn_off['current'], turn_off['voltage_overshoot'])
+"""
+
+import numpy as np
+
+TURN_ON = 1
+TURN_OFF = 0
+
+event_schema = [
+    ('kind', 'i1'),                 # TURN_ON or TURN_OFF
+    ('time', 'f8'),                 # time of the gate edge [s]
+    ('energy', 'f8'),               # integral of vds * i over the event window [J]
+    ('current', 'f8'),              # current at the gate edge [A]
+    ('voltage', 'f8'),              # vds at the gate edge [V]
+    ('peak_voltage', 'f8'),         # maximum of vds in the window [V]
+    ('voltage_overshoot', 'f8'),    # peak_voltage - vds at the end of the window [V]
+    ('peak_current', 'f8'),         # maximum of i in the window [A]
+    ('current_overshoot', 'f8'),    # peak_current - i at the end of the window [A]
+    ('dv_dt', 'f8'),                # maximum absolute dv/dt in the window [V/s]
+    ('di_dt', 'f8'),                # maximum absolute di/dt in the window [A/s]
+]
+
+
+def gate_edges(time_points, gate_voltage, threshold, hysteresis=0.0):
+    """
+    Return the times and kinds (TURN_ON for rising, TURN_OFF for falling) of the gate edges.
+
+    With a hysteresis, the gate is on above threshold + hysteresis / 2 and off below threshold - hysteresis / 2:
+    oscillations around the threshold do not create extra edges. Edge times are interpolated at the threshold.
+    """
+    time_points = np.asarray(time_points, dtype=np.float64)
+    gate_voltage = np.asarray(gate_voltage, dtype=np.float64)
+    on = gate_voltage >= threshold + hysteresis / 2
+    defined = on | (gate_voltage <= threshold - hysteresis / 2)
+    # Inside the hysteresis band, the state is the last defined one (vectorized forward fill)
+    last_defined = np.maximum.accumulate(np.where(defined, np.arange(on.size), 0))
+    state = on[last_defined]
+    edges = np.flatnonzero(state[1:] != state[:-1]) + 1  # first sample in the new state
+    kinds = np.where(state[edges], TURN_ON, TURN_OFF).astype(np.int8)
+
+    # Interpolate the crossing of the threshold on the segment [edge - 1, edge]
+    before, after = gate_voltage[edges - 1], gate_voltage[edges]
+    delta = after - before
+    fraction = np.clip(np.divide(threshold - before, delta, out=np.ones_like(delta), where=delta != 0), 0, 1)
+    times = time_points[edges - 1] + fraction * (time_points[edges] - time_points[edges - 1])
+    return times, kinds
+
+
+def _window_reduce(ufunc, values, starts, ends):
+    """
+    Reduce values[starts[k]:ends[k]] for each k in one call (windows must not be empty).
+    """
+    indices = np.empty(2 * starts.size, dtype=np.intp)
+    indices[0::2], indices[1::2] = starts, ends
+    padded = np.append(values, values[-1:])  # ends may be equal to len(values)
+    return ufunc.reduceat(padded, indices)[0::2]
+
+
+def _slopes(time_points, data_points):
+    dt = np.diff(time_points)
+    return np.divide(np.diff(data_points), dt, out=np.zeros_like(dt), where=dt > 0)
+
+
+def switching_events(time_points, gate_voltage, drain_voltage, current, threshold, pre_time, post_time, hysteresis=0.0):
+    """
+    Detect all the switching events and compute their values.
+
+    Args:
+        time_points ([float]): common time base of the signals [s]
+        gate_voltage ([float]): gate-source voltage [V]
+        drain_voltage ([float]): drain-source voltage [V]
+        current ([float]): drain current [A]
+        threshold (float): gate threshold voltage defining the edges [V]
+        pre_time (float): duration of the event window before the gate edge [s]
+        post_time (float): duration of the event window after the gate edge [s]
+        hysteresis (float): width of the hysteresis band around the threshold [V]
+
+    Returns:
+        np.ndarray: structured array with one row per event and the fields of event_schema
+    """
+    time_points = np.asarray(time_points, dtype=np.float64)
+    drain_voltage = np.asarray(drain_voltage, dtype=np.float64)
+    current = np.asarray(current, dtype=np.float64)
+    edge_times, kinds = gate_edges(time_points, gate_voltage, threshold, hysteresis)
+    events = np.zeros(edge_times.size, dtype=event_schema)
+    if edge_times.size == 0:
+        return events
+
+    # Event windows, limited by the neighbouring edges and the simulated time
+    previous_edges = np.concatenate(([time_points[0]], edge_times[:-1]))
+    next_edges = np.concatenate((edge_times[1:], [time_points[-1]]))
+    window_starts = np.maximum(edge_times - pre_time, previous_edges)
+    window_ends = np.minimum(edge_times + post_time, next_edges)
+
+    # Energies from the cumulative (trapezoidal) integral of the power
+    power = drain_voltage * current
+    cumulative_energy = np.concatenate(([0.0], np.cumsum(np.diff(time_points) * (power[1:] + power[:-1]) / 2)))
+    energies = np.interp(window_ends, time_points, cumulative_energy) - np.interp(window_starts, time_points, cumulative_energy)
+
+    # Sample ranges of the windows (at least one sample / one segment each)
+    starts = np.searchsorted(time_points, window_starts, side='left')
+    ends = np.maximum(np.searchsorted(time_points, window_ends, side='right'), starts + 1)
+    starts, ends = np.minimum(starts, time_points.size - 1), np.minimum(ends, time_points.size)
+    segment_starts = np.minimum(starts, time_points.size - 2)
+    segment_ends = np.maximum(np.minimum(ends - 1, time_points.size - 1), segment_starts + 1)
+
+    end_voltages = np.interp(window_ends, time_points, drain_voltage)
+    end_currents = np.interp(window_ends, time_points, current)
+    events['kind'] = kinds
+    events['time'] = edge_times
+    events['energy'] = energies
+    events['current'] = np.interp(edge_times, time_points, current)
+    events['voltage'] = np.interp(edge_times, time_points, drain_voltage)
+    events['peak_voltage'] = _window_reduce(np.maximum, drain_voltage, starts, ends)
+    events['voltage_overshoot'] = events['peak_voltage'] - end_voltages
+    events['peak_current'] = _window_reduce(np.maximum, current, starts, ends)
+    events['current_overshoot'] = events['peak_current'] - end_currents
+    events['dv_dt'] = _window_reduce(np.maximum, np.abs(_slopes(time_points, drain_voltage)), segment_starts, segment_ends)
+    events['di_dt'] = _window_reduce(np.maximum, np.abs(_slopes(time_points, current)), segment_starts, segment_ends)
+    return events
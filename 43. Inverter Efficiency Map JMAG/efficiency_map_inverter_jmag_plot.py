@@ -1,65 +1,33 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.tri as tri
 from datetime import datetime
-from scipy.spatial import ConvexHull, Delaunay
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.tri as tri
-from scipy.spatial import ConvexHull
+from map_rendering import MapMesh
 
-def show_heatmap(fig, ax1, x, y, z, xlabel, ylabel, title, cmap):
+def show_heatmap(fig, ax1, mesh, z, xlabel, ylabel, title, cmap):
     """
     Display a heatmap with tricontourf to fill the entire area defined by the data points.
+    The triangulation, the convex hull and the interpolation grid of the points (mesh) are shared by all the maps.
     """
-    # Ensure inputs are numpy arrays
-    x = np.asarray(x)
-    y = np.asarray(y)
     z = np.asarray(z)
     
-    # Remove NaNs and Infs from data
-    valid_mask = (~np.isnan(x) & ~np.isnan(y) & ~np.isnan(z) &
-                  ~np.isinf(x) & ~np.isinf(y) & ~np.isinf(z))
-    x_clean, y_clean, z_clean = x[valid_mask], y[valid_mask], z[valid_mask]
-    
-    # Remove duplicate points
-    points = np.column_stack((x_clean, y_clean))
-    unique_points, unique_indices = np.unique(points, axis=0, return_index=True)
-    x_unique = unique_points[:, 0]
-    y_unique = unique_points[:, 1]
-    z_unique = z_clean[unique_indices]
-    
-    # Check if there are enough points for triangulation
-    if len(x_unique) < 3:
-        print("Not enough unique points to perform triangulation.")
-        return
-    
-    # Create triangulation
-    triang = tri.Triangulation(x_unique, y_unique)
-    
-    # Plot Convex Hull if possible
-    try:
-        hull = ConvexHull(points)
-        # Close the convex hull path by appending the first vertex index
-        hull_vertices = np.append(hull.vertices, hull.vertices[0])
-        ax1.plot(points[hull_vertices, 0], points[hull_vertices, 1], 'k--', lw=1)
-    except Exception as e:
-        print(f"An error occurred during ConvexHull calculation: {e}")
+    # Create contourf plot (linear interpolation on the triangulation, masked where z is NaN or infinite)
+    z_clean = np.where(np.isinf(z), np.nan, z)
+    cntr1 = mesh.contourf(ax1, z_clean, resolution=200, levels=100, cmap=cmap)
     
-    # Create tricontourf plot
-    cntr1 = ax1.tricontourf(triang, z_unique, levels=100, cmap=cmap)
+    # Plot Convex Hull
+    mesh.plot_hull(ax1, 'k--', lw=1)
     
     # Add colorbar
     fig.colorbar(cntr1, ax=ax1)
     
     # Plot original data points
-    ax1.plot(x_unique, y_unique, 'ko', ms=1)
+    mesh.plot_points(ax1, 'ko', ms=1)
     
     zoom_out = 0.1
     # Calculate axis limits and zoom out
-    x_min, x_max = x_unique.min(), x_unique.max()
-    y_min, y_max = y_unique.min(), y_unique.max()
+    x_min, x_max = mesh.x.min(), mesh.x.max()
+    y_min, y_max = mesh.y.min(), mesh.y.max()
     x_range = x_max - x_min
     y_range = y_max - y_min
 
@@ -91,14 +59,15 @@ efficiency_inverter = (1 - inverter_losses / (inverter_losses + input_power))*10
 Pout = np.loadtxt(os.path.join(current_folder,"results/Pout.txt"))
 efficiency_motor = (Pout / (Pout + motor_losses))*100
 
-# Plot
+# Plot: the triangulation of the (speed, torque) points is built once and reused for all the maps
+mesh = MapMesh(s, t)
 fig, axs = plt.subplots(3, 2, figsize = (16, 9))
-show_heatmap(fig, axs[0, 0], s, t, e, "Speed [RPM]", "Torque [N.m]", "Drive Efficiency (inverter + motor) [%]", "RdYlGn")
-show_heatmap(fig, axs[0, 1], s, t, (inverter_losses + motor_losses), "Speed [RPM]", "Torque [N.m]", "Drive Losses (inverter + motor) [W]", "coolwarm")
-show_heatmap(fig, axs[1, 0], s, t, inverter_losses, "Speed [RPM]", "Torque [N.m]", "Inverter Losses [W]", "coolwarm")
-show_heatmap(fig, axs[1, 1], s, t, motor_losses, "Speed [RPM]", "Torque [N.m]", "Motor Losses [W]", "coolwarm")
-show_heatmap(fig, axs[2, 0], s, t, efficiency_inverter, "Speed [RPM]", "Torque [N.m]", "Inverter Efficiency [%]", "RdYlGn")
-show_heatmap(fig, axs[2, 1], s, t, efficiency_motor, "Speed [RPM]", "Torque [N.m]", "Motor Efficiency [%]", "RdYlGn")
+show_heatmap(fig, axs[0, 0], mesh, e, "Speed [RPM]", "Torque [N.m]", "Drive Efficiency (inverter + motor) [%]", "RdYlGn")
+show_heatmap(fig, axs[0, 1], mesh, (inverter_losses + motor_losses), "Speed [RPM]", "Torque [N.m]", "Drive Losses (inverter + motor) [W]", "coolwarm")
+show_heatmap(fig, axs[1, 0], mesh, inverter_losses, "Speed [RPM]", "Torque [N.m]", "Inverter Losses [W]", "coolwarm")
+show_heatmap(fig, axs[1, 1], mesh, motor_losses, "Speed [RPM]", "Torque [N.m]", "Motor Losses [W]", "coolwarm")
+show_heatmap(fig, axs[2, 0], mesh, efficiency_inverter, "Speed [RPM]", "Torque [N.m]", "Inverter Efficiency [%]", "RdYlGn")
+show_heatmap(fig, axs[2, 1], mesh, efficiency_motor, "Speed [RPM]", "Torque [N.m]", "Motor Efficiency [%]", "RdYlGn")
 fig.tight_layout(pad = 2)
 path = "efficiency_map"+datetime.now().strftime("%m%d%Y%H%M%S")+".png"
 fig.savefig(os.path.join(current_folder, path))
@@ -0,0 +1,122 @@
+"""
+Rendering of maps (efficiency, losses...) defined on scattered operating points.
+
+All the fields of a map (drive efficiency, inverter losses, motor losses...) are defined on the same
+(speed, torque) points. MapMesh builds once per set of points:
+ - the triangulation and the convex hull of the points. Flat triangles on the border of the triangulation
+   (ex: between aligned points of the same speed) are masked, they would give meaningless interpolated values,
+ - for each grid resolution, the triangle containing each grid node and its barycentric weights (cached),
+so that interpolating another field on the grid is a single weighted sum: there is no new triangulation,
+interpolator or triangle search per field. The result is the same as tri.LinearTriInterpolator.
+render_batch() renders many maps in parallel processes (ex: all the maps of a nightly report).
+
+Usage:
+    mesh = MapMesh(speed, torque)
+    xi, yi, zi = mesh.interpolate(efficiency, resolution=100)   # masked outside the triangulation
+    mesh.contourf(ax, inverter_losses, levels=100, cmap="coolwarm")
+    mesh.plot_hull(ax, 'k--', lw=1)
+
+    def render_map(path):                                       # module-level function
+        ...
+    output_files = render_batch(render_map, paths)
+"""
+
+import multiprocessing
+import numpy as np
+import matplotlib.tri as tri
+from scipy.spatial import ConvexHull
+
+
+class MapMesh:
+    """
+    Triangulation, convex hull and interpolation grids of a set of points, shared by all the fields of a map.
+    Points with NaN or infinite coordinates and duplicated points are ignored.
+
+    Args:
+        x ([float]): x coordinates of the points (ex: speed)
+        y ([float]): y coordinates of the points (ex: torque)
+        min_circle_ratio (float): border triangles with a smaller inscribed / circumscribed circle ratio are masked
+    """
+
+    def __init__(self, x, y, min_circle_ratio=0.01):
+        x = np.asarray(x, dtype=np.float64).ravel()
+        y = np.asarray(y, dtype=np.float64).ravel()
+        valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        _, first = np.unique(np.column_stack((x[valid], y[valid])), axis=0, return_index=True)
+        self.index = valid[np.sort(first)]  # indices of the input points used by the mesh
+        self.x, self.y = x[self.index], y[self.index]
+        if self.x.size < 3:
+            raise ValueError("at least 3 distinct points are needed to build the map")
+        self.triangulation = tri.Triangulation(self.x, self.y)
+        with np.errstate(invalid='ignore'):  # exactly flat triangles
+            self.triangulation.set_mask(tri.TriAnalyzer(self.triangulation).get_flat_tri_mask(min_circle_ratio))
+        self.hull = ConvexHull(np.column_stack((self.x, self.y))).vertices
+        self._grids = {}  # resolution -> (xi, yi, vertices, weights, inside)
+
+    def field(self, z):
+        """
+        Return the values of a field (one value per input point) at the points of the mesh.
+        """
+        return np.asarray(z, dtype=np.float64).ravel()[self.index]
+
+    def grid(self, resolution=100):
+        """
+        Return the grid axes xi, yi and the interpolation weights of the grid nodes (computed once per resolution).
+        """
+        if resolution not in self._grids:
+            xi = np.linspace(self.x.min(), self.x.max(), resolution)
+            yi = np.linspace(self.y.min(), self.y.max(), resolution)
+            grid_x, grid_y = np.meshgrid(xi, yi)
+            triangle = self.triangulation.get_trifinder()(grid_x, grid_y)
+            inside = triangle >= 0
+            vertices = self.triangulation.triangles[np.where(inside, triangle, 0)]  # (resolution, resolution, 3)
+            x0, x1, x2 = np.moveaxis(self.x[vertices], -1, 0)
+            y0, y1, y2 = np.moveaxis(self.y[vertices], -1, 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                determinant = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
+                w0 = ((y1 - y2) * (grid_x - x2) + (x2 - x1) * (grid_y - y2)) / determinant
+                w1 = ((y2 - y0) * (grid_x - x2) + (x0 - x2) * (grid_y - y2)) / determinant
+            weights = np.stack((w0, w1, 1 - w0 - w1), axis=-1)
+            self._grids[resolution] = (xi, yi, vertices, weights, inside & np.isfinite(w0) & np.isfinite(w1))
+        return self._grids[resolution]
+
+    def interpolate(self, z, resolution=100):
+        """
+        Return xi, yi and the field z linearly interpolated on the grid (masked outside the triangulation or where z is NaN).
+        """
+        xi, yi, vertices, weights, inside = self.grid(resolution)
+        values = np.einsum('ijk,ijk->ij', self.field(z)[vertices], np.where(inside[..., None], weights, 0.0))
+        return xi, yi, np.ma.masked_where(~inside | np.isnan(values), values)
+
+    def contourf(self, ax, z, resolution=100, **kwargs):
+        """
+        Plot the filled contours of the field z in ax and return the contour set (kwargs are passed to ax.contourf).
+        """
+        xi, yi, zi = self.interpolate(z, resolution)
+        return ax.contourf(xi, yi, zi, **kwargs)
+
+    def plot_hull(self, ax, *args, **kwargs):
+        """
+        Plot the closed convex hull of the points in ax (args and kwargs are passed to ax.plot).
+        """
+        vertices = np.append(self.hull, self.hull[0])
+        return ax.plot(self.x[vertices], self.y[vertices], *args, **kwargs)
+
+    def plot_points(self, ax, *args, **kwargs):
+        """
+        Plot the points of the mesh in ax (args and kwargs are passed to ax.plot).
+        """
+        return ax.plot(self.x, self.y, *args, **kwargs)
+
+
+def render_batch(function, items, number_of_processes=None):
+    """
+    Call function(item) for each item in a pool of processes and return the results in the order of items.
+    function must be defined at module level (ex: load a map, render it with MapMesh and save the figure).
+    Call it under if __name__ == "__main__":.
+    """
+    items = list(items)
+    if number_of_processes == 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    with multiprocessing.Pool(min(number_of_processes or multiprocessing.cpu_count(), len(items))) as pool:
+        return pool.map(function, items, chunksize=1)
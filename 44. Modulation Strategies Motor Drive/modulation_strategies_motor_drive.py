@@ -1,6 +1,7 @@
 import os, multiprocessing
 from tqdm import tqdm
-from aesim.simba import ProjectRepository, License
+from aesim.simba import License
+import sweep_worker
 import numpy as np
 import pandas as pd
 from datetime import datetime
@@ -29,40 +30,37 @@ if os.environ.get("SIMBA_SCRIPT_TEST"): # To accelerate unit tests
 #           METHODS         #
 #############################
 
-def run_simulation(id_ref, iq_ref, rpm_speed_ref, fpwm, modulation_key, sim_number, manager_result_dict, lock):
+def configure_design(design):
+    """
+    Set the JMAG motor model reference. Called once per process and per design by sweep_worker.
+    """
+    script_folder = os.path.realpath(os.path.dirname(__file__))
+    motor = design.Circuit.GetDeviceByName('JmagRTMotor')
+    motor.RttFilePath.UserValue = os.path.join(script_folder, 'withHF_4000rpm20Nm.rtt')
+
+
+def run_simulation(id_ref, iq_ref, rpm_speed_ref, fpwm, modulation_key, sim_number, manager_result_dict):
     """
     Run SIMBA Simulation and place the results in "manager_result_dict"
+    The project is loaded once per process by sweep_worker.init_worker (pool initializer).
     """ 
     log = False # if true, log simulation results
 
-    # Get simba project
-    with lock:
-        script_folder = os.path.realpath(os.path.dirname(__file__))
-        file_path = os.path.join(script_folder, "modulation_strategies_motor_drive.jsimba")
-        project = ProjectRepository(file_path)
-    
     # Get design according modulation strategy
-    design = project.GetDesignByName(modulation_key+'_modulation')
+    design = sweep_worker.get_design(modulation_key+'_modulation')
 
-    # Set JMAG motor model reference
-    motor = design.Circuit.GetDeviceByName('JmagRTMotor')
-    motor.RttFilePath.UserValue = os.path.join(script_folder, 'withHF_4000rpm20Nm.rtt')
-    
     # Set speeds and id, iq references
-    speed_source_rads = design.Circuit.GetDeviceByName('W1')
-    speed_source_rads.Voltage = float(rpm_speed_ref*np.pi/30)
-    id_ref_block = design.Circuit.GetDeviceByName('Id_ref')
-    id_ref_block.Value = id_ref
-    iq_ref_block = design.Circuit.GetDeviceByName('Iq_ref')
-    iq_ref_block.Value = iq_ref
-    carrier = design.Circuit.GetDeviceByName('Carrier')
-    carrier.Frequency = fpwm
+    sweep_worker.set_device_property(design, 'W1', 'Voltage', float(rpm_speed_ref*np.pi/30))
+    sweep_worker.set_device_property(design, 'Id_ref', 'Value', id_ref)
+    sweep_worker.set_device_property(design, 'Iq_ref', 'Value', iq_ref)
+    sweep_worker.set_device_property(design, 'Carrier', 'Frequency', fpwm)
 
     # Run calculation
     job = design.TransientAnalysis.NewJob()
     status = job.Run()
     if str(status) != "OK" or log: 
         print (job.Summary())
+        job.Dispose()
         return
     
     # Get inverter Losses
@@ -72,6 +70,7 @@ def run_simulation(id_ref, iq_ref, rpm_speed_ref, fpwm, modulation_key, sim_numb
     # Get motor losses
     copper_losses = job.GetSignalByName('JmagRTMotor - Copper Loss (average)').DataPoints[-1] 
     iron_losses = job.GetSignalByName('JmagRTMotor - Iron Loss (average)').DataPoints[-1] 
+    job.Dispose() # free memory, the process is reused for the next simulation
     if log:
         print(f"Check speed = {rpm_speed_ref} rpm for {modulation_key} - {round(fpwm/1000)} kHz", conduction_losses, switching_losses, copper_losses, iron_losses)
 
@@ -91,7 +90,6 @@ def run_simulation_star(args):
 if __name__ == "__main__": # Called only in main thread. It confirms that the code is under main function
 
     manager = multiprocessing.Manager()
-    lock = manager.Lock()
     manager_result_dict = manager.dict()
 
     # Create all scenarii
@@ -101,13 +99,18 @@ if __name__ == "__main__": # Called only in main thread. It confirms that the co
     for id_ref, iq_ref, rpm_speed_ref in zip(id_refs, iq_refs, rpm_speed_refs):
         for mod_key in modulations:
             for fpwm in switching_frequencies:
-                pool_args.append((id_ref, iq_ref, rpm_speed_ref, fpwm, mod_key, sim_nb, manager_result_dict, lock))
+                pool_args.append((id_ref, iq_ref, rpm_speed_ref, fpwm, mod_key, sim_nb, manager_result_dict))
                 sim_nb += 1
     
-    # Start process pool
-    pool = multiprocessing.Pool(number_of_parallel_simulations)
+    # Start process pool. Each process loads the project only once.
+    script_folder = os.path.realpath(os.path.dirname(__file__))
+    project_path = os.path.join(script_folder, "modulation_strategies_motor_drive.jsimba")
+    pool = multiprocessing.Pool(number_of_parallel_simulations, initializer=sweep_worker.init_worker,
+                                initargs=(project_path, multiprocessing.Lock(), configure_design))
     for _ in tqdm(pool.imap(run_simulation_star, pool_args), total=len(pool_args)):
         pass
+    pool.close()
+    pool.join()
 
     # Store results in dedicated dictionnary
     res = dict()
@@ -7,6 +7,7 @@ Simple example showing how to enable and use the compress scopes feature.
 #%% Load modules
 from aesim.simba import DesignExamples
 import matplotlib.pyplot as plt
+from scope_reconstruction import CompressedSignal, reconstruction_error
 
 flybackConverter = DesignExamples.DCDC_Flyback()
 
@@ -42,6 +43,13 @@ print("len(t_with_compression):", len(t_with_compression))
 print("len(Cout_without_compression):", len(Cout_without_compression))
 print("len(Cout_with_compression):", len(Cout_with_compression))
 
+# Reconstruct the compressed signal on the uncompressed time base and check the error
+Cout_compressed = CompressedSignal.from_signal(Cout_signal)
+Cout_reconstructed = Cout_compressed.on(t_without_compression)
+error = reconstruction_error(Cout_compressed, t_without_compression, Cout_without_compression)
+print("max reconstruction error: {0:.3g} ({1:.3%} of peak to peak) at t = {2:.3g} s".format(
+    error['max_error'], error['max_relative_error'], error['time_of_max_error']))
+
 # Plotting the results
 fig, ax = plt.subplots()
 ax.set_title(flybackConverter.Name)
@@ -49,5 +57,6 @@ ax.set_ylabel('Cout')
 ax.set_xlabel('time (s)')
 ax.plot(t_without_compression, Cout_without_compression, '-+', label="original")
 ax.plot(t_with_compression, Cout_with_compression, '+', label="compressed")
+ax.plot(t_without_compression, Cout_reconstructed, '--', label="reconstructed")
 ax.legend()
 plt.show()
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+Benchmark of the compress scopes feature on the design examples.
+
+Each design example is simulated without and with scope compression. For both runs, the script compares:
+ - the memory used by the signals (NumPy float64 arrays of all the enabled scopes),
+ - the post-processing time: average and rms values of all the signals, and evaluation of all the signals
+   on a common uniform time base (as needed to combine them),
+ - the maximum reconstruction error of each compressed signal vs the uncompressed one,
+ - the maximum deviation of the post-processed values (average, rms and aligned signals) vs the uncompressed run.
+
+##### Requires aesim.simba version 2024.05 or higher #####
+"""
+
+#%% Load modules
+import os
+import time
+import numpy as np
+from aesim.simba import DesignExamples
+from scope_reconstruction import CompressedSignal, reconstruction_error
+
+design_examples = [DesignExamples.DCDC_Flyback, DesignExamples.BuckConverter, DesignExamples.BuckBoostConverter,
+                   DesignExamples.DCDC_Forward_Converter, DesignExamples.Buck_Thermal,
+                   DesignExamples.DCDC_Dual_Active_Bridge_Converter, DesignExamples.ACDC_3ph_ThyristorBridge]
+end_time = None                  # keep the end time of each example
+number_of_uniform_points = 10000  # points of the common time base used in the post-processing
+if os.environ.get("SIMBA_SCRIPT_TEST"):  # Accelerate benchmark in test environment
+    design_examples = design_examples[:2]
+    end_time = "40u"
+
+
+def run(design, compress_scopes):
+    """
+    Run the design and return its signals as CompressedSignal objects and the simulation time.
+    """
+    design.TransientAnalysis.CompressScopes = compress_scopes
+    job = design.TransientAnalysis.NewJob()
+    start = time.perf_counter()
+    status = job.Run()
+    run_time = time.perf_counter() - start
+    if str(status) != "OK":
+        raise Exception(job.Summary())
+    signals = [CompressedSignal.from_signal(signal) for signal in job.Signals]
+    job.Dispose()
+    return signals, run_time
+
+
+def post_process(signals):
+    """
+    Average and rms values of all the signals and evaluation on a common uniform time base.
+    Return the elapsed time and the results: {signal name: (average, rms value, values on the common time base)}.
+    """
+    start = time.perf_counter()
+    if not signals:
+        return 0.0, {}
+    averages, rms_values = {}, {}
+    for signal in signals:
+        t, d = signal.time_points, signal.data_points
+        if t.size > 1 and t[-1] > t[0]:
+            dt = np.diff(t)
+            averages[signal.name] = np.dot(dt, d[1:] + d[:-1]) / 2 / (t[-1] - t[0])
+            rms_values[signal.name] = np.sqrt(np.dot(dt, d[1:] ** 2 + d[:-1] ** 2) / 2 / (t[-1] - t[0]))
+    first_time = max(signal.time_points[0] for signal in signals)
+    last_time = min(signal.time_points[-1] for signal in signals)
+    common_time = np.linspace(first_time, last_time, number_of_uniform_points)
+    aligned = np.vstack([signal(common_time) for signal in signals])
+    elapsed = time.perf_counter() - start
+    return elapsed, {signal.name: (averages.get(signal.name, np.nan), rms_values.get(signal.name, np.nan), values)
+                     for signal, values in zip(signals, aligned)}
+
+
+def post_processing_deviation(results, references):
+    """
+    Maximum deviation of the post-processed values vs the reference ones, relative to the rms value of the reference signal
+    """
+    deviation = 0.0
+    for name, (average, rms_value, values) in results.items():
+        if name not in references:
+            continue
+        reference_average, reference_rms, reference_values = references[name]
+        scale = reference_rms if reference_rms > 0 else 1.0
+        differences = [abs(average - reference_average), abs(rms_value - reference_rms)]
+        if values.shape == reference_values.shape:
+            differences.append(np.max(np.abs(values - reference_values)))
+        deviation = max(deviation, np.nanmax(differences) / scale)
+    return deviation
+
+
+#%% Run the benchmark
+print(f"{'design':<36} | {'run':>8} | {'points':>9} | {'memory':>9} | {'post-pro.':>9} | {'max rel. error':>14} | {'post-pro. dev.':>14}")
+for design_example in design_examples:
+    design = design_example()
+    design.TransientAnalysis.StopAtSteadyState = False  # same simulated time with and without compression
+    if end_time is not None:
+        design.TransientAnalysis.EndTime = end_time
+
+    rows = {}
+    for compress_scopes in [False, True]:
+        signals, run_time = run(design, compress_scopes)
+        post_processing_time, results = post_process(signals)
+        rows[compress_scopes] = {'signals': signals, 'run_time': run_time,
+                                 'points': sum(signal.time_points.size for signal in signals),
+                                 'memory': sum(signal.nbytes for signal in signals),
+                                 'post_processing': post_processing_time, 'results': results}
+
+    references = {signal.name: signal for signal in rows[False]['signals']}
+    errors = [reconstruction_error(signal, references[signal.name].time_points, references[signal.name].data_points)
+              for signal in rows[True]['signals'] if signal.name in references]
+    worst = max(errors, key=lambda error: error['max_relative_error']) if errors else None
+    deviation = post_processing_deviation(rows[True]['results'], rows[False]['results'])
+
+    for compress_scopes, label in [(False, 'without compression'), (True, 'with compression')]:
+        row = rows[compress_scopes]
+        error = f"{worst['max_relative_error'] * 100:>13.3f}%" if compress_scopes and worst else f"{'':>14}"
+        post_processing_error = f"{deviation * 100:>13.3f}%" if compress_scopes else f"{'':>14}"
+        print(f"{design.Name[:20] + ' ' + label:<36} | {row['run_time']:>7.2f}s | {row['points']:>9} | {row['memory'] / 1e6:>7.2f}MB | "
+              f"{row['post_processing'] * 1e3:>7.1f}ms | {error} | {post_processing_error}")
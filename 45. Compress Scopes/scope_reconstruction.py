@@ -0,0 +1,140 @@
+"""
+Reconstruction of signals recorded with compressed scopes.
+
+With CompressScopes = True, each signal keeps only the time points needed to describe it: between two
+kept points, the signal is linear (or constant for a sampled signal). CompressedSignal evaluates such a
+signal at any time without the job.TimePoints vector:
+ - at arbitrary query times,
+ - at a uniform rate (ex: for an FFT),
+ - on the time base of another signal (ex: to multiply a voltage and a current),
+and reconstruction_error() checks the reconstruction against a signal recorded without compression.
+
+Usage:
+    vout = CompressedSignal.from_signal(job.GetSignalByName('C1 - Out'))
+    t, v = vout.uniform(time_step=1e-7)
+    v_on_current_time_base = vout.on(job.GetSignalByName('L1 - Current'))
+    error = reconstruction_error(vout, t_reference, v_reference)
+    print(error['max_error'], error['max_relative_error'])
+"""
+
+import numpy as np
+
+
+def _time_points(time_base):
+    """
+    Return the time points of a SIMBA signal, a CompressedSignal or an array of times.
+    """
+    if hasattr(time_base, 'TimePoints'):
+        time_base = time_base.TimePoints
+    elif isinstance(time_base, CompressedSignal):
+        time_base = time_base.time_points
+    return np.asarray(time_base, dtype=np.float64)
+
+
+class CompressedSignal:
+    """
+    Signal defined by its (compressed) time and data points.
+
+    Args:
+        time_points ([float]): sorted time points [s] (repeated points describe steps)
+        data_points ([float]): data points
+        name (str): name of the signal
+        hold (bool): if True, the signal is constant between two time points (sampled signals),
+            otherwise it is linear between them
+    """
+
+    def __init__(self, time_points, data_points, name=None, hold=False):
+        self.time_points = np.asarray(time_points, dtype=np.float64)
+        self.data_points = np.asarray(data_points, dtype=np.float64)
+        if self.time_points.shape != self.data_points.shape or self.time_points.size == 0:
+            raise ValueError("time_points and data_points must have the same (non-zero) length")
+        self.name = name
+        self.hold = hold
+
+    @classmethod
+    def from_signal(cls, signal, hold=False):
+        """
+        Create a CompressedSignal from a SIMBA signal (job.GetSignalByName(...)).
+        """
+        return cls(signal.TimePoints, signal.DataPoints, signal.Name, hold)
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the time and data arrays [bytes].
+        """
+        return self.time_points.nbytes + self.data_points.nbytes
+
+    def __call__(self, query_times):
+        """
+        Return the signal at the query times (first / last value outside the recorded time range).
+        """
+        query_times = np.asarray(query_times, dtype=np.float64)
+        if self.hold:
+            index = np.clip(np.searchsorted(self.time_points, query_times, side='right') - 1, 0, self.time_points.size - 1)
+            return self.data_points[index]
+        return np.interp(query_times, self.time_points, self.data_points)
+
+    def uniform(self, time_step=None, rate=None, start_time=None, end_time=None):
+        """
+        Return (time, data) arrays of the signal sampled at a uniform rate between start_time and end_time
+        (default: recorded time range). Either time_step [s] or rate [Hz] must be given.
+        """
+        if (time_step is None) == (rate is None):
+            raise ValueError("either time_step or rate must be given")
+        time_step = time_step if time_step is not None else 1 / rate
+        start_time = self.time_points[0] if start_time is None else start_time
+        end_time = self.time_points[-1] if end_time is None else end_time
+        time = start_time + np.arange(int(np.floor((end_time - start_time) / time_step * (1 + 1e-12))) + 1) * time_step
+        return time, self(time)
+
+    def on(self, time_base):
+        """
+        Return the signal on the time base of another signal (SIMBA signal or CompressedSignal) or on an array of times.
+        """
+        return self(_time_points(time_base))
+
+
+def reconstruct_signals(signals, time_base):
+    """
+    Return the data of several signals (SIMBA signals or CompressedSignal) on a common time base, one row per signal.
+    """
+    time_points = _time_points(time_base)
+    rows = [signal if isinstance(signal, CompressedSignal) else CompressedSignal.from_signal(signal) for signal in signals]
+    return np.vstack([row(time_points) for row in rows]) if rows else np.empty((0, time_points.size))
+
+
+def reconstruction_error(compressed, reference_time_points, reference_data_points):
+    """
+    Compare a compressed signal with the same signal recorded without compression, on the reference time points
+    (limited to the time range of the compressed signal).
+
+    Args:
+        compressed (CompressedSignal or SIMBA signal): compressed signal
+        reference_time_points ([float]): time points of the uncompressed signal
+        reference_data_points ([float]): data points of the uncompressed signal
+
+    Returns:
+        dict: {'max_error', 'time_of_max_error', 'rms_error', 'max_relative_error' (max_error / peak to peak of the reference),
+               'compression_ratio' (number of reference points / number of compressed points)}
+    """
+    if not isinstance(compressed, CompressedSignal):
+        compressed = CompressedSignal.from_signal(compressed)
+    reference_time_points = np.asarray(reference_time_points, dtype=np.float64)
+    reference_data_points = np.asarray(reference_data_points, dtype=np.float64)
+    inside = (reference_time_points >= compressed.time_points[0]) & (reference_time_points <= compressed.time_points[-1])
+    errors = np.abs(compressed(reference_time_points[inside]) - reference_data_points[inside])
+    if errors.size == 0:
+        raise ValueError("the reference and compressed signals do not overlap")
+    index = int(np.argmax(errors))
+    max_error = float(errors[index])
+    peak_to_peak = float(np.ptp(reference_data_points[inside]))
+    if peak_to_peak > 0:
+        max_relative_error = max_error / peak_to_peak
+    else:  # constant reference
+        max_relative_error = 0.0 if max_error == 0 else float('inf')
+    return {'max_error': max_error,
+            'time_of_max_error': float(reference_time_points[inside][index]),
+            'rms_error': float(np.sqrt(np.mean(errors ** 2))),
+            'max_relative_error': max_relative_error,
+            'compression_ratio': reference_time_points.size / compressed.time_points.size}
@@ -0,0 +1,96 @@
+"""
+Core loss model built from the loss density curves of a magnetic material.
+
+The datasheets give the loss density vs flux density for a few frequencies and temperatures. The model
+is built once from these curves and evaluates the loss density for arrays of (B, f, T):
+ - linear interpolation of log10(loss density) vs log10(B) on each curve, extrapolated with the first
+   and last segments (segment slopes and intercepts are computed once at construction),
+ - linear interpolation between the curves vs temperature and vs log10(frequency), limited to the
+   temperature and frequency ranges of the curves.
+
+No interpolator is created at evaluation, so the same model can be used for all the operating points of a sweep.
+
+Usage:
+    core_loss_model = CoreLossModel({(100e3, 25): (b_100k_25C, p_100k_25C),
+                                     (100e3, 100): (b_100k_100C, p_100k_100C),
+                                     (200e3, 25): (b_200k_25C, p_200k_25C),
+                                     (200e3, 100): (b_200k_100C, p_200k_100C)})
+    loss_density = core_loss_model(flux_densities, frequencies, temperature)  # NumPy broadcasting
+"""
+
+import numpy as np
+
+
+def _interpolation_weights(nodes, values):
+    """
+    Return the index of the lower node and the weight of the upper node for each value (limited to the nodes range).
+    """
+    if len(nodes) == 1:
+        return np.zeros(np.shape(values), dtype=int), np.zeros(np.shape(values))
+    index = np.clip(np.searchsorted(nodes, values, side='right') - 1, 0, len(nodes) - 2)
+    weight = np.clip((values - nodes[index]) / (nodes[index + 1] - nodes[index]), 0, 1)
+    return index, weight
+
+
+class CoreLossModel:
+    """
+    Loss density lookup on a log-log (flux density, frequency) x temperature grid.
+
+    Args:
+        curves (dict): {(frequency [Hz], temperature [°C]): (flux densities, loss densities)}, one curve for each
+            combination of the frequencies and temperatures. Units of flux and loss densities are kept, ex: mT and mW/cm3.
+    """
+
+    def __init__(self, curves):
+        self.frequencies = np.unique([frequency for frequency, _ in curves])
+        self.temperatures = np.unique([temperature for _, temperature in curves])
+        self._log_frequencies = np.log10(self.frequencies)
+        self._curves = []  # [frequency index][temperature index] = (log10 B points, slopes, intercepts)
+        for frequency in self.frequencies:
+            row = []
+            for temperature in self.temperatures:
+                if (frequency, temperature) not in curves:
+                    raise ValueError("no loss curve for {0:g} Hz and {1:g}°C".format(frequency, temperature))
+                flux_densities, loss_densities = curves[(frequency, temperature)]
+                log_b = np.log10(np.asarray(flux_densities, dtype=np.float64))
+                log_p = np.log10(np.asarray(loss_densities, dtype=np.float64))
+                order = np.argsort(log_b)
+                log_b, log_p = log_b[order], log_p[order]
+                if log_b.size < 2:
+                    raise ValueError("the loss curve for {0:g} Hz and {1:g}°C has less than 2 points".format(frequency, temperature))
+                slopes = np.diff(log_p) / np.diff(log_b)
+                row.append((log_b, slopes, log_p[:-1] - slopes * log_b[:-1]))
+            self._curves.append(row)
+
+    def _log_loss_density(self, curve, log_b):
+        """
+        log10(loss density) of a curve, linear in log-log and extrapolated with the end segments.
+        """
+        log_b_points, slopes, intercepts = curve
+        segment = np.clip(np.searchsorted(log_b_points, log_b, side='right') - 1, 0, slopes.size - 1)
+        return slopes[segment] * log_b + intercepts[segment]
+
+    def __call__(self, flux_density, frequency, temperature):
+        """
+        Return the loss density for the flux densities, frequencies and temperatures (broadcast together).
+        The loss density is 0 for flux densities or frequencies <= 0 and for negative temperatures.
+        """
+        flux_density, frequency, temperature = np.broadcast_arrays(np.asarray(flux_density, dtype=np.float64),
+                                                                   np.asarray(frequency, dtype=np.float64),
+                                                                   np.asarray(temperature, dtype=np.float64))
+        valid = (flux_density > 0) & (frequency > 0) & (temperature >= 0)
+        log_b = np.log10(np.where(valid, flux_density, 1))
+        log_f = np.log10(np.where(valid, frequency, 1))
+
+        f_index, f_weight = _interpolation_weights(self._log_frequencies, log_f)
+        t_index, t_weight = _interpolation_weights(self.temperatures, temperature)
+        log_p = np.zeros(flux_density.shape)
+        for i, row in enumerate(self._curves):
+            f_factor = np.where(f_index == i, 1 - f_weight, 0) + np.where(f_index + 1 == i, f_weight, 0)
+            for j, curve in enumerate(row):
+                factor = f_factor * (np.where(t_index == j, 1 - t_weight, 0) + np.where(t_index + 1 == j, t_weight, 0))
+                if np.any(factor):
+                    log_p += factor * self._log_loss_density(curve, log_b)
+
+        loss_density = np.where(valid, 10 ** log_p, 0.0)
+        return float(loss_density) if loss_density.ndim == 0 else loss_density
@@ -4,9 +4,11 @@ Python notebook / script to compute magnetic losses of the transformer and power
 #%%
 import os
 import numpy as np
-from scipy.interpolate import interp1d
 import matplotlib.pyplot as plt
 from aesim.simba import ProjectRepository
+from signal_alignment import align_signals
+from harmonics import amplitude_spectrum
+from core_loss import CoreLossModel
 
 #%% #########
 # PRE-PROCESS
@@ -30,34 +32,15 @@ data_200k_25C_y = [72.04522101505854, 271.429444531243, 1069.3656104673032, 3969
 data_200k_100C_x = [49.52769134960666, 96.70945957597505, 174.47922568335946, 262.2758216661127]
 data_200k_100C_y = [27.345961868755982, 140.88582968667282, 625.3404255629255, 1748.7126295116889]
 
-# Define Magnetic loss function
-def compute_loss_density(flux_density: float, frequency: float, temperature: float):
-    """ compute loss density for a given flux density, frequency and temperature """
-    if flux_density <= 0 or frequency <= 0 or temperature < 0:
-        return 0
-    else:
-        # Create interpolators for each dataset
-        interp_100k_25C = interp1d(np.log10(data_100k_25C_x), np.log10(data_100k_25C_y), kind='linear', fill_value='extrapolate')
-        interp_100k_100C = interp1d(np.log10(data_100k_100C_x), np.log10(data_100k_100C_y), kind='linear', fill_value='extrapolate')
-        interp_200k_25C = interp1d(np.log10(data_200k_25C_x), np.log10(data_200k_25C_y), kind='linear', fill_value='extrapolate')
-        interp_200k_100C = interp1d(np.log10(data_200k_100C_x), np.log10(data_200k_100C_y), kind='linear', fill_value='extrapolate')
-    
-        # Compute losses for the given flux density from each interpolator
-        y_100k_25C = interp_100k_25C(np.log10(flux_density))
-        y_100k_100C = interp_100k_100C(np.log10(flux_density))
-        y_200k_25C = interp_200k_25C(np.log10(flux_density))
-        y_200k_100C = interp_200k_100C(np.log10(flux_density))
-    
-        # Interpolate over temperature for each frequency
-        temperatures = [25, 100]
-        y_100k_T = np.interp(temperature, temperatures, [y_100k_25C, y_100k_100C])
-        y_200k_T = np.interp(temperature, temperatures, [y_200k_25C, y_200k_100C])
-    
-        # Interpolate over frequency
-        frequencies = [100e3, 200e3]  # Frequencies in Hz
-        interp_loss_density = 10**(np.interp(np.log10(frequency), np.log10(frequencies), [y_100k_T, y_200k_T]))
-        
-        return max(interp_loss_density, 0)
+# Define Magnetic loss model (built once, log-log interpolation of the curves)
+core_loss_model = CoreLossModel({(100e3, 25): (data_100k_25C_x, data_100k_25C_y),
+                                 (100e3, 100): (data_100k_100C_x, data_100k_100C_y),
+                                 (200e3, 25): (data_200k_25C_x, data_200k_25C_y),
+                                 (200e3, 100): (data_200k_100C_x, data_200k_100C_y)})
+
+def compute_loss_density(flux_density, frequency, temperature):
+    """ compute loss density for given flux densities, frequencies and temperatures (floats or arrays) """
+    return core_loss_model(flux_density, frequency, temperature)
 
 def plot_magnetic_loss_data():
     """ plot the magnetic loss data """
@@ -149,23 +132,12 @@ def run_mag_model_simulation(fsw, phase_shift):
     return job_mag.GetSignalByName('flux - Out')
 
 def steadystate_signal(horizon_time: float, *signals):
-    timepoints_list = []
-    for signal in signals:
-        timepoints_list.extend(signal.TimePoints)
-    timepoints = sorted(timepoints_list)
-    steadystate_maskarray = np.array(timepoints) > (timepoints[-1] - horizon_time)
-    steadystate_time = np.array(timepoints)[steadystate_maskarray]
-    steadystate_datapoints_list = [np.interp(steadystate_time, signal.TimePoints, signal.DataPoints) for signal in signals]
-    return steadystate_time, *steadystate_datapoints_list
-
-def compute_fft(time, signal, fstep):
-    N = 10000
-    time_resamp = np.linspace(time[0], time[-1], N, endpoint=False)
-    signal_resamp = np.interp(time_resamp, time, signal)
-    freqs = np.fft.rfftfreq(N) * fstep * len(signal_resamp)
-    fft = np.abs(np.fft.rfft(signal_resamp) / len(signal_resamp))
-    fft[1:] = 2 * fft[1:]
-    return freqs, fft
+    """ return the common time base of the signals over the last horizon_time and the signals evaluated on it """
+    return align_signals(signals, horizon_time=horizon_time)
+
+def compute_fft(time, signal, fstep, number_of_harmonics=10):
+    """ amplitudes of the first harmonics of fstep over the last period, integrated exactly on the (non-uniform) time points """
+    return amplitude_spectrum(time, signal, fstep, number_of_harmonics)
 
 def compute_rms(time, data):
     """ compute rms value of a given signal in steady state """
@@ -196,11 +168,11 @@ def compute_dc_copper_losses(time, iPri, iSec, Rpri, Rsec, Rlk):
 
 # compute flux density and its FFT
 def compute_flux_density(time: np.ndarray, iLm: np.ndarray, Lm: float, Npri: float, Ac: float, fsw: float):
+    """ flux density over the last period and its harmonics, from the raw (compressed) magnetizing current """
     flux_density_estimated = Lm * iLm / Npri / Ac
-    freqs, fft_flux_densities_estimated = compute_fft(time, flux_density_estimated, fsw)
-    max_index = 10
-    freqs = freqs[:max_index]
-    fft_flux_densities_estimated = fft_flux_densities_estimated[:max_index]
+    freqs, fft_flux_densities_estimated = compute_fft(time, flux_density_estimated, fsw, number_of_harmonics=10)
+    steady_state = time >= time[-1] - 1 / fsw
+    time, flux_density_estimated = time[steady_state], flux_density_estimated[steady_state]
     
     plt.figure()
     plt.subplot(2, 1, 1)
@@ -222,12 +194,12 @@ def compute_flux_density(time: np.ndarray, iLm: np.ndarray, Lm: float, Npri: flo
 
 # Compute Core Loss with fft of flux density
 def compute_magnetic_losses_fftmethod(freqs, fft_flux_densities, temperature, core_volume):
-    total_loss_density = 0
     print(f"\n--- Core Loss computation with FFT of flux density method ---")
-    for freq, fft_flux_density in zip(freqs, fft_flux_densities):
-        total_loss_density += compute_loss_density(fft_flux_density*1e3, freq, temperature)
+    loss_densities = compute_loss_density(np.asarray(fft_flux_densities) * 1e3, freqs, temperature)  # all harmonics at once
+    total_loss_density = np.sum(loss_densities)
+    for freq, fft_flux_density, loss_density in zip(freqs, fft_flux_densities, loss_densities):
         if fft_flux_density * 1e3 >= 1:
-            print(f"Loss density at {temperature}°C, {freq/1e3:0.0f} kHz, {fft_flux_density*1e3:0.0f} mT is {compute_loss_density(fft_flux_density*1e3, freq, temperature):0.2f} mW / cm3")
+            print(f"Loss density at {temperature}°C, {freq/1e3:0.0f} kHz, {fft_flux_density*1e3:0.0f} mT is {loss_density:0.2f} mW / cm3")
     print(f"Total Loss density at {temperature}°C: {total_loss_density : 0.1f} mW / cm3")
     print(f"Total Core Loss (FFT) at {temperature}°C: {total_loss_density * core_volume / 1e6 : 0.1f} W")
     return total_loss_density * core_volume / 1e6
@@ -301,11 +273,12 @@ powerswitch_loss = res['switch_loss'].DataPoints[-1]
 print(f"Total Powerswitch Loss: {powerswitch_loss:.2f} W\n")
 
 # DC Copper Losses
-time, iPri, iSec, iLm = steadystate_signal(1 / fsw, res['iPri'], res['iSec'], res['iLm'])
+time, iPri, iSec = steadystate_signal(1 / fsw, res['iPri'], res['iSec'])
 dcLoss_inductor, dcLoss_pri, dcLoss_sec = compute_dc_copper_losses(time, iPri, iSec, Rpri, Rsec, Rlk)
 
 # Core Magnetic Losses
-flux_density, freqs, fft_flux_densities = compute_flux_density(time, iLm, Lm[0], Npri, Ac, fsw)
+iLm_time, iLm = np.asarray(res['iLm'].TimePoints), np.asarray(res['iLm'].DataPoints)
+flux_density, freqs, fft_flux_densities = compute_flux_density(iLm_time, iLm, Lm[0], Npri, Ac, fsw)
 temperature = 100
 core_Loss1 = compute_magnetic_losses_fftmethod(freqs, fft_flux_densities, temperature, core_volume)
 core_Loss2 = compute_magnetic_losses_maxmethod(flux_density, fft_flux_densities, temperature, Ac, fsw, core_volume)
@@ -0,0 +1,109 @@
+"""
+Exact harmonic analysis of SIMBA signals.
+
+SIMBA signals are sampled on a non-uniform time base (variable time step, compressed scopes) and are
+linear between two time points. Instead of resampling them on a uniform grid for an FFT, the Fourier
+coefficients of this piecewise-linear waveform are integrated exactly over an integer number of periods
+of the base frequency. For a segment [t_i, t_i+1] of slope s_i, integrating by parts gives
+
+    integral(x(t) exp(-jwt) dt) = [-x(t) exp(-jwt) / jw + s_i exp(-jwt) / w^2] from t_i to t_i+1
+
+so that each coefficient is a weighted sum of exp(-jw t_n) over the time points. This is computed as
+one matrix product for all the requested harmonics and all the signals sharing the same time base:
+ - no resampling, so the result does not depend on a number of FFT points,
+ - only the requested harmonics are computed,
+ - steps of the waveform (repeated time points) are handled exactly.
+
+Usage:
+    signal = job.GetSignalByName('Lm - Current')
+    freqs, amplitudes = amplitude_spectrum(signal.TimePoints, signal.DataPoints, fsw, number_of_harmonics=10)
+    coefficients = fourier_coefficients(time, [iPri, iSec, iLm], fsw, harmonics=[1, 3, 5])  # shape (3, 3)
+"""
+
+import numpy as np
+
+_MAX_MATRIX_SIZE = 2 ** 22  # number of complex exponentials computed at once (64 MB)
+
+
+def _last_periods(time_points, data_points, period):
+    """
+    Return the time points in [end time - period, end time] and the data of each signal on them.
+    The first point is interpolated at the exact start of the window.
+    """
+    start_time = time_points[-1] - period
+    if start_time < time_points[0] - 1e-9 * period:
+        raise ValueError("the signal is shorter than the analyzed periods ({0:g} s)".format(period))
+    first = int(np.searchsorted(time_points, start_time, side='right'))
+    time_window = np.concatenate(([start_time], time_points[first:]))
+    start_values = np.array([np.interp(start_time, time_points, data) for data in data_points])
+    data_window = np.concatenate((start_values[:, None], data_points[:, first:]), axis=1)
+    return time_window, data_window
+
+
+def fourier_coefficients(time_points, data_points, base_frequency, harmonics=10, number_of_periods=1):
+    """
+    Return the complex Fourier coefficients c_k of the waveforms over the last number_of_periods periods,
+    x(t) = sum(c_k exp(j 2 pi k base_frequency t)) for k in (-inf, inf).
+
+    Args:
+        time_points ([float]): time points [s], sorted (repeated points are allowed for steps)
+        data_points ([float] or [[float]]): data points of one signal, or of several signals sharing time_points
+        base_frequency (float): frequency of the fundamental [Hz]
+        harmonics (int or [int]): number of harmonics (orders 0 to harmonics - 1) or list of harmonic orders
+        number_of_periods (int): number of periods of the base frequency analyzed, at the end of the signals
+
+    Returns:
+        np.ndarray: complex coefficients, shape (number of harmonics,) or (number of signals, number of harmonics)
+    """
+    time_points = np.asarray(time_points, dtype=np.float64)
+    data_points = np.asarray(data_points, dtype=np.float64)
+    single_signal = data_points.ndim == 1
+    data_points = np.atleast_2d(data_points)
+    if data_points.shape[1] != time_points.size or time_points.size < 2:
+        raise ValueError("each signal must have one data point per time point (at least 2 points)")
+    orders = np.arange(harmonics) if np.isscalar(harmonics) else np.asarray(harmonics)
+
+    period = number_of_periods / base_frequency
+    time_points, data_points = _last_periods(time_points, data_points, period)
+    origin = time_points[0]
+    time_points = time_points - origin  # the phase is taken from the start of the window
+
+    # Segments of non-zero duration, their slopes and the node weights (see module docstring)
+    dt = np.diff(time_points)
+    valid = dt > 0
+    slopes = np.zeros((data_points.shape[0], dt.size))
+    slopes[:, valid] = np.diff(data_points, axis=1)[:, valid] / dt[valid]
+    segment_before = np.concatenate(([False], valid))   # segment ending at the node
+    segment_after = np.concatenate((valid, [False]))    # segment starting at the node
+    step_weights = data_points * (segment_after.astype(np.float64) - segment_before)
+    padded_slopes = np.pad(slopes, ((0, 0), (1, 1)))
+    slope_weights = padded_slopes[:, :-1] - padded_slopes[:, 1:]
+
+    coefficients = np.empty((data_points.shape[0], orders.size), dtype=np.complex128)
+    dc = orders == 0
+    if dc.any():  # average value
+        coefficients[:, dc] = (np.dot((data_points[:, 1:] + data_points[:, :-1]) * valid, dt) / 2 / period)[:, None]
+    ac_orders = orders[~dc]
+    ac_values = np.empty((data_points.shape[0], ac_orders.size), dtype=np.complex128)
+    chunk = max(1, _MAX_MATRIX_SIZE // time_points.size)
+    for start in range(0, ac_orders.size, chunk):
+        omega = 2 * np.pi * base_frequency * ac_orders[start:start + chunk]
+        exponentials = np.exp(-1j * np.outer(time_points, omega))  # (points, harmonics)
+        ac_values[:, start:start + chunk] = (step_weights @ exponentials / (1j * omega)
+                                             + slope_weights @ exponentials / omega ** 2) / period
+    coefficients[:, ~dc] = ac_values
+    return coefficients[0] if single_signal else coefficients
+
+
+def amplitude_spectrum(time_points, data_points, base_frequency, number_of_harmonics=10, number_of_periods=1):
+    """
+    Return the frequencies and the amplitudes of the first number_of_harmonics harmonics (including DC),
+    with the same scaling as a one-sided FFT: |c_0| for DC and 2 |c_k| for the other harmonics.
+
+    Returns:
+        tuple: frequencies [Hz], amplitudes (one row per signal if several signals are given)
+    """
+    coefficients = fourier_coefficients(time_points, data_points, base_frequency, number_of_harmonics, number_of_periods)
+    amplitudes = np.abs(coefficients)
+    amplitudes[..., 1:] *= 2
+    return np.arange(number_of_harmonics) * base_frequency, amplitudes
@@ -0,0 +1,89 @@
+"""
+Alignment of SIMBA signals on a common time base.
+
+Signals of a job are sampled on their own (non-uniform) time base, especially with compressed
+scopes. To combine them (product, difference...) they are evaluated on the union of their time
+points. This module does it with NumPy arrays only:
+ - the time bases are already sorted: they are merged with a stable sort of their concatenation,
+   which only has to interleave the sorted runs, and duplicates are removed with a mask,
+ - when only the end of the simulation is needed (steady state), each time base is cut with
+   searchsorted before the merge, so that the points outside the window are never copied,
+ - every signal is then evaluated on the common grid with np.interp.
+
+Usage:
+    time, iPri, iSec = align_signals([job.GetSignalByName('Llk - Current'),
+                                      job.GetSignalByName('Rsec - Current')], horizon_time=1 / fsw)
+"""
+
+import numpy as np
+
+
+def _time_and_data(signal):
+    """
+    Return (time, data) arrays of a SIMBA signal or of a (time_points, data_points) pair.
+    """
+    if hasattr(signal, 'TimePoints'):
+        return np.asarray(signal.TimePoints, dtype=np.float64), np.asarray(signal.DataPoints, dtype=np.float64)
+    time_points, data_points = signal
+    return np.asarray(time_points, dtype=np.float64), np.asarray(data_points, dtype=np.float64)
+
+
+def merge_time_bases(*time_bases):
+    """
+    Return the sorted union of sorted time bases (duplicated time points are kept once).
+    """
+    merged = np.sort(np.concatenate([np.asarray(t, dtype=np.float64) for t in time_bases]), kind='stable')
+    if merged.size == 0:
+        return merged
+    keep = np.empty(merged.size, dtype=bool)
+    keep[0] = True
+    np.not_equal(merged[1:], merged[:-1], out=keep[1:])
+    return merged[keep]
+
+
+def window(time_points, data_points, start_time, end_time=None):
+    """
+    Return the part of a signal in [start_time, end_time], with one more point on each side (when available)
+    so that the signal can still be interpolated at the window limits.
+    """
+    first = max(0, int(np.searchsorted(time_points, start_time, side='left')) - 1)
+    last = len(time_points) if end_time is None else min(len(time_points), int(np.searchsorted(time_points, end_time, side='right')) + 1)
+    return time_points[first:last], data_points[first:last]
+
+
+def _interpolate(grid, time_points, data_points, extrapolate):
+    values = np.interp(grid, time_points, data_points)
+    if extrapolate and len(time_points) > 1:  # linear extrapolation instead of constant values outside the time base
+        before = grid < time_points[0]
+        after = grid > time_points[-1]
+        if before.any():
+            slope = (data_points[1] - data_points[0]) / (time_points[1] - time_points[0])
+            values[before] = data_points[0] + slope * (grid[before] - time_points[0])
+        if after.any():
+            slope = (data_points[-1] - data_points[-2]) / (time_points[-1] - time_points[-2])
+            values[after] = data_points[-1] + slope * (grid[after] - time_points[-1])
+    return values
+
+
+def align_signals(signals, horizon_time=None, extrapolate=False):
+    """
+    Evaluate signals on the union of their time points.
+
+    Args:
+        signals (list): SIMBA signals (TimePoints/DataPoints) or (time_points, data_points) pairs
+        horizon_time (float): if set, only the time points after (end time - horizon_time) are kept,
+            ex: horizon_time = N / fsw for the last N switching periods
+        extrapolate (bool): if True, signals are extrapolated linearly outside their time base, otherwise their first/last value is used
+
+    Returns:
+        tuple: common time array followed by the data array of each signal
+    """
+    arrays = [_time_and_data(signal) for signal in signals]
+    if horizon_time is None:
+        grid = merge_time_bases(*[time_points for time_points, _ in arrays])
+    else:
+        start_time = max(time_points[-1] for time_points, _ in arrays) - horizon_time
+        arrays = [window(time_points, data_points, start_time) for time_points, data_points in arrays]
+        grid = merge_time_bases(*[time_points for time_points, _ in arrays])
+        grid = grid[np.searchsorted(grid, start_time, side='right'):]
+    return (grid, *[_interpolate(grid, time_points, data_points, extrapolate) for time_points, data_points in arrays])
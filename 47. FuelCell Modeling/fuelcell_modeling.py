@@ -149,6 +149,7 @@ print('5- Plot vi curves')
 
 from bokeh.plotting import figure
 from bokeh.io import show, output_notebook
+from decimation import zoomable_line
 
 fc_current = []
 fc_voltage = []
@@ -169,9 +170,10 @@ p1 = figure(width = 600, height = 400,
                              tools='pan,wheel_zoom,box_zoom,reset,save',
                              active_drag='box_zoom',
                              tooltips = TOOLTIPS)
-p1.line(fc_current[0], fc_voltage[0], color='limegreen', legend_label='C-code')
-p1.line(fc_current[1], fc_voltage[1], color='orangered', line_dash= 'dashed', legend_label='PWL resistor')
-p1.line(fc_current[2], fc_voltage[2], color='green', line_dash= 'dashed', legend_label='Dynamic Model')
+# XY curves decimated to the figure width (LTTB keeps the shape of the loops) instead of all the simulated points
+zoomable_line(p1, fc_current[0], fc_voltage[0], color='limegreen', legend_label='C-code', method='lttb')
+zoomable_line(p1, fc_current[1], fc_voltage[1], color='orangered', line_dash= 'dashed', legend_label='PWL resistor', method='lttb')
+zoomable_line(p1, fc_current[2], fc_voltage[2], color='green', line_dash= 'dashed', legend_label='Dynamic Model', method='lttb')
 
 output_notebook()
 show(p1)